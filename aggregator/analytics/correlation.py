@@ -0,0 +1,177 @@
+"""
+Cross-item co-movement: top-N most correlated neighbours per item.
+
+Mid prices from ItemSnapshot are aligned on the shared 5-minute timestamp
+grid and turned into log returns, a T x N float32 matrix. Each item's
+return is taken between its own consecutive snapshots, so a missing
+bucket costs that item one return instead of two; a return spanning k
+buckets is divided by sqrt(k) to keep one bucket's variance. Returns are
+standardised, with missing buckets set to 0 after standardising, so a
+pair's correlation reduces to a dot product divided by the number of
+returns the two items share. The N x N correlation matrix is never held
+at once. It is produced BLOCK_SIZE rows at a time (Z[:, block].T @ Z,
+with the same product of the presence masks for the overlap counts), and
+only each row's top-N neighbours are kept from every block, so memory
+stays at 2*T*N + 2*BLOCK_SIZE*N floats.
+
+The table holds correlations over one trailing window (--days). Rerunning
+the job on a schedule rolls that window forward.
+
+Usage::
+
+    python -m aggregator.analytics.correlation --days 7 --top 10
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import delete, insert
+from sqlmodel import Session, select
+
+from aggregator.analytics.snapshots import SnapshotShard, load_shard
+from aggregator.db.database import get_engine, init_db
+from aggregator.models.item_correlation import ItemCorrelation
+
+BLOCK_SIZE = 512
+TOP_N = 10
+MIN_COVERAGE = 0.5  # share of grid returns an item must have to be included
+MIN_OVERLAP = 12  # returns two items must share (an hour) to be compared
+
+logger = logging.getLogger(__name__)
+
+
+def return_matrix(shard: SnapshotShard, min_coverage: float = MIN_COVERAGE) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return (item_ids, Z) where Z is the T x N float32 matrix of standardised
+    log mid-price returns on the common timestamp grid (0 where missing).
+    A return sits in the slot of the snapshot that ends it and spans back
+    to the item's previous snapshot, scaled by 1/sqrt(buckets spanned).
+    """
+    mid = (shard.avg_high_price + shard.avg_low_price) / 2
+    ok = ~np.isnan(mid) & (mid > 0)
+    grid, rows = np.unique(shard.timestamp[ok], return_inverse=True)
+    item_ids, cols = np.unique(shard.item_id[ok], return_inverse=True)
+    if len(grid) < 3 or len(item_ids) < 2:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+
+    prices = np.full((len(grid), len(item_ids)), np.nan, dtype=np.float32)
+    prices[rows, cols] = np.log(mid[ok])
+    # Index of each item's latest snapshot at or before every slot (forward fill)
+    observed = ~np.isnan(prices)
+    last = np.where(observed, np.arange(len(grid), dtype=np.int32)[:, None], 0)
+    np.maximum.accumulate(last, axis=0, out=last)
+    previous = np.take_along_axis(prices, last[:-1], axis=0)
+    span = (np.arange(1, len(grid), dtype=np.int32)[:, None] - last[:-1]).astype(np.float32)
+    returns = np.where(observed[1:], (prices[1:] - previous) / np.sqrt(span), np.nan)
+    del last, previous, span
+
+    present = ~np.isnan(returns)
+    counts = present.sum(axis=0)
+    mean = (np.nansum(returns, axis=0) / np.maximum(counts, 1)).astype(np.float32)
+    centered = np.where(present, returns - mean, np.float32(0))
+    std = np.sqrt((centered**2).sum(axis=0) / np.maximum(counts, 1)).astype(np.float32)
+    keep = (counts >= min_coverage * len(returns)) & (std > 0)
+    z = centered[:, keep] / std[keep]
+    return item_ids[keep], z.astype(np.float32, copy=False)
+
+
+def top_neighbours(
+    z: np.ndarray, top_n: int = TOP_N, block_size: int = BLOCK_SIZE, min_overlap: int = MIN_OVERLAP
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    For every column of z return the indices and correlations of its top_n
+    most correlated other columns, best first, computing block_size rows of
+    the correlation matrix at a time. Zeros in z are missing returns; each
+    pair is averaged over the returns both columns have, and pairs sharing
+    fewer than min_overlap are -inf.
+    """
+    t, n = z.shape
+    k = min(top_n, n - 1)
+    present = (z != 0).astype(np.float32)
+    neighbours = np.empty((n, k), dtype=np.int64)
+    values = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        overlap = present[:, start:stop].T @ present
+        corr = z[:, start:stop].T @ z / np.maximum(overlap, 1)
+        corr[overlap < min_overlap] = -np.inf
+        corr[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        part = np.argpartition(corr, -k, axis=1)[:, -k:]
+        part_values = np.take_along_axis(corr, part, axis=1)
+        order = np.argsort(-part_values, axis=1)
+        neighbours[start:stop] = np.take_along_axis(part, order, axis=1)
+        values[start:stop] = np.take_along_axis(part_values, order, axis=1)
+    return neighbours, values
+
+
+def store_neighbours(engine, item_ids: np.ndarray, neighbours: np.ndarray, values: np.ndarray) -> int:
+    """Replace the ItemCorrelation table in one bulk insert; returns rows written."""
+    # -inf marks a pair without enough shared history
+    rows = [
+        {
+            "item_id": int(item_ids[i]),
+            "rank": rank,
+            "neighbour_id": int(item_ids[j]),
+            "correlation": float(values[i, rank - 1]),
+        }
+        for i in range(len(item_ids))
+        for rank, j in enumerate(neighbours[i], start=1)
+        if np.isfinite(values[i, rank - 1])
+    ]
+    with Session(engine) as session:
+        session.exec(delete(ItemCorrelation))
+        if rows:
+            session.exec(insert(ItemCorrelation), params=rows)
+        session.commit()
+    return len(rows)
+
+
+def compute_correlations(
+    engine=None,
+    since: datetime | None = None,
+    top_n: int = TOP_N,
+    block_size: int = BLOCK_SIZE,
+) -> int:
+    """Compute and store every item's top_n neighbours; returns rows written."""
+    engine = engine or get_engine()
+    item_ids, z = return_matrix(load_shard(engine, since=since))
+    if len(item_ids) < 2:
+        item_ids = item_ids[:0]
+        neighbours, values = np.empty((0, 0), dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+    else:
+        neighbours, values = top_neighbours(z, top_n, block_size)
+    return store_neighbours(engine, item_ids, neighbours, values)
+
+
+def neighbours_of(session: Session, item_id: int, limit: int = TOP_N) -> list[ItemCorrelation]:
+    """Stored neighbours of item_id, most correlated first."""
+    statement = (
+        select(ItemCorrelation)
+        .where(ItemCorrelation.item_id == item_id)
+        .order_by(ItemCorrelation.rank)
+        .limit(limit)
+    )
+    return list(session.exec(statement).all())
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compute top-N correlated neighbours per item.")
+    parser.add_argument("--db-url", help="database to use (default: OSRS_GE_DB_URL)")
+    parser.add_argument("--days", type=float, default=7, help="window of history to correlate")
+    parser.add_argument("--top", type=int, default=TOP_N, help="neighbours to keep per item")
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    engine = init_db(args.db_url) if args.db_url else get_engine()
+    since = datetime.now(timezone.utc) - timedelta(days=args.days)
+    start = time.perf_counter()
+    rows = compute_correlations(engine, since, args.top, args.block_size)
+    logger.info("Stored %d neighbour rows in %.2fs", rows, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
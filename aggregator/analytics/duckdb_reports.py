@@ -0,0 +1,269 @@
+"""
+Columnar reports over the snapshot history with DuckDB.
+
+connect() opens an in-memory DuckDB, attaches the SQLite database read-only
+(through DuckDB's sqlite extension) and unions its itemsnapshot table with
+any archived Parquet files into one `snapshots` view. SQLite rows no newer
+than the newest archived snapshot are left out of the view, so rows that
+were exported but not yet deleted are not counted twice. Reports are plain SQL
+over that view, run by DuckDB's vectorised engine, and come back as a
+pyarrow Table (or a pandas DataFrame with output="pandas") without ever
+building ORM objects:
+
+- daily_vwap: volume-weighted average price per item per day
+- volume_percentiles: per-item percentiles of 5m traded volume
+- weekly_summary: per-item weekly price range and volume
+
+export_parquet() writes old snapshots out as an archive file. Needs the
+analytics extra (uv sync --extra analytics). The sqlite extension is loaded
+from DuckDB's extension directory; if it is missing it is downloaded once
+(INSTALL sqlite), which needs network access. Preinstall it on offline
+hosts with python -c "import duckdb; duckdb.execute('INSTALL sqlite')".
+
+Usage::
+
+    python -m aggregator.analytics.duckdb_reports vwap --days 30 --archive 'archive/*.parquet'
+"""
+
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.engine import make_url
+
+from aggregator.db.database import get_db_url
+
+try:  # optional, analytics extra
+    import duckdb
+except ImportError:
+    duckdb = None
+
+SNAPSHOT_COLUMNS = (
+    "item_id",
+    "timestamp",
+    "avg_high_price",
+    "high_price_volume",
+    "avg_low_price",
+    "low_price_volume",
+)
+PERCENTILES = (0.5, 0.9, 0.99)
+OUTPUTS = ("arrow", "pandas")
+
+
+def sqlite_path(db_url: str | None = None) -> str:
+    """File path of a sqlite:/// database URL (default: the configured one)."""
+    url = make_url(db_url or get_db_url())
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        raise ValueError(f"DuckDB reports need a SQLite database file, not {url}")
+    return url.database
+
+
+def _quote(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _select(source: str) -> str:
+    """Snapshot columns of source with timestamps as TIMESTAMP (SQLite stores text)."""
+    rest = ", ".join(SNAPSHOT_COLUMNS[2:])
+    return f"SELECT item_id, CAST(timestamp AS TIMESTAMP) AS timestamp, {rest} FROM {source}"
+
+
+def _view(live: str | None, archived: str | None) -> str:
+    """Union of both sources, skipping live rows the archive already holds."""
+    if live is None:
+        return _select(archived)
+    if archived is None:
+        return _select(live)
+    newest = f"(SELECT max(timestamp) FROM ({_select(archived)}))"
+    return (
+        f"{_select(archived)} UNION ALL SELECT * FROM ({_select(live)}) "
+        f"WHERE timestamp > coalesce({newest}, '-infinity'::TIMESTAMP)"
+    )
+
+
+def _load_sqlite(conn) -> None:
+    try:
+        conn.execute("LOAD sqlite")
+    except duckdb.Error:
+        # Not installed yet: download it once (needs network)
+        conn.execute("INSTALL sqlite")
+        conn.execute("LOAD sqlite")
+
+
+def connect(db_path: str | None = None, archive: str | list[str] | None = None, sqlite: bool = True):
+    """
+    In-memory DuckDB connection with a `snapshots` view over the SQLite file
+    (db_path, default: OSRS_GE_DB_URL) and the Parquet files matching archive.
+    """
+    if duckdb is None:
+        raise RuntimeError("DuckDB reports need the duckdb package (uv sync --extra analytics)")
+    if not sqlite and not archive:
+        raise ValueError("Nothing to query: pass a SQLite database and/or an archive")
+    conn = duckdb.connect()
+    live = archived = None
+    if sqlite:
+        path = db_path or sqlite_path()
+        _load_sqlite(conn)
+        conn.execute(f"ATTACH {_quote(path)} AS ge (TYPE sqlite, READ_ONLY)")
+        live = "ge.itemsnapshot"
+    if archive:
+        files = [archive] if isinstance(archive, str) else list(archive)
+        file_list = ", ".join(_quote(f) for f in files)
+        archived = f"read_parquet([{file_list}], union_by_name = true)"
+    conn.execute(f"CREATE VIEW snapshots AS {_view(live, archived)}")
+    return conn
+
+
+def _where(since: datetime | None, until: datetime | None, item_ids) -> tuple[str, list]:
+    clauses, params = [], []
+    if since is not None:
+        clauses.append("timestamp >= ?")
+        params.append(_naive_utc(since))
+    if until is not None:
+        clauses.append("timestamp < ?")
+        params.append(_naive_utc(until))
+    if item_ids is not None:
+        ids = [int(i) for i in item_ids]
+        clauses.append(f"item_id IN ({', '.join('?' * len(ids))})" if ids else "FALSE")
+        params.extend(ids)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _naive_utc(ts: datetime) -> datetime:
+    # Snapshot timestamps are naive UTC on both the SQLite and Parquet side
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def _fetch(conn, sql: str, params: list, output: str):
+    if output not in OUTPUTS:
+        raise ValueError(f"output must be one of {', '.join(OUTPUTS)}")
+    result = conn.execute(sql, params)
+    if output == "pandas":
+        return result.df()
+    if hasattr(result, "to_arrow_table"):  # replaced fetch_arrow_table in DuckDB 1.4
+        return result.to_arrow_table()
+    return result.fetch_arrow_table()
+
+
+def daily_vwap(conn, since=None, until=None, item_ids=None, output: str = "arrow"):
+    """
+    Per item and UTC day: vwap over both sides, high_vwap (insta-buy) and
+    low_vwap (insta-sell), and the volume traded on each side.
+    """
+    where, params = _where(since, until, item_ids)
+    sql = f"""
+        SELECT
+            item_id,
+            CAST(date_trunc('day', timestamp) AS DATE) AS day,
+            (coalesce(sum(avg_high_price * high_price_volume), 0)
+             + coalesce(sum(avg_low_price * low_price_volume), 0))
+            / nullif(sum(CASE WHEN avg_high_price IS NOT NULL THEN high_price_volume ELSE 0 END)
+                     + sum(CASE WHEN avg_low_price IS NOT NULL THEN low_price_volume ELSE 0 END), 0)
+                AS vwap,
+            sum(avg_high_price * high_price_volume)
+                / nullif(sum(CASE WHEN avg_high_price IS NOT NULL THEN high_price_volume END), 0)
+                AS high_vwap,
+            sum(avg_low_price * low_price_volume)
+                / nullif(sum(CASE WHEN avg_low_price IS NOT NULL THEN low_price_volume END), 0)
+                AS low_vwap,
+            coalesce(sum(high_price_volume), 0) AS high_volume,
+            coalesce(sum(low_price_volume), 0) AS low_volume
+        FROM snapshots{where}
+        GROUP BY ALL
+        ORDER BY item_id, day
+    """
+    return _fetch(conn, sql, params, output)
+
+
+def _percentile_name(p: float) -> str:
+    """0.5 -> p50, 0.995 -> p99_5"""
+    return f"p{round(p * 100, 1):g}".replace(".", "_")
+
+
+def volume_percentiles(
+    conn, percentiles=PERCENTILES, since=None, until=None, item_ids=None, output: str = "arrow"
+):
+    """Per item: number of 5m snapshots and percentiles of units traded per snapshot (p50, p90, ...)."""
+    where, params = _where(since, until, item_ids)
+    columns = ", ".join(
+        f"quantile_cont(volume, {float(p)!r}) AS {_percentile_name(p)}" for p in percentiles
+    )
+    sql = f"""
+        SELECT item_id, count(*) AS samples, {columns}
+        FROM (
+            SELECT item_id, coalesce(high_price_volume, 0) + coalesce(low_price_volume, 0) AS volume
+            FROM snapshots{where}
+        )
+        GROUP BY item_id
+        ORDER BY item_id
+    """
+    return _fetch(conn, sql, params, output)
+
+
+def weekly_summary(conn, since=None, until=None, item_ids=None, output: str = "arrow"):
+    """Per item and ISO week (starting Monday): low/high/mean mid price and total volume."""
+    where, params = _where(since, until, item_ids)
+    sql = f"""
+        SELECT
+            item_id,
+            CAST(date_trunc('week', timestamp) AS DATE) AS week,
+            min(mid) AS low,
+            max(mid) AS high,
+            avg(mid) AS mean,
+            sum(volume) AS volume
+        FROM (
+            SELECT
+                item_id,
+                timestamp,
+                (avg_high_price + avg_low_price) / 2 AS mid,
+                coalesce(high_price_volume, 0) + coalesce(low_price_volume, 0) AS volume
+            FROM snapshots{where}
+        )
+        GROUP BY ALL
+        ORDER BY item_id, week
+    """
+    return _fetch(conn, sql, params, output)
+
+
+def export_parquet(conn, path: str, before: datetime | None = None) -> int:
+    """Write SQLite snapshots older than before (default: all) to a Parquet archive file."""
+    where, params = _where(None, before, None)
+    source = _select("ge.itemsnapshot")
+    count = conn.execute(f"SELECT count(*) FROM ({source}){where}", params).fetchone()[0]
+    conn.execute(
+        f"COPY (SELECT * FROM ({source}){where} ORDER BY item_id, timestamp) "
+        f"TO {_quote(path)} (FORMAT parquet)",
+        params,
+    )
+    return count
+
+
+REPORTS = {"vwap": daily_vwap, "volume": volume_percentiles, "weekly": weekly_summary}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Columnar snapshot reports with DuckDB.")
+    parser.add_argument("report", choices=sorted(REPORTS))
+    parser.add_argument("--db", help="SQLite database file (default: from OSRS_GE_DB_URL)")
+    parser.add_argument("--archive", action="append", help="Parquet archive glob (repeatable)")
+    parser.add_argument(
+        "--archive-only", action="store_true", help="query only the archive, not the SQLite file"
+    )
+    parser.add_argument("--days", type=float, help="only use the last N days of snapshots")
+    parser.add_argument("--item", type=int, action="append", help="limit to this item id (repeatable)")
+    parser.add_argument("--output", help="write the report to this .parquet or .csv file")
+    args = parser.parse_args(argv)
+
+    since = datetime.now(timezone.utc) - timedelta(days=args.days) if args.days else None
+    conn = connect(args.db, args.archive, sqlite=not args.archive_only)
+    table = REPORTS[args.report](conn, since=since, item_ids=args.item)
+    if args.output:
+        conn.register("report", table)
+        fmt = "parquet" if args.output.endswith(".parquet") else "csv"
+        conn.execute(f"COPY report TO {_quote(args.output)} (FORMAT {fmt})")
+        print(f"Wrote {table.num_rows} rows to {args.output}")
+    else:
+        print(conn.from_arrow(table))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Per-item volatility and liquidity metrics from the 5m snapshots.
+
+ItemMetricsStage keeps the last WINDOW snapshots of every item in NumPy
+ring buffers (items x WINDOW). Each call reads only the snapshots written
+since the previous call, drops them into the next ring columns and
+recomputes metrics for the items they touched, vectorised across items:
+
+- spread_pct / spread_volatility: mean and stddev of (high - low) / mid
+- atr_pct: mean absolute 5m change of the mid price relative to the mid
+- volume_p50 / volume_p90: percentiles of units traded per 5 minutes
+- buy_fill_per_hour / sell_fill_per_hour: median insta-sell / insta-buy
+  volume, i.e. how fast a resting buy / sell offer is likely to fill
+
+Results replace those items' rows in the indexed item_metrics table, so
+dashboards can filter on risk-adjusted margin without aggregating at read
+time. The stage can run as an ingester tick hook (--item-metrics or
+OSRS_GE_ITEM_METRICS=1) and standalone to backfill. As a hook it reads
+at most `batch` snapshots per tick, so a cold start fills the 24h window
+over the first ticks instead of loading it all inside one.
+"""
+
+import argparse
+import logging
+import math
+import warnings
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import delete, func, insert
+from sqlmodel import Session, select
+
+from aggregator.analytics.snapshots import load_shard
+from aggregator.db.database import get_engine, init_db
+from aggregator.models.item_metrics import ItemMetrics
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+ITEM_METRICS_ENV = "OSRS_GE_ITEM_METRICS"
+WINDOW = 288  # 24 hours of 5m snapshots
+BATCH = 24  # most 5m snapshots read per call while catching up
+SNAPSHOT_MINUTES = 5
+MIN_SAMPLES = 2
+INITIAL_CAPACITY = 4_096
+BUFFERS = ("high", "low", "high_volume", "low_volume")
+
+logger = logging.getLogger(__name__)
+
+
+class ItemMetricsStage:
+    """Incremental rolling metrics over ItemSnapshot; call it once per tick."""
+
+    def __init__(self, engine=None, window: int = WINDOW, batch: int = BATCH):
+        self.engine = engine
+        self.window = window
+        self.batch = batch
+        self.rows: dict[int, int] = {}
+        self.last_timestamp: datetime | None = None
+        self.column = -1
+        for name in BUFFERS:
+            # float32 is ample for ratios and percentiles and halves the buffers
+            setattr(self, name, np.full((INITIAL_CAPACITY, window), np.nan, dtype=np.float32))
+
+    def _row(self, item_id: int) -> int:
+        row = self.rows.get(item_id)
+        if row is None:
+            row = self.rows[item_id] = len(self.rows)
+            if row >= len(self.high):
+                for name in BUFFERS:
+                    old = getattr(self, name)
+                    grown = np.full((2 * len(old), self.window), np.nan, dtype=np.float32)
+                    grown[: len(old)] = old
+                    setattr(self, name, grown)
+        return row
+
+    def ingest(self, engine) -> np.ndarray:
+        """Load up to batch new snapshots into the ring buffers; return the touched buffer rows."""
+        with Session(engine) as session:
+            latest = session.exec(select(func.max(ItemSnapshot.timestamp))).one()
+            if latest is None or (self.last_timestamp is not None and latest <= self.last_timestamp):
+                return np.empty(0, dtype=np.int64)
+            since = latest - timedelta(minutes=SNAPSHOT_MINUTES * (self.window - 1))
+            if self.last_timestamp is not None:
+                since = max(since, self.last_timestamp + timedelta(microseconds=1))
+            # Start the batch at the oldest unread snapshot, not at an empty stretch of window
+            since = session.exec(
+                select(func.min(ItemSnapshot.timestamp)).where(ItemSnapshot.timestamp >= since)
+            ).one()
+        until = min(latest, since + timedelta(minutes=SNAPSHOT_MINUTES * self.batch, microseconds=-1))
+        shard = load_shard(engine, since=since, until=until)
+        self.last_timestamp = until
+        if not len(shard):
+            return np.empty(0, dtype=np.int64)
+        # One ring column per distinct snapshot timestamp, oldest first
+        stamps, slot = np.unique(shard.timestamp, return_inverse=True)
+        skip = max(0, len(stamps) - self.window)
+        keep = slot >= skip
+        stamps, slot = stamps[skip:], slot[keep] - skip
+        rows = np.array([self._row(i) for i in shard.item_id[keep].tolist()], dtype=np.int64)
+        columns = (self.column + 1 + np.arange(len(stamps))) % self.window
+        for name in BUFFERS:
+            getattr(self, name)[:, columns] = np.nan
+        cols = columns[slot]
+        self.high[rows, cols] = shard.avg_high_price[keep]
+        self.low[rows, cols] = shard.avg_low_price[keep]
+        self.high_volume[rows, cols] = shard.high_price_volume[keep]
+        self.low_volume[rows, cols] = shard.low_price_volume[keep]
+        self.column = int(columns[-1])
+        return np.unique(rows)
+
+    def compute(self, rows: np.ndarray) -> dict[str, np.ndarray]:
+        """Metrics for the given buffer rows, as arrays aligned with rows."""
+        order = (self.column + 1 + np.arange(self.window)) % self.window
+        high, low = self.high[rows][:, order], self.low[rows][:, order]
+        mid = (high + low) / 2
+        volume = self.high_volume[rows] + self.low_volume[rows]
+        with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            spread = (high - low) / mid
+            mean_mid = np.nanmean(mid, axis=1)
+            p50, p90 = np.nanpercentile(volume, [50, 90], axis=1)
+            return {
+                "samples": np.sum(~np.isnan(mid), axis=1),
+                "spread_pct": np.nanmean(spread, axis=1),
+                "spread_volatility": np.nanstd(spread, axis=1),
+                "atr_pct": np.nanmean(np.abs(np.diff(mid, axis=1)), axis=1) / mean_mid,
+                "volume_p50": p50,
+                "volume_p90": p90,
+                "buy_fill_per_hour": np.nanmedian(self.low_volume[rows], axis=1) * 12,
+                "sell_fill_per_hour": np.nanmedian(self.high_volume[rows], axis=1) * 12,
+            }
+
+    def __call__(self, items=None) -> int:
+        """Tick hook entry point; items are ignored, snapshots come from the database."""
+        engine = self.engine or get_engine()
+        rows = self.ingest(engine)
+        if not len(rows):
+            return 0
+        metrics = self.compute(rows)
+        item_ids = {row: item_id for item_id, row in self.rows.items()}
+        now = datetime.now(timezone.utc)
+        records = []
+        for i, row in enumerate(rows.tolist()):
+            if metrics["samples"][i] < MIN_SAMPLES:
+                continue
+            record = {"item_id": item_ids[row], "updated_at": now}
+            for name, values in metrics.items():
+                value = values[i].item()
+                record[name] = None if math.isnan(value) else value
+            records.append(record)
+        with Session(engine) as session:
+            session.exec(delete(ItemMetrics).where(ItemMetrics.item_id.in_([r["item_id"] for r in records])))
+            if records:
+                session.exec(insert(ItemMetrics), params=records)
+            session.commit()
+        return len(records)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Backfill the item_metrics table.")
+    parser.add_argument("--db-url", help="database to use (default: OSRS_GE_DB_URL)")
+    parser.add_argument("--window", type=int, default=WINDOW, help="5m snapshots per window")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    engine = init_db(args.db_url) if args.db_url else get_engine()
+    written = ItemMetricsStage(engine, args.window, batch=args.window)()
+    logger.info("Updated metrics for %d items", written)
+
+
+if __name__ == "__main__":
+    main()
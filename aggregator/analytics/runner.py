@@ -0,0 +1,176 @@
+"""
+Whole-market history analytics sharded across processes.
+
+The item_id space is cut into contiguous ranges holding roughly equal
+numbers of items. Each range is handed to a ProcessPoolExecutor worker
+that opens its own read-only connection, loads only its slice of
+ItemSnapshot into NumPy columns and runs the requested analyses. Workers
+return plain result rows and the parent writes each analysis back with a
+single executemany, so SQLite never sees concurrent writers.
+
+Usage::
+
+    python -m aggregator.analytics.runner volatility trend --days 30 --workers 8
+"""
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import delete, insert
+from sqlmodel import Session, select
+
+from aggregator.analytics.snapshots import SnapshotShard, load_shard, read_only_engine
+from aggregator.db.database import get_db_url, get_engine, init_db
+from aggregator.models.item_analysis import ItemAnalysis
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+SHARDS_PER_WORKER = 4
+MIN_SAMPLES = 3
+SECONDS_PER_HOUR = 3600
+
+logger = logging.getLogger(__name__)
+
+
+def _mid_prices(shard: SnapshotShard, start: int, stop: int) -> tuple[np.ndarray, np.ndarray]:
+    """Timestamps and mid prices for one item, dropping snapshots without both sides."""
+    high = shard.avg_high_price[start:stop]
+    low = shard.avg_low_price[start:stop]
+    mid = (high + low) / 2
+    keep = ~np.isnan(mid) & (mid > 0)
+    return shard.timestamp[start:stop][keep], mid[keep]
+
+
+def volatility(shard: SnapshotShard) -> list[tuple[int, float, int]]:
+    """Standard deviation of 5-minute log returns of the mid price."""
+    results = []
+    for item_id, start, stop in shard.groups():
+        _, mid = _mid_prices(shard, start, stop)
+        if len(mid) < MIN_SAMPLES:
+            continue
+        returns = np.diff(np.log(mid))
+        results.append((item_id, float(returns.std()), len(returns)))
+    return results
+
+
+def trend(shard: SnapshotShard) -> list[tuple[int, float, int]]:
+    """Least-squares slope of the mid price, as a fraction of the mean per hour."""
+    results = []
+    for item_id, start, stop in shard.groups():
+        ts, mid = _mid_prices(shard, start, stop)
+        if len(mid) < MIN_SAMPLES or ts[-1] == ts[0]:
+            continue
+        hours = (ts - ts[0]) / SECONDS_PER_HOUR
+        slope = np.polyfit(hours, mid, 1)[0]
+        results.append((item_id, float(slope / mid.mean()), len(mid)))
+    return results
+
+
+ANALYSES = {"volatility": volatility, "trend": trend}
+
+
+def shard_ranges(session: Session, shards: int) -> list[tuple[int, int]]:
+    """Split the item ids present in ItemSnapshot into at most `shards` [start, stop) ranges."""
+    ids = session.exec(select(ItemSnapshot.item_id).distinct().order_by(ItemSnapshot.item_id)).all()
+    if not ids:
+        return []
+    chunks = np.array_split(np.asarray(ids), min(shards, len(ids)))
+    bounds = [int(chunk[0]) for chunk in chunks] + [int(ids[-1]) + 1]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def run_shard(
+    db_url: str, start_id: int, stop_id: int, analyses: list[str], since: datetime | None
+) -> dict[str, list[tuple]]:
+    """Worker entry point: load one id range read-only and run every analysis on it."""
+    engine = read_only_engine(db_url)
+    try:
+        shard = load_shard(engine, start_id, stop_id, since)
+    finally:
+        engine.dispose()
+    return {name: ANALYSES[name](shard) for name in analyses}
+
+
+def write_results(engine, analysis: str, rows: list[tuple], computed_at: datetime) -> None:
+    """Replace all stored results of one analysis with rows in a single bulk insert."""
+    with Session(engine) as session:
+        session.exec(delete(ItemAnalysis).where(ItemAnalysis.analysis == analysis))
+        if rows:
+            session.exec(
+                insert(ItemAnalysis),
+                params=[
+                    {
+                        "analysis": analysis,
+                        "item_id": item_id,
+                        "value": value,
+                        "samples": samples,
+                        "computed_at": computed_at,
+                    }
+                    for item_id, value, samples in rows
+                ],
+            )
+        session.commit()
+
+
+def run_analytics(
+    analyses: list[str],
+    db_url: str | None = None,
+    workers: int | None = None,
+    shards: int | None = None,
+    since: datetime | None = None,
+) -> dict[str, int]:
+    """
+    Run analyses over every item, sharded across `workers` processes (all
+    cores by default; 1 runs inline), and store the results. Returns the
+    number of items written per analysis.
+    """
+    unknown = set(analyses) - set(ANALYSES)
+    if unknown:
+        raise ValueError(f"Unknown analyses: {', '.join(sorted(unknown))}")
+    engine = get_engine() if db_url is None else init_db(db_url)
+    db_url = db_url or get_db_url()
+    workers = workers or os.cpu_count() or 1
+    with Session(engine) as session:
+        ranges = shard_ranges(session, shards or workers * SHARDS_PER_WORKER)
+
+    results: dict[str, list[tuple]] = {name: [] for name in analyses}
+    jobs = [(db_url, start, stop, analyses, since) for start, stop in ranges]
+    if workers == 1 or len(jobs) <= 1:
+        outputs = [run_shard(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(run_shard, *zip(*jobs)))
+    for output in outputs:
+        for name, rows in output.items():
+            results[name].extend(rows)
+
+    computed_at = datetime.now(timezone.utc)
+    for name, rows in results.items():
+        write_results(engine, name, rows, computed_at)
+    return {name: len(rows) for name, rows in results.items()}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run sharded history analytics.")
+    parser.add_argument("analyses", nargs="+", choices=sorted(ANALYSES))
+    parser.add_argument("--db-url", help="database to analyse (default: OSRS_GE_DB_URL)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--shards", type=int, help=f"id ranges (default: {SHARDS_PER_WORKER} per worker)")
+    parser.add_argument("--days", type=float, help="only use the last N days of snapshots")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    since = datetime.now(timezone.utc) - timedelta(days=args.days) if args.days else None
+    start = time.perf_counter()
+    counts = run_analytics(args.analyses, args.db_url, args.workers, args.shards, since)
+    for name, count in counts.items():
+        logger.info("%s: %d items", name, count)
+    logger.info("Finished in %.2fs", time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Columnar ItemSnapshot slices for the analytics workers."""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import Engine, make_url
+
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+# Rows converted to NumPy at a time; bounds the Python objects alive during a load
+CHUNK_ROWS = 50_000
+
+
+@dataclass
+class SnapshotShard:
+    """Snapshots sorted by (item_id, timestamp) as parallel NumPy columns."""
+
+    item_id: np.ndarray
+    timestamp: np.ndarray  # unix seconds
+    avg_high_price: np.ndarray  # NaN where missing
+    avg_low_price: np.ndarray
+    high_price_volume: np.ndarray  # 0 where missing
+    low_price_volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.item_id)
+
+    def groups(self):
+        """Yield (item_id, start, stop) row ranges, one per item."""
+        if not len(self.item_id):
+            return
+        ids, starts = np.unique(self.item_id, return_index=True)
+        stops = np.append(starts[1:], len(self.item_id))
+        yield from zip(ids.tolist(), starts.tolist(), stops.tolist())
+
+
+def read_only_engine(db_url: str) -> Engine:
+    """Engine that can only read; SQLite files are opened with mode=ro."""
+    url = make_url(db_url)
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        return create_engine(
+            f"sqlite:///file:{url.database}?mode=ro&uri=true", connect_args={"uri": True}
+        )
+    return create_engine(db_url)
+
+
+def _column(values, dtype, missing):
+    return np.array([missing if v is None else v for v in values], dtype=dtype)
+
+
+def _unix_seconds(ts: datetime) -> int:
+    # Naive timestamps (SQLite, timestamp without time zone) are stored as UTC
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp())
+
+
+def load_shard(
+    engine: Engine,
+    start_id: int | None = None,
+    stop_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> SnapshotShard:
+    """Read snapshots with start_id <= item_id < stop_id and since <= timestamp <= until."""
+    statement = select(
+        ItemSnapshot.item_id,
+        ItemSnapshot.timestamp,
+        ItemSnapshot.avg_high_price,
+        ItemSnapshot.avg_low_price,
+        ItemSnapshot.high_price_volume,
+        ItemSnapshot.low_price_volume,
+    )
+    if start_id is not None:
+        statement = statement.where(ItemSnapshot.item_id >= start_id)
+    if stop_id is not None:
+        statement = statement.where(ItemSnapshot.item_id < stop_id)
+    if since is not None:
+        statement = statement.where(ItemSnapshot.timestamp >= since)
+    if until is not None:
+        statement = statement.where(ItemSnapshot.timestamp <= until)
+    statement = statement.order_by(ItemSnapshot.item_id, ItemSnapshot.timestamp)
+    chunks = []
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(statement)
+        for rows in result.partitions(CHUNK_ROWS):
+            columns = list(zip(*rows))
+            chunks.append(
+                (
+                    np.array(columns[0], dtype=np.int64),
+                    np.array([_unix_seconds(ts) for ts in columns[1]], dtype=np.int64),
+                    _column(columns[2], np.float64, np.nan),
+                    _column(columns[3], np.float64, np.nan),
+                    _column(columns[4], np.int64, 0),
+                    _column(columns[5], np.int64, 0),
+                )
+            )
+    if not chunks:
+        empty = np.empty(0, dtype=np.int64)
+        return SnapshotShard(empty, empty, np.empty(0), np.empty(0), empty, empty)
+    return SnapshotShard(*(np.concatenate(column) for column in zip(*chunks)))
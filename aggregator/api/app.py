@@ -0,0 +1,388 @@
+"""
+Read-only HTTP API over the aggregated GE data.
+
+Every response is cached in memory under the current ingest generation,
+which the ingester bumps only after a tick's price update, tick hooks
+(rankings, alchs, recipes, metrics) and snapshot writes have committed, so
+cached bodies are reused until new data lands and never served stale. Each
+response carries an ETag derived from the generation and the request so
+clients polling with If-None-Match get an empty 304 between ticks.
+
+/stream/prices pushes the per-tick diffs recorded by the ingester (see
+aggregator.db.price_updates) as server-sent events, one event per ingest
+generation with the generation as the event id, so clients resume with the
+standard Last-Event-ID header after a reconnect.
+
+Run with::
+
+    python -m aggregator.api --port 8000
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from aggregator.db import queries
+from aggregator.db.database import get_engine
+from aggregator.db.high_alch import top_alchs
+from aggregator.db.history import METHODS, chart_history
+from aggregator.db.price_updates import updates_since
+from aggregator.db.rankings import METRICS, RANKING_SIZE, top_ranked
+from aggregator.db.recipes import top_recipes
+from aggregator.models.item_model import Item
+from aggregator.util.metrics import metrics
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+CACHE_SIZE = 1024
+STREAM_POLL_SECONDS = 1.0
+STREAM_KEEPALIVE_SECONDS = 15.0
+MAX_CHART_WIDTH = 4000
+
+
+class BadRequest(Exception):
+    """Raised for invalid query parameters; rendered as a 400."""
+
+
+class ResponseCache:
+    """LRU of encoded bodies and their ETags, emptied whenever the generation changes."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self.generation: int | None = None
+        self._entries: OrderedDict[str, tuple[bytes, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, generation: int, key: str) -> tuple[bytes, str] | None:
+        with self._lock:
+            if generation != self.generation:
+                self._entries.clear()
+                self.generation = generation
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, generation: int, key: str, entry: tuple[bytes, str]) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def make_etag(generation: int, body: bytes) -> str:
+    return '"{}-{}"'.format(generation, hashlib.blake2b(body, digest_size=8).hexdigest())
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Whether an If-None-Match header names etag: a comma-separated list of
+    entity tags compared whole (weakly, so a W/ prefix is ignored) or "*".
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _int_param(request: Request, name: str, default: int, minimum: int = 0, maximum: int | None = None) -> int:
+    raw = request.query_params.get(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer") from None
+    if value < minimum or (maximum is not None and value > maximum):
+        raise BadRequest(f"{name} must be between {minimum} and {maximum}")
+    return value
+
+
+def _page(request: Request) -> tuple[int, int]:
+    limit = _int_param(request, "limit", DEFAULT_LIMIT, minimum=1, maximum=MAX_LIMIT)
+    offset = _int_param(request, "offset", 0)
+    return limit, offset
+
+
+def _paginated(rows: list, limit: int, offset: int) -> dict:
+    return {
+        "items": rows,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if len(rows) == limit else None,
+    }
+
+
+def _datetime_param(request: Request, name: str) -> datetime | None:
+    raw = request.query_params.get(name)
+    if raw is None:
+        return None
+    try:
+        return datetime.fromisoformat(raw)
+    except ValueError:
+        raise BadRequest(f"{name} must be an ISO 8601 timestamp") from None
+
+
+def item_json(item) -> dict:
+    data = item.model_dump()
+    data["margin"] = item.margin if item.high is not None and item.low is not None else None
+    return data
+
+
+def snapshot_json(snapshot) -> dict:
+    data = snapshot.model_dump(exclude={"id"})
+    data["timestamp"] = snapshot.timestamp.isoformat()
+    return data
+
+
+def top_margins(session: Session, request: Request):
+    limit, offset = _page(request)
+    min_volume = _int_param(request, "min_volume", 0)
+    rows = queries.top_margins(session, limit=limit, offset=offset, min_volume=min_volume)
+    return _paginated([item_json(i) for i in rows], limit, offset)
+
+
+def rankings(session: Session, request: Request):
+    metric = request.path_params["metric"]
+    if metric not in METRICS:
+        raise BadRequest(f"metric must be one of {', '.join(METRICS)}")
+    limit = _int_param(request, "limit", RANKING_SIZE, minimum=1, maximum=RANKING_SIZE)
+    rows = top_ranked(session, metric, limit=limit)
+    return {
+        "metric": metric,
+        "items": [{**item_json(item), "value": value} for item, value in rows],
+    }
+
+
+def alchs(session: Session, request: Request):
+    by = request.query_params.get("by", "profit")
+    if by not in ("profit", "potential_profit"):
+        raise BadRequest("by must be 'profit' or 'potential_profit'")
+    limit = _int_param(request, "limit", DEFAULT_LIMIT, minimum=1, maximum=MAX_LIMIT)
+    min_quantity = _int_param(request, "min_quantity", 1)
+    rows = top_alchs(session, limit=limit, min_quantity=min_quantity, by=by)
+    return {
+        "by": by,
+        "items": [
+            {**item_json(item), **alch.model_dump(exclude={"item_id", "highalch"})}
+            for item, alch in rows
+        ],
+    }
+
+
+def recipes(session: Session, request: Request):
+    kind = request.query_params.get("kind")
+    limit = _int_param(request, "limit", DEFAULT_LIMIT, minimum=1, maximum=MAX_LIMIT)
+    rows = top_recipes(session, kind=kind, limit=limit)
+    return {"kind": kind, "items": [r.model_dump() for r in rows]}
+
+
+def risk_adjusted(session: Session, request: Request):
+    limit, offset = _page(request)
+    min_fill = _int_param(request, "min_fill_per_hour", 0)
+    rows = queries.risk_adjusted_margins(session, min_fill, limit=limit, offset=offset)
+    items = [
+        {**item_json(item), "metrics": stats.model_dump(exclude={"item_id", "updated_at"}), "score": score}
+        for item, stats, score in rows
+    ]
+    return _paginated(items, limit, offset)
+
+
+def search_items(session: Session, request: Request):
+    text = request.query_params.get("q", "").strip()
+    if not text:
+        raise BadRequest("q is required")
+    limit, offset = _page(request)
+    rows = queries.find_items(session, text, limit=limit, offset=offset)
+    return _paginated([item_json(i) for i in rows], limit, offset)
+
+
+def get_item(session: Session, request: Request):
+    item = session.get(Item, request.path_params["item_id"])
+    if item is None:
+        return None
+    return item_json(item)
+
+
+def item_history(session: Session, request: Request):
+    limit, offset = _page(request)
+    rows = queries.item_history(
+        session,
+        request.path_params["item_id"],
+        start=_datetime_param(request, "start"),
+        end=_datetime_param(request, "end"),
+        limit=limit,
+        offset=offset,
+    )
+    return _paginated([snapshot_json(s) for s in rows], limit, offset)
+
+
+def item_chart(session: Session, request: Request):
+    method = request.query_params.get("method", "minmax")
+    if method not in METHODS:
+        raise BadRequest(f"method must be one of {', '.join(METHODS)}")
+    hours = _int_param(request, "hours", 24, minimum=1)
+    width = _int_param(request, "width", 800, minimum=10, maximum=MAX_CHART_WIDTH)
+    end = _datetime_param(request, "end") or datetime.now(timezone.utc)
+    return chart_history(
+        session, request.path_params["item_id"], end, timedelta(hours=hours), width, method
+    )
+
+
+def spikes(session: Session, request: Request):
+    side = request.query_params.get("side", "buy")
+    if side not in ("buy", "sell"):
+        raise BadRequest("side must be 'buy' or 'sell'")
+    window = _int_param(request, "window_minutes", 60, minimum=5)
+    try:
+        threshold = float(request.query_params.get("threshold", 0.1))
+    except ValueError:
+        raise BadRequest("threshold must be a number") from None
+    limit = _int_param(request, "limit", DEFAULT_LIMIT, minimum=1, maximum=MAX_LIMIT)
+    rows = queries.price_spikes(
+        session, side=side, window=timedelta(minutes=window), threshold=threshold, limit=limit
+    )
+    return {"side": side, "items": rows}
+
+
+def format_event(event_id: int, data, event: str = "prices") -> bytes:
+    """Encode one server-sent event."""
+    payload = json.dumps(data, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode()
+
+
+def _current_generation(engine) -> int:
+    with Session(engine or get_engine()) as session:
+        return queries.get_generation(session)
+
+
+def _poll_updates(engine, since: int, polled: int) -> tuple[int, dict[int, list[dict]]]:
+    """Current generation and the diffs after since, read only if the generation moved past polled."""
+    with Session(engine or get_engine()) as session:
+        generation = queries.get_generation(session)
+        if generation <= polled:
+            return generation, {}
+        return generation, updates_since(session, since, until=generation)
+
+
+async def price_events(
+    engine,
+    since: int | None = None,
+    poll_interval: float = STREAM_POLL_SECONDS,
+    keepalive: float = STREAM_KEEPALIVE_SECONDS,
+    is_disconnected=None,
+):
+    """
+    Yield encoded SSE frames for every generation after since (the current
+    generation when None). Only a cheap generation lookup runs per poll; the
+    diff rows are read once a new generation appears. since only moves past
+    generations whose rows were actually sent, so rows committed after their
+    generation became visible go out with the next one instead of being lost.
+    """
+    if since is None:
+        since = await run_in_threadpool(_current_generation, engine)
+    polled = since
+    yield b"retry: 5000\n\n"
+    last_sent = time.monotonic()
+    while not (is_disconnected and await is_disconnected()):
+        generation, batches = await run_in_threadpool(_poll_updates, engine, since, polled)
+        for event_id, rows in batches.items():
+            yield format_event(event_id, {"generation": event_id, "items": rows})
+            last_sent = time.monotonic()
+            since = event_id
+        polled = max(polled, generation)
+        if time.monotonic() - last_sent >= keepalive:
+            yield b": keepalive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(poll_interval)
+
+
+def create_app(
+    engine=None, cache_size: int = CACHE_SIZE, poll_interval: float = STREAM_POLL_SECONDS
+) -> Starlette:
+    """Build the API app; engine defaults to the shared ingester engine."""
+    cache = ResponseCache(cache_size)
+
+    def run_query(handler, request: Request) -> tuple[int, tuple[bytes, str] | None]:
+        with Session(engine or get_engine()) as session:
+            generation = queries.get_generation(session)
+            key = f"{request.url.path}?{request.url.query}"
+            entry = cache.get(generation, key)
+            if entry is not None:
+                metrics.inc("osrs_ge_api_cache_total", result="hit")
+                return generation, entry
+            metrics.inc("osrs_ge_api_cache_total", result="miss")
+            data = handler(session, request)
+            if data is None:
+                return generation, None
+            body = json.dumps(data, separators=(",", ":")).encode()
+            entry = (body, make_etag(generation, body))
+            cache.put(generation, key, entry)
+            return generation, entry
+
+    def endpoint(handler):
+        async def view(request: Request) -> Response:
+            try:
+                generation, entry = await run_in_threadpool(run_query, handler, request)
+            except BadRequest as e:
+                return JSONResponse({"error": str(e)}, status_code=400)
+            if entry is None:
+                return JSONResponse({"error": "not found"}, status_code=404)
+
+            body, etag = entry
+            headers = {"ETag": etag, "X-Ingest-Generation": str(generation)}
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+            return Response(body, media_type="application/json", headers=headers)
+
+        return view
+
+    async def stream_prices(request: Request) -> Response:
+        raw = request.headers.get("last-event-id") or request.query_params.get("since")
+        try:
+            since = int(raw) if raw is not None else None
+        except ValueError:
+            return JSONResponse({"error": "since must be an integer"}, status_code=400)
+        events = price_events(
+            engine, since, poll_interval, is_disconnected=request.is_disconnected
+        )
+        return StreamingResponse(
+            events,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    routes = [
+        Route("/stream/prices", stream_prices),
+        Route("/items/top-margins", endpoint(top_margins)),
+        Route("/items/search", endpoint(search_items)),
+        Route("/items/risk-adjusted", endpoint(risk_adjusted)),
+        Route("/rankings/{metric}", endpoint(rankings)),
+        Route("/items/{item_id:int}", endpoint(get_item)),
+        Route("/items/{item_id:int}/history", endpoint(item_history)),
+        Route("/items/{item_id:int}/chart", endpoint(item_chart)),
+        Route("/spikes", endpoint(spikes)),
+        Route("/alchs", endpoint(alchs)),
+        Route("/recipes", endpoint(recipes)),
+    ]
+    app = Starlette(routes=routes)
+    app.state.cache = cache
+    return app
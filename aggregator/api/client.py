@@ -0,0 +1,82 @@
+"""
+Minimal server-sent events client for /stream/prices, using only the
+standard library. Reconnects with Last-Event-ID so no tick is missed.
+
+    python -m aggregator.api.client http://127.0.0.1:8000/stream/prices
+"""
+
+import argparse
+import json
+import logging
+import time
+import urllib.request
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Event:
+    id: str | None
+    event: str
+    data: str
+
+    def json(self):
+        return json.loads(self.data)
+
+
+def parse_events(lines):
+    """Turn an iterable of decoded SSE lines into Events (comments are skipped)."""
+    event_id, name, data = None, "message", []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            if data:
+                yield Event(event_id, name, "\n".join(data))
+            name, data = "message", []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        value = value.removeprefix(" ")
+        if field == "id":
+            event_id = value
+        elif field == "event":
+            name = value
+        elif field == "data":
+            data.append(value)
+
+
+def subscribe(url: str, last_event_id: str | None = None, timeout: float = 60.0, retry: float = 5.0):
+    """Yield price events from url forever, resuming after dropped connections."""
+    while True:
+        request = urllib.request.Request(url, headers={"Accept": "text/event-stream"})
+        if last_event_id is not None:
+            request.add_header("Last-Event-ID", last_event_id)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                lines = (raw.decode() for raw in response)
+                for event in parse_events(lines):
+                    if event.id is not None:
+                        last_event_id = event.id
+                    yield event
+        except OSError as e:
+            logger.warning("Stream dropped (%s); reconnecting in %.0fs", e, retry)
+        time.sleep(retry)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Print live price updates.")
+    parser.add_argument("url", nargs="?", default="http://127.0.0.1:8000/stream/prices")
+    parser.add_argument("--since", help="resume after this generation")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for event in subscribe(args.url, args.since):
+        update = event.json()
+        print(f"generation {update['generation']}: {len(update['items'])} items changed")
+        for item in update["items"]:
+            print(f"  {item['id']}: high={item['high']} low={item['low']} vol={item['volume_24h']}")
+
+
+if __name__ == "__main__":
+    main()
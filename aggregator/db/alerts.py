@@ -0,0 +1,329 @@
+"""
+Price alerts evaluated at ingest time.
+
+Rules are declarative (a JSON file of AlertRule) with a condition written
+in a small expression language, for example::
+
+    {"rules": [
+        {"name": "whip flip", "items": [4151],
+         "condition": "margin > 200_000 and volume_24h > 1_000"},
+        {"name": "crash", "condition": "change(low, 15) < -0.10"}
+    ]}
+
+Conditions are Python expressions restricted (by walking their ast) to
+numbers, arithmetic, comparisons, and/or/not and these names:
+
+- Item fields: high, low, margin, roi, volume_24h, limit, highalch,
+  lowalch, value
+- latest 5m snapshot fields: avg_high_price, avg_low_price,
+  high_price_volume, low_price_volume
+- abs(), min(), max() and change(high|low|margin, minutes), the fractional
+  change of a field since `minutes` ago
+
+Each rule is compiled once. AlertEngine indexes rules by the item ids they
+name (rules without items apply to every item) and, as a tick hook,
+evaluates the rules of items whose row changed since the previous tick.
+Rules that read change() or snapshot fields can turn true while the row
+stays the same, so those run on every tick for their items. A rule fires
+when its condition becomes true for an item and re-arms once it is false
+again. Fired alerts go to the configured sinks: stdout
+and/or a webhook posted from a background thread, so a slow receiver never
+holds up ingest.
+"""
+
+import ast
+import json
+import logging
+import queue
+import threading
+import time
+import urllib.request
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlmodel import Session
+
+from aggregator.db.database import get_engine
+from aggregator.db.watchlist import sparklines
+from aggregator.models.alert import AlertRule, AlertRuleBook
+from aggregator.util.margin import ge_margin
+from aggregator.util.metrics import metrics
+
+ALERT_RULES_ENV = "OSRS_GE_ALERT_RULES"
+ALERT_WEBHOOK_ENV = "OSRS_GE_ALERT_WEBHOOK"
+ITEM_FIELDS = ("high", "low", "margin", "roi", "volume_24h", "limit", "highalch", "lowalch", "value")
+SNAPSHOT_FIELDS = ("avg_high_price", "avg_low_price", "high_price_volume", "low_price_volume")
+HISTORY_FIELDS = ("high", "low", "margin")
+FUNCTIONS = {"abs": abs, "min": min, "max": max}
+SNAPSHOT_MAX_AGE_MINUTES = 60
+WEBHOOK_TIMEOUT = 5.0
+
+logger = logging.getLogger(__name__)
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Compare, ast.Lt, ast.LtE, ast.Gt,
+    ast.GtE, ast.Eq, ast.NotEq, ast.Name, ast.Load, ast.Constant, ast.Call,
+)  # fmt: skip
+
+
+@dataclass
+class CompiledRule:
+    rule: AlertRule
+    code: object
+    names: frozenset[str]
+    uses_snapshot: bool
+    history_minutes: float  # longest change() window, 0 if none
+
+
+@dataclass
+class Alert:
+    rule: str
+    item_id: int
+    name: str
+    values: dict
+    fired_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def message(self) -> str:
+        shown = ", ".join(f"{k}={v}" for k, v in self.values.items())
+        return f"[{self.fired_at:%H:%M:%S}] {self.rule}: {self.name} ({self.item_id}) {shown}"
+
+
+class _ChangeArgs(ast.NodeTransformer):
+    """Turn change(high, 15) into change("high", 15) so the field is passed by name."""
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Name) and node.func.id == "change":
+            node.args[0] = ast.copy_location(ast.Constant(node.args[0].id), node.args[0])
+        return node
+
+
+def compile_rule(rule: AlertRule) -> CompiledRule:
+    """Validate and compile a rule's condition; raises ValueError if it is not allowed."""
+    try:
+        tree = ast.parse(rule.condition, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Rule {rule.name!r}: invalid condition: {e.msg}") from None
+    names, windows = set(), [0.0]
+    callees = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Rule {rule.name!r}: {type(node).__name__} is not allowed")
+        if isinstance(node, ast.Constant) and type(node.value) not in (int, float):
+            raise ValueError(f"Rule {rule.name!r}: only numeric constants are allowed")
+        if isinstance(node, ast.Call):
+            func = node.func.id if isinstance(node.func, ast.Name) else None
+            if node.keywords or (func not in FUNCTIONS and func != "change"):
+                raise ValueError(f"Rule {rule.name!r}: unknown function")
+            if func == "change":
+                field_arg, minutes = (node.args + [None, None])[:2]
+                if (
+                    len(node.args) != 2
+                    or not isinstance(field_arg, ast.Name)
+                    or field_arg.id not in HISTORY_FIELDS
+                    or not isinstance(minutes, ast.Constant)
+                    or type(minutes.value) not in (int, float)
+                    or minutes.value <= 0
+                ):
+                    raise ValueError(
+                        f"Rule {rule.name!r}: change() takes one of "
+                        f"{', '.join(HISTORY_FIELDS)} and a positive number of minutes"
+                    )
+                windows.append(float(minutes.value))
+        elif isinstance(node, ast.Name) and id(node) not in callees:
+            if node.id not in ITEM_FIELDS and node.id not in SNAPSHOT_FIELDS:
+                raise ValueError(f"Rule {rule.name!r}: unknown name {node.id!r}")
+            names.add(node.id)
+    tree = ast.fix_missing_locations(_ChangeArgs().visit(tree))
+    return CompiledRule(
+        rule=rule,
+        code=compile(tree, f"<rule {rule.name}>", "eval"),
+        names=frozenset(names),
+        uses_snapshot=bool(names & set(SNAPSHOT_FIELDS)),
+        history_minutes=max(windows),
+    )
+
+
+def load_rules(path) -> list[AlertRule]:
+    """Read and validate an alert rule file."""
+    return AlertRuleBook.model_validate(json.loads(Path(path).read_text())).rules
+
+
+def item_values(item) -> dict:
+    """Item fields visible to conditions; margin and roi are None without both prices."""
+    priced = item.high is not None and item.low is not None
+    margin = ge_margin(item.high, item.low) if priced else None
+    return {
+        "high": item.high,
+        "low": item.low,
+        "margin": margin,
+        "roi": margin / item.low if priced and item.low else None,
+        "volume_24h": item.volume_24h,
+        "limit": item.limit,
+        "highalch": item.highalch,
+        "lowalch": item.lowalch,
+        "value": item.value,
+    }
+
+
+def stdout_sink(alerts: list[Alert]) -> None:
+    for alert in alerts:
+        print(alert.message())
+
+
+class WebhookSink:
+    """POST each tick's alerts as JSON to url, from a background thread."""
+
+    def __init__(self, url: str, timeout: float = WEBHOOK_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="alert-webhook", daemon=True)
+        self._thread.start()
+
+    def __call__(self, alerts: list[Alert]) -> None:
+        self._queue.put([{**asdict(a), "fired_at": a.fired_at.isoformat()} for a in alerts])
+
+    def _run(self) -> None:
+        while (payload := self._queue.get()) is not None:
+            request = urllib.request.Request(
+                self.url,
+                data=json.dumps({"alerts": payload}).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).close()
+            except OSError as e:
+                metrics.inc("osrs_ge_alert_webhook_errors_total")
+                logger.warning("Alert webhook failed: %r", e)
+            finally:
+                self._queue.task_done()
+
+    def close(self) -> None:
+        """Deliver everything queued, then stop the thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+
+class AlertEngine:
+    """Indexed, incremental rule evaluator and tick hook."""
+
+    def __init__(self, rules: list[AlertRule], sinks=(stdout_sink,), engine=None):
+        self.rules = [compile_rule(rule) for rule in rules]
+        self.sinks = list(sinks)
+        self.engine = engine
+        self.by_item: dict[int, list[int]] = {}
+        self.any_item: list[int] = []
+        for index, compiled in enumerate(self.rules):
+            if compiled.rule.items:
+                for item_id in dict.fromkeys(compiled.rule.items):
+                    self.by_item.setdefault(item_id, []).append(index)
+            else:
+                self.any_item.append(index)
+        # Rules whose inputs change without the item row changing; never skipped
+        self.every_tick = {
+            item_id: [i for i in indexes if self._every_tick(i)] for item_id, indexes in self.by_item.items()
+        }
+        self.every_tick_any = [i for i in self.any_item if self._every_tick(i)]
+        # Price history is kept only for items some change() rule can look at
+        self.history_seconds = 60 * max((r.history_minutes for r in self.rules), default=0)
+        self.history_all = any(self.rules[i].history_minutes for i in self.any_item)
+        self.history_items = {
+            item_id
+            for item_id, indexes in self.by_item.items()
+            if any(self.rules[i].history_minutes for i in indexes)
+        }
+        self.history: dict[int, deque] = {}
+        self.previous: dict[int, tuple] = {}
+        self.active: set[tuple[int, int]] = set()
+
+    def _every_tick(self, index: int) -> bool:
+        return bool(self.rules[index].history_minutes or self.rules[index].uses_snapshot)
+
+    def _record_history(self, item_id: int, values: dict, now: float) -> None:
+        samples = self.history.setdefault(item_id, deque())
+        samples.append((now, tuple(values[f] for f in HISTORY_FIELDS)))
+        # Keep the newest sample at least history_seconds old as the reference point
+        while len(samples) > 1 and samples[1][0] <= now - self.history_seconds:
+            samples.popleft()
+
+    def change(self, item_id: int, values: dict, name: str, minutes: float, now: float) -> float | None:
+        """Fractional change of a field since minutes ago; None without enough history."""
+        cutoff = now - 60 * minutes
+        past = None
+        for at, sample in reversed(self.history.get(item_id, ())):
+            if at <= cutoff:
+                past = sample[HISTORY_FIELDS.index(name)]
+                break
+        current = values[name]
+        if past is None or current is None or past == 0:
+            return None
+        return (current - past) / abs(past)
+
+    def _snapshots(self, item_ids: list[int], now: float) -> dict[int, dict]:
+        if not item_ids:
+            return {}
+        since = datetime.fromtimestamp(now - 60 * SNAPSHOT_MAX_AGE_MINUTES, timezone.utc)
+        with Session(self.engine or get_engine()) as session:
+            latest = sparklines(session, item_ids, points=1, since=since)
+        return {
+            item_id: {f: getattr(rows[-1], f) if rows else None for f in SNAPSHOT_FIELDS}
+            for item_id, rows in latest.items()
+        }
+
+    def evaluate(self, items, now: float | None = None) -> list[Alert]:
+        """
+        Evaluate the rules touched by items that changed, plus change() and
+        snapshot rules for every item; return newly fired alerts.
+        """
+        now = time.time() if now is None else now
+        touched = []
+        for item in items:
+            values = item_values(item)
+            if self.history_seconds and (self.history_all or item.id in self.history_items):
+                self._record_history(item.id, values, now)
+            row = tuple(values.values())
+            if self.previous.get(item.id) == row:
+                indexes = self.every_tick.get(item.id, []) + self.every_tick_any
+            else:
+                self.previous[item.id] = row
+                indexes = self.by_item.get(item.id, []) + self.any_item
+            if indexes:
+                touched.append((item, values, indexes))
+
+        need_snapshots = [
+            item.id for item, _, indexes in touched if any(self.rules[i].uses_snapshot for i in indexes)
+        ]
+        snapshots = self._snapshots(need_snapshots, now)
+
+        alerts = []
+        for item, values, indexes in touched:
+            env = {**FUNCTIONS, **values, **snapshots.get(item.id, dict.fromkeys(SNAPSHOT_FIELDS))}
+            env["change"] = lambda name, minutes, item_id=item.id, values=values: self.change(
+                item_id, values, name, minutes, now
+            )
+            for index in indexes:
+                compiled = self.rules[index]
+                try:
+                    matched = bool(eval(compiled.code, {"__builtins__": {}}, env))
+                except (TypeError, ZeroDivisionError):  # a referenced value is missing
+                    matched = False
+                key = (index, item.id)
+                if not matched:
+                    self.active.discard(key)
+                elif key not in self.active:
+                    self.active.add(key)
+                    shown = {n: env[n] for n in sorted(compiled.names)}
+                    alerts.append(Alert(compiled.rule.name, item.id, item.name, shown))
+        return alerts
+
+    def __call__(self, items) -> int:
+        alerts = self.evaluate(items)
+        if alerts:
+            metrics.inc("osrs_ge_alerts_total", len(alerts))
+            for sink in self.sinks:
+                sink(alerts)
+        return len(alerts)
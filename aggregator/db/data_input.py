@@ -6,12 +6,56 @@ from aggregator.models.data_models import (
     LatestData,
     Volume24h,
     Volume5m,
+    Volume5mItem,
 )
+from aggregator.analytics.item_metrics import ITEM_METRICS_ENV, ItemMetricsStage
+from aggregator.db.alerts import (
+    ALERT_RULES_ENV,
+    ALERT_WEBHOOK_ENV,
+    AlertEngine,
+    WebhookSink,
+    load_rules,
+    stdout_sink,
+)
+from aggregator.db.database import get_engine
+from aggregator.db.price_updates import RECORD_UPDATES_ENV, PriceUpdateRecorder
+from aggregator.db.queries import bump_generation, stored_volumes
+from aggregator.db.rankings import RANKING_SIZE, TopKIndex
+from aggregator.db.recipes import DEFAULT_RECIPES, RecipeEvaluator, load_recipes
+from aggregator.db.high_alch import AlchScanner
+from aggregator.db.journal import JOURNAL_ENV, PayloadJournal, read_journal
+from aggregator.db.shared_prices import SHM_NAME_ENV, SharedPriceWriter
+from aggregator.db.storage import get_storage
+from aggregator.util.metrics import metrics, start_metrics_server
+from aggregator.util.circuit_breaker import CircuitBreaker, backoff_delay
+from aggregator.util.profiling import PROFILE_CYCLES, PROFILE_ENV, profile_call
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import Session
+import argparse
+import json
+import logging
+import os
 import requests
 import time
 
+try:  # optional, enables incremental decoding of large payloads
+    import ijson
+
+    STREAM_ERRORS = (ValueError, requests.RequestException, ijson.JSONError)
+except ImportError:
+    ijson = None
+    STREAM_ERRORS = (ValueError, requests.RequestException)
+
+try:  # optional, lets urllib3 decode brotli responses
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
 
 LATEST_API_URL = "https://prices.runescape.wiki/api/v1/osrs/latest"
 MAPPING_API_URL = "https://prices.runescape.wiki/api/v1/osrs/mapping"
@@ -21,43 +65,273 @@ VOLUME_5M_API_URL = "https://prices.runescape.wiki/api/v1/osrs/5m"
 HEADERS = {
     "User-Agent": "@PapaBear#2007",
     "From": "dev@jade.rip",
+    "Accept-Encoding": ACCEPT_ENCODING,
 }
-DB_FILE = "sqlite:///item_data.db"
 
-engine = create_engine(DB_FILE)
-session = Session(engine)
-SQLModel.metadata.create_all(engine)
+INTERVAL_SECONDS = 60
+SNAPSHOT_EVERY = 5  # ticks between ItemSnapshot writes
+RANKING_SIZE_ENV = "OSRS_GE_RANKING_SIZE"
+METRICS_PORT_ENV = "OSRS_GE_METRICS_PORT"
+# Set to 1 to decode /mapping and /5m incrementally instead of buffering them
+STREAM_DECODE = os.environ.get("OSRS_GE_STREAM_DECODE") == "1"
+SNAPSHOT_BATCH_SIZE = 1000
 
+# (connect, read) timeouts in seconds so a hung socket can't stall a tick
+REQUEST_TIMEOUT = (5, 30)
+# Seconds a tick waits for its fetches; slower ones are picked up next tick
+TICK_DEADLINE = 40.0
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_breakers: dict[str, CircuitBreaker] = {}
+# Raw payload journal, see set_journal()
+_journal: PayloadJournal | None = None
+# Callables run with the list of written Items after every price update
+_tick_hooks: list = []
+
+logger = logging.getLogger(__name__)
+
+
+class FetchError(Exception):
+    """Raised when an API endpoint could not be fetched."""
+
+
+class CircuitOpenError(FetchError):
+    """Raised without a request when an endpoint's circuit breaker is open."""
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    """Return the circuit breaker for an endpoint, creating it on first use."""
+    return _breakers.setdefault(endpoint, CircuitBreaker())
+
+
+def reset_breakers() -> None:
+    """Forget the state of every circuit breaker."""
+    _breakers.clear()
+
+
+def set_journal(journal: PayloadJournal | None) -> None:
+    """Record every raw payload fetched by fetch_data into journal (None to stop)."""
+    global _journal
+    _journal = journal
+
+
+def add_tick_hook(hook) -> None:
+    """Call hook(items) with the Items written after every price update."""
+    _tick_hooks.append(hook)
+
+
+def clear_tick_hooks() -> None:
+    _tick_hooks.clear()
+
+
+def run_tick_hooks(items: list[Item]) -> None:
+    """Run every tick hook, isolating failures so one hook can't break another."""
+    for hook in list(_tick_hooks):
+        name = getattr(hook, "__name__", type(hook).__name__)
+        try:
+            with metrics.timer("osrs_ge_hook_seconds", hook=name):
+                hook(items)
+        except Exception:
+            metrics.inc("osrs_ge_hook_errors_total", hook=name)
+            logger.exception("Tick hook %s failed", name)
 
-def fetch_data(api_url) -> dict:
-    response = requests.get(api_url, headers=HEADERS)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"Failed to fetch data: {response.status_code}")
+
+def endpoint_name(api_url: str) -> str:
+    """Short label for an API URL, e.g. "latest" or "5m"."""
+    return api_url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def _get(api_url: str, endpoint: str, retries: int, stream: bool = False):
+    """
+    GET api_url, retrying timeouts, connection errors and retryable statuses
+    with jittered exponential backoff. Returns the 200 response.
+    """
+    for attempt in range(retries + 1):
+        try:
+            with metrics.timer("osrs_ge_fetch_seconds", endpoint=endpoint):
+                response = requests.get(
+                    api_url, headers=HEADERS, timeout=REQUEST_TIMEOUT, stream=stream
+                )
+        except requests.RequestException as e:
+            metrics.inc(
+                "osrs_ge_fetch_errors_total", endpoint=endpoint, status=type(e).__name__
+            )
+            error = FetchError(f"Failed to fetch data: {e}")
+        else:
+            if response.status_code == 200:
+                return response
+            metrics.inc(
+                "osrs_ge_fetch_errors_total",
+                endpoint=endpoint,
+                status=response.status_code,
+            )
+            error = FetchError(f"Failed to fetch data: {response.status_code}")
+            if response.status_code not in RETRY_STATUSES:
+                break
+        if attempt < retries:
+            metrics.inc("osrs_ge_fetch_retries_total", endpoint=endpoint)
+            time.sleep(backoff_delay(attempt))
+    raise error
+
+
+def _guarded(endpoint: str):
+    """Return the endpoint's breaker, failing fast if it is open."""
+    breaker = get_breaker(endpoint)
+    if not breaker.allow():
+        metrics.inc("osrs_ge_circuit_open_total", endpoint=endpoint)
+        raise CircuitOpenError(f"Circuit open for {endpoint}, skipping fetch")
+    return breaker
+
+
+def fetch_data(api_url, retries: int = MAX_RETRIES) -> dict:
+    """
+    GET api_url and decode the JSON body. Timeouts, connection errors and
+    retryable statuses are retried with jittered exponential backoff; once
+    the endpoint keeps failing its circuit breaker opens and calls fail fast
+    with CircuitOpenError until it cools down.
+    """
+    endpoint = endpoint_name(api_url)
+    breaker = _guarded(endpoint)
+    try:
+        response = _get(api_url, endpoint, retries)
+        with metrics.timer("osrs_ge_decode_seconds", endpoint=endpoint):
+            data = response.json()
+    except ValueError as e:
+        breaker.record_failure()
+        raise FetchError(f"Failed to decode data: {e}") from e
+    except FetchError:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    size = len(response.content)
+    metrics.inc("osrs_ge_fetch_bytes_total", size, endpoint=endpoint)
+    metrics.set("osrs_ge_payload_bytes", size, endpoint=endpoint)
+    if _journal is not None:
+        _journal.append(endpoint, response.content)
+    return data
+
+
+def stream_json(api_url, prefix: str, pairs: bool = False, retries: int = MAX_RETRIES):
+    """
+    Yield the elements under prefix (ijson syntax, e.g. "item" for a
+    top-level list or "data" with pairs=True for (key, value) tuples of a
+    top-level object) while the body is still downloading, so the full
+    payload is never held in memory. Falls back to a buffered decode when
+    ijson is not installed. With a journal set, the raw bytes are journaled
+    as they arrive (see PayloadJournal.stream).
+    """
+    endpoint = endpoint_name(api_url)
+    breaker = _guarded(endpoint)
+    ok = True
+    try:
+        response = _get(api_url, endpoint, retries, stream=True)
+        with response, _journal_stream(endpoint) as journal_write:
+            # Let urllib3 undo gzip/br so the parser sees plain JSON
+            response.raw.decode_content = True
+            counted = _CountingReader(response.raw, journal_write)
+            with metrics.timer("osrs_ge_stream_seconds", endpoint=endpoint):
+                if ijson is not None:
+                    parse = ijson.kvitems if pairs else ijson.items
+                    yield from parse(counted, prefix)
+                else:
+                    data = json.load(counted)
+                    for key in prefix.split("."):
+                        if key != "item":  # "item" is ijson's list element marker
+                            data = data[key]
+                    yield from (data.items() if pairs else data)
+        metrics.inc("osrs_ge_fetch_bytes_total", counted.bytes_read, endpoint=endpoint)
+        metrics.set("osrs_ge_payload_bytes", counted.bytes_read, endpoint=endpoint)
+    except FetchError:
+        ok = False
+        raise
+    except STREAM_ERRORS as e:
+        ok = False
+        raise FetchError(f"Failed to stream data: {e}") from e
+    finally:
+        # Also runs when the consumer stops early or raises (GeneratorExit), so
+        # a half-open breaker always learns the outcome of its trial call
+        if ok:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+
+def _journal_stream(endpoint: str):
+    """The journal's stream writer for endpoint, or a no-op without a journal."""
+    if _journal is None:
+        return nullcontext()
+    return _journal.stream(endpoint)
+
+
+class _CountingReader:
+    """
+    File-like wrapper that counts decoded bytes read from a stream and
+    passes every chunk to tee (if given).
+    """
+
+    def __init__(self, raw, tee=None):
+        self.raw = raw
+        self.tee = tee
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        self.bytes_read += len(chunk)
+        if self.tee is not None:
+            self.tee(chunk)
+        return chunk
 
 
 # TODO make nice
 
 
+def parse_mapping(data) -> MappingList:
+    return MappingList(items=[MappingData(**item) for item in data])
+
+
+def parse_latest(data) -> LatestData:
+    return LatestData(**data)
+
+
+def parse_volume(data) -> Volume24h:
+    return Volume24h(**data)
+
+
+def parse_volume5m(data) -> Volume5m:
+    return Volume5m.model_validate(data)
+
+
 def mapping_wrapper() -> MappingList:
+    if STREAM_DECODE:
+        return parse_mapping(stream_json(MAPPING_API_URL, "item"))
     data = fetch_data(MAPPING_API_URL)
-    return MappingList(items=[MappingData(**item) for item in data])
+    with metrics.timer("osrs_ge_validate_seconds", endpoint="mapping"):
+        return parse_mapping(data)
 
 
 def latest_wrapper() -> LatestData:
     data = fetch_data(LATEST_API_URL)
-    return LatestData(**data)
+    with metrics.timer("osrs_ge_validate_seconds", endpoint="latest"):
+        return parse_latest(data)
 
 
 def volume_wrapper() -> Volume24h:
     data = fetch_data(VOLUME_API_URL)
-    return Volume24h(**data)
+    with metrics.timer("osrs_ge_validate_seconds", endpoint="volumes"):
+        return parse_volume(data)
+
+
+def stream_volume5m_items():
+    """Yield (item id, Volume5mItem) pairs from /5m as they are decoded."""
+    for item_id, item in stream_json(VOLUME_5M_API_URL, "data", pairs=True):
+        yield item_id, Volume5mItem.model_validate(item)
 
 
 def volume5m_wrapper() -> Volume5m:
     data = fetch_data(VOLUME_5M_API_URL)
-    return Volume5m.model_validate(data)
+    with metrics.timer("osrs_ge_validate_seconds", endpoint="5m"):
+        return parse_volume5m(data)
 
 
 def fetch_all_data() -> tuple[MappingList, LatestData, Volume24h, Volume5m]:
@@ -70,22 +344,80 @@ def fetch_all_data() -> tuple[MappingList, LatestData, Volume24h, Volume5m]:
     return mapping_data, latest_data, volume_data, volume_5m_data
 
 
-def update_database(latest_data, mapping_data, volume_data):
-    """Update the database with the latest item data."""
+@dataclass
+class IngestState:
+    """
+    Last successfully fetched payload per endpoint, reused when a fetch fails,
+    and the fetches that overran a previous tick's deadline.
+    """
 
-    def update_database_inner(latest_data, mapping_data, volume_data):
-        # Build mapping from item id to MappingData
-        mapping_dict = {item.id: item for item in mapping_data.items}
-        # Volume data is Dict[str, int], keys are string ids
-        volume_dict = volume_data.data
-
-        for item_id, prices in latest_data.data.items():
-            mapping_info = mapping_dict.get(item_id)
-            if not mapping_info:
-                continue  # skip items not in mapping
-            volume_info = volume_dict.get(str(item_id), 0)
-            # Create Item object (adjust fields as needed)
-            item = Item(
+    mapping: MappingList | None = None
+    latest: LatestData | None = None
+    volume: Volume24h | None = None
+    volume_5m: Volume5m | None = None
+    pending: dict[str, Future] = field(default_factory=dict)
+
+
+def fetch_tick_data(
+    state: IngestState, include_5m: bool = True, deadline: float = TICK_DEADLINE
+) -> dict[str, bool]:
+    """
+    Fetch every endpoint concurrently and wait at most deadline seconds, so
+    a slow or failing endpoint only degrades itself. Successful results
+    replace the ones in state; failed or unfinished endpoints keep their
+    last-known value. An unfinished fetch is not restarted: the next tick
+    waits on it again. Returns which endpoints are fresh.
+
+    The fetches run in worker threads, which cProfile (--profile) does not
+    see; their time shows up in the osrs_ge_fetch_seconds metrics instead.
+    """
+    wrappers = {
+        "mapping": mapping_wrapper,
+        "latest": latest_wrapper,
+        "volume": volume_wrapper,
+    }
+    if include_5m:
+        wrappers["volume_5m"] = volume5m_wrapper
+    fresh = {"volume_5m": False}
+    pool = ThreadPoolExecutor(max_workers=len(wrappers))
+    futures = {
+        name: state.pending.pop(name, None) or pool.submit(wrapper)
+        for name, wrapper in wrappers.items()
+    }
+    # Don't wait for stragglers on the way out; they finish in the background
+    pool.shutdown(wait=False)
+    wait(futures.values(), timeout=deadline)
+    for name, future in futures.items():
+        fresh[name] = False
+        if not future.done():
+            state.pending[name] = future
+            metrics.inc("osrs_ge_degraded_total", endpoint=name)
+            logger.warning("Fetching %s overran the tick; using last known data", name)
+            continue
+        try:
+            setattr(state, name, future.result())
+            fresh[name] = True
+        except Exception as e:
+            metrics.inc("osrs_ge_degraded_total", endpoint=name)
+            logger.warning("Fetching %s failed (%s); using last known data", name, e)
+    return fresh
+
+
+def build_items(latest_data, mapping_data, volume_data) -> list[Item]:
+    """Join latest prices with mapping metadata and 24h volumes into Items."""
+    # Build mapping from item id to MappingData
+    mapping_dict = {item.id: item for item in mapping_data.items}
+    # Volume data is Dict[str, int], keys are string ids
+    volume_dict = volume_data.data
+
+    items = []
+    for item_id, prices in latest_data.data.items():
+        mapping_info = mapping_dict.get(item_id)
+        if not mapping_info:
+            continue  # skip items not in mapping
+        volume_info = volume_dict.get(str(item_id), 0)
+        items.append(
+            Item(
                 id=item_id,
                 name=mapping_info.name,
                 examine=mapping_info.examine,
@@ -101,46 +433,354 @@ def update_database(latest_data, mapping_data, volume_data):
                 lowTime=prices.lowTime,
                 volume_24h=volume_info,
             )
-            session.merge(item)
-        session.commit()
+        )
+    return items
+
+
+def update_database(latest_data, mapping_data, volume_data, engine=None):
+    """
+    Update the database (engine, default: the shared one) with the latest
+    item data. With volume_data None (no /volumes payload yet) every item
+    keeps its stored 24h volume.
+    """
+
+    def update_database_inner(latest_data, mapping_data, volume_data):
+        bind = engine or get_engine()
+        with Session(bind) as session:
+            if volume_data is None:
+                volume_data = Volume24h(data=stored_volumes(session))
+            with metrics.timer("osrs_ge_join_seconds"):
+                items = build_items(latest_data, mapping_data, volume_data)
+            with metrics.timer("osrs_ge_write_seconds", table="item"):
+                get_storage(bind).upsert_items(session, items)
+            with metrics.timer("osrs_ge_commit_seconds", table="item"):
+                session.commit()
+        metrics.inc("osrs_ge_rows_written_total", len(items), table="item")
+        metrics.set("osrs_ge_rows_written", len(items), table="item")
+        return items
 
     return update_database_inner
 
 
-def save_volume5m_to_db(volume_5m_data: Volume5m, engine):
+def save_volume5m_to_db(volume_5m_data: Volume5m, engine, timestamp: datetime | None = None):
     """Save Volume5m pydantic model data to ItemSnapshot SQLModel table."""
-    now = datetime.now(timezone.utc)
+    return save_volume5m_stream(volume_5m_data.data.items(), engine, timestamp=timestamp)
+
+
+def save_volume5m_stream(
+    items, engine, batch_size: int = SNAPSHOT_BATCH_SIZE, timestamp: datetime | None = None
+) -> int:
+    """
+    Write (item id, Volume5mItem) pairs to the ItemSnapshot table as they
+    arrive, flushing every batch_size rows so a streamed payload never has
+    to be held in memory. Rows are stamped with timestamp (default: now).
+    Returns the number of rows written.
+    """
+    now = timestamp or datetime.now(timezone.utc)
+    storage = get_storage(engine)
+    rows = 0
+    batch = []
     with Session(engine) as session:
-        for item_id, item_data in volume_5m_data.data.items():
-            high_vol = item_data.highPriceVolume or 0
-            low_vol = item_data.lowPriceVolume or 0
-            total_vol = high_vol + low_vol
-            record = ItemSnapshot(
-                item_id=int(item_id),
-                timestamp=now,
-                avg_high_price=item_data.avgHighPrice,
-                high_price_volume=high_vol,
-                avg_low_price=item_data.avgLowPrice,
-                low_price_volume=low_vol,
-                total_volume=total_vol,
-            )
-            session.add(record)
+        with metrics.timer("osrs_ge_write_seconds", table="itemsnapshot"):
+            for item_id, item_data in items:
+                high_vol = item_data.highPriceVolume or 0
+                low_vol = item_data.lowPriceVolume or 0
+                total_vol = high_vol + low_vol
+                record = ItemSnapshot(
+                    item_id=int(item_id),
+                    timestamp=now,
+                    avg_high_price=item_data.avgHighPrice,
+                    high_price_volume=high_vol,
+                    avg_low_price=item_data.avgLowPrice,
+                    low_price_volume=low_vol,
+                    total_volume=total_vol,
+                )
+                batch.append(record)
+                rows += 1
+                if len(batch) == batch_size:
+                    storage.write_snapshots(session, batch)
+                    batch = []
+            if batch:
+                storage.write_snapshots(session, batch)
+        with metrics.timer("osrs_ge_commit_seconds", table="itemsnapshot"):
+            session.commit()
+    metrics.inc("osrs_ge_rows_written_total", rows, table="itemsnapshot")
+    metrics.set("osrs_ge_rows_written", rows, table="itemsnapshot")
+    return rows
+
+
+def publish_generation(engine) -> None:
+    """
+    Bump the ingest generation in its own transaction. Called once all of a
+    tick's writes (items, tick hooks, snapshots) have committed, so anything
+    cached under the new generation (API responses, page caches) or streamed
+    for it (price diffs) is read after the data it stands for.
+    """
+    with Session(engine) as session:
+        bump_generation(session)
         session.commit()
 
 
-# Remove ingest_api_data function
+def run_tick(run_count: int, engine, state: IngestState) -> None:
+    """
+    Fetch every endpoint once and write the results. Prices are only written
+    when /latest is fresh; mapping and 24h volumes fall back to their last
+    known values. Snapshots are only written from a fresh /5m payload, which
+    is only fetched on snapshot ticks; with STREAM_DECODE it is streamed
+    straight into the ItemSnapshot table. The generation is bumped last,
+    after the tick hooks and snapshot writes.
+    """
+    snapshot_tick = run_count % SNAPSHOT_EVERY == 0
+    fresh = fetch_tick_data(state, include_5m=snapshot_tick and not STREAM_DECODE)
+    wrote = False
+    if fresh["latest"] and state.mapping is not None:
+        update_database_inner = update_database(state.latest, state.mapping, state.volume)
+        items = update_database_inner(state.latest, state.mapping, state.volume)
+        logger.info("Data saved successfully!")
+        run_tick_hooks(items)
+        wrote = True
+    else:
+        logger.warning("Skipping price update: no fresh /latest data")
+    if snapshot_tick and STREAM_DECODE:
+        try:
+            save_volume5m_stream(stream_volume5m_items(), engine)
+            logger.info("ItemVolume5m table updated!")
+            wrote = True
+        except FetchError as e:
+            metrics.inc("osrs_ge_degraded_total", endpoint="volume_5m")
+            logger.warning("Streaming volume_5m failed (%s); skipping snapshot", e)
+    elif snapshot_tick and fresh["volume_5m"]:
+        save_volume5m_to_db(state.volume_5m, engine)
+        logger.info("ItemVolume5m table updated!")
+        wrote = True
+    if wrote:
+        publish_generation(engine)
 
-# Run main every minute if this script is executed directly
-if __name__ == "__main__":
+
+def run_ingest(cycles: int | None = None, interval: float = INTERVAL_SECONDS) -> None:
+    """
+    Run the ingest loop on a fixed schedule. Runs forever unless cycles is
+    given. Ticks that overrun the interval are reported as loop lag.
+    """
+    engine = get_engine()
+    state = IngestState()
     run_count = 0
-    while True:
-        mapping_data, latest_data, volume_data, volume_5m_data = fetch_all_data()
-        update_database_inner = update_database(latest_data, mapping_data, volume_data)
-        update_database_inner(latest_data, mapping_data, volume_data)
-        if run_count % 5 == 0:
-            save_volume5m_to_db(volume_5m_data, engine)
-            print("ItemVolume5m table updated!")
-        print("Data saved successfully!")
-        print("Waiting 60 seconds for next run...")
+    next_tick = time.monotonic()
+    while cycles is None or run_count < cycles:
+        metrics.set("osrs_ge_loop_lag_seconds", max(0.0, time.monotonic() - next_tick))
+        try:
+            with metrics.timer("osrs_ge_tick_seconds"):
+                run_tick(run_count, engine, state)
+        except Exception:
+            # Never let one bad tick kill the ingester
+            metrics.inc("osrs_ge_tick_errors_total")
+            logger.exception("Tick failed")
+        metrics.inc("osrs_ge_ticks_total")
         run_count += 1
-        time.sleep(60)
+        if cycles is not None and run_count >= cycles:
+            break
+        next_tick += interval
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            logger.info("Waiting %.0f seconds for next run...", delay)
+            time.sleep(delay)
+        else:
+            next_tick = time.monotonic()  # overran, don't try to catch up
+
+
+def replay_journal(path, engine=None) -> dict:
+    """
+    Feed journaled payloads through the same write path as the live loop,
+    as fast as possible. Every /latest payload triggers a price update using
+    the most recent mapping and 24h volumes seen so far, followed by the
+    registered tick hooks so derived tables are rebuilt too; every /5m
+    payload is written as snapshots stamped with its original fetch time.
+    /latest payloads journaled before any /mapping are counted as skipped.
+    """
+    engine = engine or get_engine()
+    parsers = {
+        "mapping": parse_mapping,
+        "latest": parse_latest,
+        "volumes": parse_volume,
+        "5m": parse_volume5m,
+    }
+    state = IngestState()
+    summary = {"entries": 0, "price_updates": 0, "skipped": 0, "snapshots": 0}
+    start = time.perf_counter()
+    for entry in read_journal(path):
+        summary["entries"] += 1
+        parser = parsers.get(entry.endpoint)
+        if parser is None:
+            continue
+        data = parser(json.loads(entry.payload))
+        if entry.endpoint == "mapping":
+            state.mapping = data
+        elif entry.endpoint == "volumes":
+            state.volume = data
+        elif entry.endpoint == "latest":
+            state.latest = data
+            if state.mapping is None:
+                summary["skipped"] += 1
+                continue
+            items = update_database(data, state.mapping, state.volume, engine)(
+                data, state.mapping, state.volume
+            )
+            run_tick_hooks(items)
+            publish_generation(engine)
+            summary["price_updates"] += 1
+        else:
+            fetched_at = datetime.fromtimestamp(entry.fetched_at, timezone.utc)
+            save_volume5m_to_db(data, engine, timestamp=fetched_at)
+            publish_generation(engine)
+            summary["snapshots"] += 1
+    summary["seconds"] = time.perf_counter() - start
+    if summary["skipped"]:
+        logger.warning(
+            "Skipped %d /latest payloads journaled before any /mapping", summary["skipped"]
+        )
+    return summary
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Ingest OSRS GE prices.")
+    parser.add_argument("--cycles", type=int, help="stop after this many ticks")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        help=f"seconds between ticks (default {INTERVAL_SECONDS}, 0 when profiling)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=int(os.environ.get(METRICS_PORT_ENV, 0)) or None,
+        help=f"serve Prometheus metrics on this port (env: {METRICS_PORT_ENV})",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=os.environ.get(PROFILE_ENV) == "1",
+        help=f"run under cProfile with SQL timings (env: {PROFILE_ENV})",
+    )
+    parser.add_argument(
+        "--journal",
+        default=os.environ.get(JOURNAL_ENV),
+        help=f"append every raw payload to this file (env: {JOURNAL_ENV})",
+    )
+    parser.add_argument(
+        "--replay", metavar="JOURNAL", help="rebuild the database from a journal and exit"
+    )
+    parser.add_argument(
+        "--shm-name",
+        default=os.environ.get(SHM_NAME_ENV),
+        help=f"publish each tick's prices to this shared memory block (env: {SHM_NAME_ENV})",
+    )
+    parser.add_argument(
+        "--record-updates",
+        action="store_true",
+        default=os.environ.get(RECORD_UPDATES_ENV) == "1",
+        help=f"store per-tick price diffs for the API's /stream/prices (env: {RECORD_UPDATES_ENV})",
+    )
+    parser.add_argument(
+        "--ranking-size",
+        type=int,
+        default=int(os.environ.get(RANKING_SIZE_ENV, RANKING_SIZE)),
+        help=f"keep the top N items per ranking metric, 0 to disable (env: {RANKING_SIZE_ENV})",
+    )
+    parser.add_argument(
+        "--alch-scan",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="keep the high-alch profit table up to date each tick",
+    )
+    parser.add_argument(
+        "--recipes",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="keep recipe (sets, decanting, crafting) profits up to date each tick",
+    )
+    parser.add_argument(
+        "--recipe-file", default=DEFAULT_RECIPES, help="declarative recipe definitions (JSON)"
+    )
+    parser.add_argument(
+        "--item-metrics",
+        action="store_true",
+        default=os.environ.get(ITEM_METRICS_ENV) == "1",
+        help=f"update rolling per-item volatility/liquidity metrics each tick (env: {ITEM_METRICS_ENV})",
+    )
+    parser.add_argument(
+        "--alert-rules",
+        default=os.environ.get(ALERT_RULES_ENV),
+        help=f"evaluate the alert rules in this JSON file each tick (env: {ALERT_RULES_ENV})",
+    )
+    parser.add_argument(
+        "--alert-webhook",
+        default=os.environ.get(ALERT_WEBHOOK_ENV),
+        help=f"also POST fired alerts to this URL (env: {ALERT_WEBHOOK_ENV})",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    writer = None
+    if args.shm_name:
+        writer = SharedPriceWriter(args.shm_name)
+        add_tick_hook(writer.publish_items)
+        logger.info("Publishing prices to shared memory block %s", args.shm_name)
+    if args.ranking_size > 0:
+        add_tick_hook(TopKIndex(k=args.ranking_size))
+    if args.alch_scan:
+        add_tick_hook(AlchScanner())
+    if args.recipes:
+        add_tick_hook(RecipeEvaluator(load_recipes(args.recipe_file)))
+    if args.item_metrics:
+        add_tick_hook(ItemMetricsStage())
+    if args.record_updates:
+        add_tick_hook(PriceUpdateRecorder())
+        logger.info("Recording per-tick price diffs")
+    if args.alert_rules:
+        sinks = [stdout_sink]
+        if args.alert_webhook:
+            sinks.append(WebhookSink(args.alert_webhook))
+        rules = load_rules(args.alert_rules)
+        add_tick_hook(AlertEngine(rules, sinks))
+        logger.info("Evaluating %d alert rules", len(rules))
+
+    journal = None
+    try:
+        if args.replay:
+            # Tick hooks run during replay too, so derived tables are rebuilt
+            summary = replay_journal(args.replay)
+            logger.info(
+                "Replayed %d payloads (%d price updates, %d snapshots, %d skipped) in %.2fs",
+                summary["entries"],
+                summary["price_updates"],
+                summary["snapshots"],
+                summary["skipped"],
+                summary["seconds"],
+            )
+            return
+        if args.journal:
+            journal = PayloadJournal(args.journal)
+            set_journal(journal)
+            logger.info("Journaling payloads to %s", args.journal)
+        if args.metrics_port:
+            start_metrics_server(args.metrics_port)
+            logger.info("Serving metrics on :%d/metrics", args.metrics_port)
+        if args.profile:
+            cycles = args.cycles or PROFILE_CYCLES
+            interval = args.interval if args.interval is not None else 0
+            profile_call(run_ingest, cycles, interval, name="ingest")
+        else:
+            interval = args.interval if args.interval is not None else INTERVAL_SECONDS
+            run_ingest(args.cycles, interval)
+    finally:
+        if journal is not None:
+            set_journal(None)
+            journal.close()
+        if writer is not None:
+            # Unlink the block so dashboards see the ingester is gone
+            writer.close()
+
+
+# Run main every minute if this script is executed directly
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel, create_engine
+
+# Imported for their side effect of registering tables on SQLModel.metadata
+from aggregator.models import (  # noqa: F401
+    alch_opportunity,
+    ingest_meta,
+    item_analysis,
+    item_correlation,
+    item_metrics,
+    item_model,
+    item_ranking,
+    item_volume_5m,
+    price_update,
+    recipe,
+    watchlist,
+)
+
+from aggregator.db.storage import get_storage
+
+DB_URL_ENV = "OSRS_GE_DB_URL"
+DEFAULT_DB_URL = "sqlite:///item_data.db"
+
+_engine: Engine | None = None
+
+
+def get_db_url() -> str:
+    """Return the configured database URL, honouring the OSRS_GE_DB_URL env var."""
+    return os.environ.get(DB_URL_ENV, DEFAULT_DB_URL)
+
+
+def init_db(url: str | None = None) -> Engine:
+    """
+    Create the engine for url (or the configured URL) and make sure all
+    tables exist. Replaces any engine created by a previous call.
+    """
+    global _engine
+    dispose_db()
+    _engine = create_engine(url or get_db_url())
+    SQLModel.metadata.create_all(_engine)
+    # create_all skips the indexes of tables that already exist, so indexes
+    # added since an existing database was created are built here
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(_engine, checkfirst=True)
+    get_storage(_engine).setup()
+    return _engine
+
+
+def get_engine() -> Engine:
+    """Return the shared engine, initialising it on first use."""
+    if _engine is None:
+        return init_db()
+    return _engine
+
+
+def dispose_db() -> None:
+    """Close the shared engine so the next get_engine() starts fresh."""
+    global _engine
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
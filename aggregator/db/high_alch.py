@@ -0,0 +1,130 @@
+"""
+High-alch profitability scanner.
+
+Every tick AlchScanner computes, for the whole catalogue at once with NumPy,
+
+    profit = highalch - low - nature rune low
+
+together with how many casts per 4-hour buy-limit window are realistic
+(buy limit, a share of traded volume, and the cast rate). Only rows whose
+result changed since the previous tick are upserted into AlchOpportunity,
+which is indexed on profit so dashboards read the best alchs instantly.
+"""
+
+import numpy as np
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from aggregator.db.database import get_engine
+from aggregator.models.alch_opportunity import AlchOpportunity
+from aggregator.models.item_model import Item
+from aggregator.util.portfolio import BUY_LIMIT_HOURS, quantity_caps
+
+NATURE_RUNE_ID = 561
+CASTS_PER_HOUR = 1_200  # one cast every 3 seconds
+LIQUIDITY_SHARE = 0.1
+
+
+def scan(
+    ids: np.ndarray,
+    highalch: np.ndarray,
+    low: np.ndarray,
+    limit: np.ndarray,
+    volume_24h: np.ndarray,
+    nature_price: int,
+    liquidity_share: float = LIQUIDITY_SHARE,
+) -> np.ndarray:
+    """
+    Score every item; returns rows of (item_id, highalch, buy_price,
+    nature_price, profit, max_quantity, potential_profit) for items that
+    have an alch value and a buy price.
+    """
+    valid = (highalch > 0) & (low > 0)
+    ids, highalch, low = ids[valid], highalch[valid], low[valid]
+    profit = highalch - low - nature_price
+    casts = quantity_caps(limit[valid], volume_24h[valid], BUY_LIMIT_HOURS, liquidity_share)
+    casts = np.minimum(casts, CASTS_PER_HOUR * BUY_LIMIT_HOURS)
+    potential = np.where(profit > 0, profit * casts, 0)
+    nature = np.full(len(ids), nature_price, dtype=np.int64)
+    return np.column_stack([ids, highalch, low, nature, profit, casts, potential])
+
+
+class AlchScanner:
+    """Tick hook keeping AlchOpportunity in step with the latest prices."""
+
+    def __init__(self, engine=None, liquidity_share: float = LIQUIDITY_SHARE):
+        self.engine = engine
+        self.liquidity_share = liquidity_share
+        self.rows: dict[int, tuple] = {}
+        self.loaded = False
+
+    def load(self, session: Session) -> None:
+        """Start from the rows already stored, so ones left by an earlier run can be removed."""
+        columns = (
+            AlchOpportunity.item_id,
+            AlchOpportunity.highalch,
+            AlchOpportunity.buy_price,
+            AlchOpportunity.nature_price,
+            AlchOpportunity.profit,
+            AlchOpportunity.max_quantity,
+            AlchOpportunity.potential_profit,
+        )
+        self.rows = {row[0]: tuple(row) for row in session.exec(select(*columns)).all()}
+        self.loaded = True
+
+    def update(self, items) -> tuple[list[tuple], list[int]]:
+        """Rescore items; return (changed rows, item ids that no longer qualify)."""
+        nature = next((i for i in items if i.id == NATURE_RUNE_ID), None)
+        if nature is None or nature.low is None:
+            return [], []
+        columns = np.array(
+            [(i.id, i.highalch or 0, i.low or 0, i.limit or 0, i.volume_24h or 0) for i in items],
+            dtype=np.int64,
+        ).reshape(-1, 5)
+        result = scan(*columns.T, nature_price=nature.low, liquidity_share=self.liquidity_share)
+
+        rows = {int(row[0]): tuple(int(v) for v in row) for row in result}
+        changed = [row for item_id, row in rows.items() if self.rows.get(item_id) != row]
+        removed = [item_id for item_id in self.rows if item_id not in rows]
+        self.rows = rows
+        return changed, removed
+
+    def __call__(self, items) -> int:
+        if not self.loaded:
+            with Session(self.engine or get_engine()) as session:
+                self.load(session)
+        changed, removed = self.update(items)
+        if not changed and not removed:
+            return 0
+        with Session(self.engine or get_engine()) as session:
+            for item_id, highalch, buy, nature, profit, casts, potential in changed:
+                session.merge(
+                    AlchOpportunity(
+                        item_id=item_id,
+                        highalch=highalch,
+                        buy_price=buy,
+                        nature_price=nature,
+                        profit=profit,
+                        max_quantity=casts,
+                        potential_profit=potential,
+                    )
+                )
+            if removed:
+                session.exec(delete(AlchOpportunity).where(AlchOpportunity.item_id.in_(removed)))
+            session.commit()
+        return len(changed) + len(removed)
+
+
+def top_alchs(
+    session: Session, limit: int = 50, min_quantity: int = 1, by: str = "profit"
+) -> list[tuple[Item, AlchOpportunity]]:
+    """Profitable alchs, best per-cast profit (or potential_profit) first."""
+    order = AlchOpportunity.potential_profit if by == "potential_profit" else AlchOpportunity.profit
+    statement = (
+        select(Item, AlchOpportunity)
+        .join(AlchOpportunity, AlchOpportunity.item_id == Item.id)
+        .where(AlchOpportunity.profit > 0, AlchOpportunity.max_quantity >= min_quantity)
+        .order_by(order.desc())
+        .limit(limit)
+    )
+    return list(session.exec(statement).all())
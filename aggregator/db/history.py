@@ -0,0 +1,145 @@
+"""
+Downsampled price history for charts.
+
+A year of 5m snapshots is ~100k points per item, far more than a chart
+can draw. chart_history picks a bucket size from the requested range and
+the chart's pixel width, reads the range with one indexed (item_id,
+timestamp) query and reduces each series in NumPy before anything leaves
+the server:
+
+- "minmax" keeps the lowest and highest point of every bucket (in time
+  order), so spikes survive no matter how far the chart is zoomed out
+- "lttb" (Largest-Triangle-Three-Buckets) keeps one visually significant
+  point per bucket, for smoother lines
+
+Callers cache the result by ingest generation (the API response cache and
+the item lookup page both do), so a chart is only recomputed once per tick.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Float, cast, func
+from sqlmodel import Session, select
+
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+SNAPSHOT_SECONDS = 300
+# Bucket sizes a chart can step through, from raw 5m snapshots up to a week
+BUCKET_SECONDS = (300, 600, 900, 1800, 3600, 7200, 14400, 21600, 43200, 86400, 172800, 604800)
+METHODS = ("minmax", "lttb")
+SERIES = {"high": ItemSnapshot.avg_high_price, "low": ItemSnapshot.avg_low_price}
+
+
+def bucket_seconds(start: datetime, end: datetime, width: int, method: str = "minmax") -> int:
+    """Smallest bucket that keeps the series within width points (minmax emits two per bucket)."""
+    points_per_bucket = 2 if method == "minmax" else 1
+    buckets = max(1, width // points_per_bucket)
+    span = (end - start).total_seconds()
+    for seconds in BUCKET_SECONDS:
+        if span / seconds <= buckets:
+            return seconds
+    return BUCKET_SECONDS[-1]
+
+
+def _epoch(session: Session):
+    """Snapshot timestamp as unix seconds, computed by the database (no per-row datetime parsing)."""
+    if session.get_bind().dialect.name == "sqlite":
+        # Timestamps are stored as naive UTC text
+        return cast(func.strftime("%s", ItemSnapshot.timestamp), Float)
+    return func.extract("epoch", ItemSnapshot.timestamp)
+
+
+def load_history(
+    session: Session, item_id: int, start: datetime, end: datetime
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """Unix timestamps and a NaN-padded price column per series for [start, end), oldest first."""
+    statement = (
+        select(_epoch(session), *SERIES.values())
+        .where(ItemSnapshot.item_id == item_id)
+        .where(ItemSnapshot.timestamp >= start)
+        .where(ItemSnapshot.timestamp < end)
+        .order_by(ItemSnapshot.timestamp)
+    )
+    rows = session.connection().execute(statement).all()
+    if not rows:
+        return np.empty(0), {name: np.empty(0) for name in SERIES}
+    # None -> NaN happens in the float conversion
+    table = np.array([tuple(row) for row in rows], dtype=np.float64)
+    return table[:, 0], {name: table[:, i + 1] for i, name in enumerate(SERIES)}
+
+
+def minmax(x: np.ndarray, y: np.ndarray, bucket: float) -> np.ndarray:
+    """Indices of the min and max point of every bucket of width `bucket`, in time order."""
+    if not len(x):
+        return np.empty(0, dtype=np.int64)
+    slot = ((x - x[0]) // bucket).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, slot[1:] != slot[:-1]])
+    # Sort by (slot, value) once; each bucket's first and last entries are its min and max
+    order = np.lexsort((y, slot))
+    stops = np.r_[starts[1:], len(x)]
+    return np.unique(np.concatenate([order[starts], order[stops - 1]]))
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices picked by Largest-Triangle-Three-Buckets; keeps the first and last point."""
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1], dtype=np.int64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(x: np.ndarray, y: np.ndarray, bucket: float, method: str = "minmax") -> np.ndarray:
+    """Indices of the points of (x, y) to draw, ignoring NaN prices."""
+    present = np.flatnonzero(~np.isnan(y))
+    x, y = x[present], y[present]
+    if not len(x) or bucket <= SNAPSHOT_SECONDS:
+        return present
+    if method == "lttb":
+        span = x[-1] - x[0]
+        return present[lttb(x, y, int(span // bucket) + 1)]
+    return present[minmax(x, y, bucket)]
+
+
+def chart_history(
+    session: Session,
+    item_id: int,
+    end: datetime,
+    span: timedelta,
+    width: int,
+    method: str = "minmax",
+) -> dict:
+    """
+    At most about width points per series covering [end - span, end):
+    {"bucket_seconds": int, "method": str, "raw_points": int,
+     "series": {"high": {"timestamp": [...], "price": [...]}, "low": {...}}}
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    start = end - span
+    bucket = bucket_seconds(start, end, width, method)
+    timestamps, prices = load_history(session, item_id, start, end)
+    series = {}
+    for name, y in prices.items():
+        keep = downsample(timestamps, y, bucket, method)
+        series[name] = {"timestamp": timestamps[keep].tolist(), "price": y[keep].tolist()}
+    return {
+        "bucket_seconds": bucket,
+        "method": method,
+        "raw_points": len(timestamps),
+        "series": series,
+    }
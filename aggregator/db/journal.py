@@ -0,0 +1,141 @@
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+try:  # optional, preferred codec
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JOURNAL_ENV = "OSRS_GE_JOURNAL"
+
+CODEC_ZLIB = 0
+CODEC_ZSTD = 1
+
+MAGIC = b"OGJ1"
+# magic, codec, fetched_at (unix seconds), endpoint length, compressed length
+FRAME_HEADER = struct.Struct("<4sBdHI")
+# Compressed streamed payloads spill from memory to a temp file past this size
+SPOOL_MAX_BYTES = 1 << 20
+
+
+@dataclass
+class JournalEntry:
+    endpoint: str
+    fetched_at: float
+    payload: bytes
+
+
+def default_codec() -> int:
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+
+def _compress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _compressobj(codec: int):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    return zlib.compressobj(6)
+
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Journal uses zstd but the zstandard package is not installed")
+        # decompressobj also reads streamed frames, whose header has no content size
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return zlib.decompress(data)
+
+
+class PayloadJournal:
+    """
+    Append-only file of raw API payloads. Each frame holds the endpoint, the
+    fetch timestamp and the response body compressed with zstd (zlib when
+    zstandard is not installed). Safe to append to from several threads.
+    Use it as a context manager, or call close(), to release the file.
+    """
+
+    def __init__(self, path, codec: int | None = None):
+        self.path = Path(path)
+        self.codec = default_codec() if codec is None else codec
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("ab")  # noqa: SIM115 - held open, released by close()
+        self._lock = threading.Lock()
+
+    def _frame_start(self, endpoint: str, fetched_at: float | None, blob_len: int) -> bytes:
+        name = endpoint.encode()
+        header = FRAME_HEADER.pack(
+            MAGIC,
+            self.codec,
+            time.time() if fetched_at is None else fetched_at,
+            len(name),
+            blob_len,
+        )
+        return header + name
+
+    def append(self, endpoint: str, payload: bytes, fetched_at: float | None = None) -> None:
+        blob = _compress(self.codec, payload)
+        frame = self._frame_start(endpoint, fetched_at, len(blob)) + blob
+        with self._lock:
+            self._file.write(frame)
+            self._file.flush()
+
+    @contextmanager
+    def stream(self, endpoint: str, fetched_at: float | None = None):
+        """
+        Journal a payload that arrives in chunks: yields a write(chunk)
+        callable and appends the frame once the block exits without an
+        error. The compressed body is spooled (to a temp file past
+        SPOOL_MAX_BYTES), so the raw payload is never held in memory.
+        """
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        compressor = _compressobj(self.codec)
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+            yield lambda chunk: spool.write(compressor.compress(chunk))
+            spool.write(compressor.flush())
+            blob_len = spool.tell()
+            spool.seek(0)
+            with self._lock:
+                self._file.write(self._frame_start(endpoint, fetched_at, blob_len))
+                shutil.copyfileobj(spool, self._file)
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_journal(path):
+    """
+    Yield every JournalEntry in path in the order it was written. A frame
+    cut short by a crash mid-write ends the iteration.
+    """
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            magic, codec, fetched_at, name_len, blob_len = FRAME_HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"Corrupt journal frame at offset {f.tell() - len(header)}")
+            name = f.read(name_len)
+            blob = f.read(blob_len)
+            if len(name) < name_len or len(blob) < blob_len:
+                return
+            yield JournalEntry(name.decode(), fetched_at, _decompress(codec, blob))
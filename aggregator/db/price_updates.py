@@ -0,0 +1,74 @@
+"""
+Per-tick price diffs for push consumers.
+
+PriceUpdateRecorder runs as an ingester tick hook and stores only the items
+whose high, low or 24h volume changed, tagged with the ingest generation of
+that tick. Hooks run before the ingester publishes the tick's generation,
+so the rows are committed before any reader can see that generation. The
+API's /stream/prices endpoint follows the table and pushes each
+generation's rows as one server-sent event, so subscribers never have to
+reload the full item table.
+"""
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from aggregator.db.database import get_engine
+from aggregator.db.queries import get_generation
+from aggregator.models.price_update import PriceUpdate
+
+RECORD_UPDATES_ENV = "OSRS_GE_RECORD_UPDATES"
+KEEP_GENERATIONS = 120  # about two hours of ticks for reconnecting clients
+
+
+class PriceUpdateRecorder:
+    """Tick hook that writes the diff against the previous tick to PriceUpdate."""
+
+    def __init__(self, engine=None, keep_generations: int = KEEP_GENERATIONS):
+        self.engine = engine
+        self.keep_generations = keep_generations
+        self.previous: dict[int, tuple] = {}
+
+    def diff(self, items) -> list[tuple]:
+        """Return (id, high, low, volume_24h) for items that changed since the last call."""
+        changed = []
+        for item in items:
+            row = (item.high, item.low, item.volume_24h)
+            if self.previous.get(item.id) != row:
+                self.previous[item.id] = row
+                changed.append((item.id, *row))
+        return changed
+
+    def __call__(self, items) -> int:
+        changed = self.diff(items)
+        with Session(self.engine or get_engine()) as session:
+            # The generation run_tick publishes once every hook has run
+            generation = get_generation(session) + 1
+            session.add_all(
+                PriceUpdate(generation=generation, item_id=item_id, high=high, low=low, volume_24h=volume)
+                for item_id, high, low, volume in changed
+            )
+            session.exec(
+                delete(PriceUpdate).where(
+                    PriceUpdate.generation <= generation - self.keep_generations
+                )
+            )
+            session.commit()
+        return len(changed)
+
+
+def updates_since(
+    session: Session, generation: int, until: int | None = None
+) -> dict[int, list[dict]]:
+    """Changed items per generation for every generation after the given one (up to until)."""
+    statement = select(PriceUpdate).where(PriceUpdate.generation > generation)
+    if until is not None:
+        # Leave out rows recorded for a generation that is not published yet
+        statement = statement.where(PriceUpdate.generation <= until)
+    rows = session.exec(statement.order_by(PriceUpdate.generation, PriceUpdate.item_id)).all()
+    batches: dict[int, list[dict]] = {}
+    for row in rows:
+        batches.setdefault(row.generation, []).append(
+            {"id": row.item_id, "high": row.high, "low": row.low, "volume_24h": row.volume_24h}
+        )
+    return batches
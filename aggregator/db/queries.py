@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, func, update
+from sqlmodel import Session, select
+
+from aggregator.models.ingest_meta import IngestMeta
+from aggregator.models.item_metrics import ItemMetrics
+from aggregator.models.item_model import Item
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+META_ID = 1
+
+
+def margin_expr():
+    """SQL expression equivalent to ge_margin(Item.high, Item.low)."""
+    tax = case((Item.high // 100 > 5_000_000, 5_000_000), else_=Item.high // 100)
+    return Item.high - tax - Item.low
+
+
+def bump_generation(session: Session) -> None:
+    """Increment the ingest generation inside the caller's transaction."""
+    now = datetime.now(timezone.utc)
+    result = session.exec(
+        update(IngestMeta)
+        .where(IngestMeta.id == META_ID)
+        .values(generation=IngestMeta.generation + 1, updated_at=now)
+    )
+    if result.rowcount == 0:
+        session.add(IngestMeta(id=META_ID, generation=1, updated_at=now))
+
+
+def stored_volumes(session: Session) -> dict[str, int]:
+    """24h volume of every stored item, keyed like the /volumes payload (str ids)."""
+    rows = session.exec(select(Item.id, Item.volume_24h)).all()
+    return {str(item_id): volume for item_id, volume in rows}
+
+
+def get_generation(session: Session) -> int:
+    """Return the current ingest generation (0 before the first update)."""
+    meta = session.get(IngestMeta, META_ID)
+    return meta.generation if meta else 0
+
+
+def top_margins(
+    session: Session, limit: int = 50, offset: int = 0, min_volume: int = 0
+) -> list[Item]:
+    """Items with both prices, ordered by GE margin, best first."""
+    statement = (
+        select(Item)
+        .where(Item.high.is_not(None), Item.low.is_not(None))
+        .where(Item.volume_24h >= min_volume)
+        .order_by(margin_expr().desc(), Item.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    return list(session.exec(statement).all())
+
+
+def risk_adjusted_margins(
+    session: Session, min_fill_per_hour: float = 0, limit: int = 50, offset: int = 0
+) -> list[tuple[Item, ItemMetrics, float]]:
+    """
+    Items ranked by margin divided by their typical 5m price move
+    (atr_pct * low), i.e. margin in units of risk, best first.
+    """
+    score = (margin_expr() / (ItemMetrics.atr_pct * Item.low)).label("score")
+    statement = (
+        select(Item, ItemMetrics, score)
+        .join(ItemMetrics, ItemMetrics.item_id == Item.id)
+        .where(Item.high.is_not(None), Item.low > 0, ItemMetrics.atr_pct > 0)
+        .where(ItemMetrics.buy_fill_per_hour >= min_fill_per_hour)
+        .order_by(score.desc(), Item.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    return list(session.exec(statement).all())
+
+
+def find_items(session: Session, text: str, limit: int = 20, offset: int = 0) -> list[Item]:
+    """Items whose name contains text (case-insensitive)."""
+    statement = (
+        select(Item)
+        .where(func.lower(Item.name).contains(text.lower()))
+        .order_by(Item.name)
+        .offset(offset)
+        .limit(limit)
+    )
+    return list(session.exec(statement).all())
+
+
+def item_history(
+    session: Session,
+    item_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = 500,
+    offset: int = 0,
+) -> list[ItemSnapshot]:
+    """Snapshots for one item in [start, end), oldest first."""
+    statement = select(ItemSnapshot).where(ItemSnapshot.item_id == item_id)
+    if start is not None:
+        statement = statement.where(ItemSnapshot.timestamp >= start)
+    if end is not None:
+        statement = statement.where(ItemSnapshot.timestamp < end)
+    statement = statement.order_by(ItemSnapshot.timestamp).offset(offset).limit(limit)
+    return list(session.exec(statement).all())
+
+
+def price_spikes(
+    session: Session,
+    side: str = "buy",
+    window: timedelta = timedelta(hours=1),
+    threshold: float = 0.1,
+    limit: int = 50,
+) -> list[dict]:
+    """
+    Items whose price in the newest snapshot moved more than threshold
+    (fractional) away from their mean over the preceding window. side "buy"
+    looks at insta-buy (avg high) prices, "sell" at insta-sell (avg low).
+    """
+    price = ItemSnapshot.avg_high_price if side == "buy" else ItemSnapshot.avg_low_price
+    latest_ts = session.exec(select(func.max(ItemSnapshot.timestamp))).one()
+    if latest_ts is None:
+        return []
+
+    baseline = (
+        select(ItemSnapshot.item_id, func.avg(price).label("mean_price"))
+        .where(ItemSnapshot.timestamp >= latest_ts - window)
+        .where(ItemSnapshot.timestamp < latest_ts)
+        .where(price.is_not(None))
+        .group_by(ItemSnapshot.item_id)
+        .subquery()
+    )
+    statement = (
+        select(ItemSnapshot.item_id, price, baseline.c.mean_price)
+        .join(baseline, baseline.c.item_id == ItemSnapshot.item_id)
+        .where(ItemSnapshot.timestamp == latest_ts)
+        .where(price.is_not(None))
+    )
+    spikes = []
+    for item_id, current, mean_price in session.exec(statement).all():
+        if not mean_price:
+            continue
+        change = (current - mean_price) / mean_price
+        if abs(change) >= threshold:
+            spikes.append(
+                {
+                    "item_id": item_id,
+                    "price": current,
+                    "mean_price": mean_price,
+                    "change": change,
+                }
+            )
+    spikes.sort(key=lambda s: abs(s["change"]), reverse=True)
+    return spikes[:limit]
@@ -0,0 +1,135 @@
+"""
+Top-K flip rankings maintained at ingest time.
+
+TopKIndex runs as a tick hook. It keeps every item's current score for each
+metric plus the current top-K per metric, and on each tick only looks at
+items whose prices or volume changed:
+
+- a changed item scoring above the current K-th value is merged in
+- a top-K member whose score dropped (or vanished) forces a rebuild with
+  heapq.nlargest over the stored scores, O(n log K) instead of a full sort
+
+Only metrics whose top-K actually changed are rewritten to ItemRanking,
+so readers get the best N flips with an O(K) primary-key range scan.
+"""
+
+import heapq
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from aggregator.db.database import get_engine
+from aggregator.models.item_model import Item
+from aggregator.models.item_ranking import ItemRanking
+from aggregator.util.margin import ge_margin
+
+RANKING_SIZE = 100
+METRICS = ("margin", "roi", "margin_volume")
+
+
+def item_scores(item) -> dict[str, float] | None:
+    """Score item on every metric, or None when it has no complete price pair."""
+    if item.high is None or item.low is None:
+        return None
+    margin = ge_margin(item.high, item.low)
+    return {
+        "margin": margin,
+        "roi": margin / item.low if item.low > 0 else 0.0,
+        "margin_volume": margin * (item.volume_24h or 0),
+    }
+
+
+class TopKIndex:
+    """Tick hook keeping the top-K items per metric and persisting them to ItemRanking."""
+
+    def __init__(self, engine=None, k: int = RANKING_SIZE, min_volume: int = 0):
+        self.engine = engine
+        self.k = k
+        self.min_volume = min_volume
+        self.seen: dict[int, tuple] = {}
+        self.scores: dict[str, dict[int, float]] = {m: {} for m in METRICS}
+        self.top: dict[str, list[tuple[float, int]]] = {m: [] for m in METRICS}
+        self.top_ids: dict[str, set[int]] = {m: set() for m in METRICS}
+
+    def _rank_key(self, entry: tuple[float, int]):
+        # Higher value first, lower id breaks ties deterministically
+        return entry[0], -entry[1]
+
+    def update(self, items) -> set[str]:
+        """Apply one tick of items and return the metrics whose top-K changed."""
+        entrants = {m: set() for m in METRICS}
+        rebuild = set()
+        for item in items:
+            key = (item.high, item.low, item.volume_24h)
+            if self.seen.get(item.id) == key:
+                continue
+            self.seen[item.id] = key
+            scores = item_scores(item)
+            if scores is not None and (item.volume_24h or 0) < self.min_volume:
+                scores = None
+            for metric in METRICS:
+                values = self.scores[metric]
+                old = values.pop(item.id, None)
+                new = None if scores is None else scores[metric]
+                if new is not None:
+                    values[item.id] = new
+                in_top = item.id in self.top_ids[metric]
+                if in_top and (new is None or new < old):
+                    rebuild.add(metric)
+                elif in_top or (new is not None and self._beats_cutoff(metric, new, item.id)):
+                    entrants[metric].add(item.id)
+
+        changed = set()
+        for metric in METRICS:
+            values = self.scores[metric]
+            if metric in rebuild:
+                candidates = ((v, i) for i, v in values.items())
+            elif entrants[metric]:
+                kept = [(v, i) for v, i in self.top[metric] if i not in entrants[metric]]
+                candidates = kept + [(values[i], i) for i in entrants[metric]]
+            else:
+                continue
+            top = heapq.nlargest(self.k, candidates, key=self._rank_key)
+            if top != self.top[metric]:
+                self.top[metric] = top
+                self.top_ids[metric] = {i for _, i in top}
+                changed.add(metric)
+        return changed
+
+    def _beats_cutoff(self, metric: str, value: float, item_id: int) -> bool:
+        top = self.top[metric]
+        return len(top) < self.k or self._rank_key((value, item_id)) > self._rank_key(top[-1])
+
+    def ranking(self, metric: str) -> list[tuple[int, float]]:
+        """Current (item_id, value) list for metric, best first."""
+        return [(item_id, value) for value, item_id in self.top[metric]]
+
+    def persist(self, metrics) -> None:
+        with Session(self.engine or get_engine()) as session:
+            for metric in metrics:
+                session.exec(delete(ItemRanking).where(ItemRanking.metric == metric))
+                session.add_all(
+                    ItemRanking(metric=metric, rank=rank, item_id=item_id, value=value)
+                    for rank, (item_id, value) in enumerate(self.ranking(metric), start=1)
+                )
+            session.commit()
+
+    def __call__(self, items) -> set[str]:
+        changed = self.update(items)
+        if changed:
+            self.persist(changed)
+        return changed
+
+
+def top_ranked(session: Session, metric: str = "margin", limit: int = RANKING_SIZE) -> list[tuple[Item, float]]:
+    """Read the persisted top-`limit` (item, value) pairs for metric, best first."""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}; expected one of {', '.join(METRICS)}")
+    statement = (
+        select(Item, ItemRanking.value)
+        .join(ItemRanking, ItemRanking.item_id == Item.id)
+        .where(ItemRanking.metric == metric)
+        .order_by(ItemRanking.rank)
+        .limit(limit)
+    )
+    return [(item, value) for item, value in session.exec(statement).all()]
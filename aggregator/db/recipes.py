@@ -0,0 +1,133 @@
+"""
+Recipe arbitrage over the latest prices.
+
+Recipes are declarative (aggregator/data/recipes.json): input item
+quantities, output item quantities and an optional coin cost, covering
+item sets, potion decanting and simple crafting. RecipeEvaluator lays them
+out as two dense recipe x item quantity matrices, so profit for any subset
+of recipes is one pair of matrix-vector products:
+
+    profit = outputs @ (high - tax) - inputs @ low - cost
+
+with the tax per unit taken from ge_margin. As a tick hook it keeps the
+last prices it saw, and only re-evaluates recipes that use an item whose
+price changed. Results are upserted into RecipeProfit.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from aggregator.db.database import get_engine
+from aggregator.models.recipe import Recipe, RecipeBook, RecipeProfit
+from aggregator.util.margin import ge_margin
+
+DEFAULT_RECIPES = Path(__file__).resolve().parent.parent / "data" / "recipes.json"
+
+
+def load_recipes(path=DEFAULT_RECIPES) -> list[Recipe]:
+    """Read and validate a recipe file."""
+    return RecipeBook.model_validate(json.loads(Path(path).read_text())).recipes
+
+
+class RecipeEvaluator:
+    """Batched, incremental recipe profit calculator and tick hook."""
+
+    def __init__(self, recipes: list[Recipe] | None = None, engine=None):
+        self.recipes = load_recipes() if recipes is None else recipes
+        self.engine = engine
+        item_ids = sorted({i for r in self.recipes for i in (*r.inputs, *r.outputs)})
+        self.column = {item_id: col for col, item_id in enumerate(item_ids)}
+        self.inputs = np.zeros((len(self.recipes), len(item_ids)), dtype=np.int64)
+        self.outputs = np.zeros_like(self.inputs)
+        self.cost = np.array([r.cost for r in self.recipes], dtype=np.int64)
+        self.used_by: dict[int, list[int]] = {}
+        for row, recipe in enumerate(self.recipes):
+            for item_id, qty in recipe.inputs.items():
+                self.inputs[row, self.column[item_id]] = qty
+                self.used_by.setdefault(item_id, []).append(row)
+            for item_id, qty in recipe.outputs.items():
+                self.outputs[row, self.column[item_id]] = qty
+                self.used_by.setdefault(item_id, []).append(row)
+        # Unknown prices are NaN so any recipe touching them evaluates to NaN
+        self.buy = np.full(len(item_ids), np.nan)
+        self.sell = np.full(len(item_ids), np.nan)
+        self.synced = False
+
+    def set_prices(self, items) -> set[int]:
+        """Load item prices; return the rows of recipes affected by a change."""
+        affected = set()
+        for item in items:
+            col = self.column.get(item.id)
+            if col is None:
+                continue
+            buy = np.nan if item.low is None else item.low
+            sell = np.nan if item.high is None else ge_margin(item.high, 0)
+            if _same(buy, self.buy[col]) and _same(sell, self.sell[col]):
+                continue
+            self.buy[col], self.sell[col] = buy, sell
+            affected.update(self.used_by[item.id])
+        return affected
+
+    def evaluate(self, rows=None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return (rows, input_cost, output_value, profit) for rows (default:
+        all); profit is NaN for recipes with an unpriced item.
+        """
+        rows = np.arange(len(self.recipes)) if rows is None else np.asarray(sorted(rows), dtype=np.int64)
+        inputs, outputs = self.inputs[rows], self.outputs[rows]
+        input_cost = inputs @ np.nan_to_num(self.buy) + self.cost[rows]
+        output_value = outputs @ np.nan_to_num(self.sell)
+        unpriced = (inputs > 0) @ np.isnan(self.buy) | (outputs > 0) @ np.isnan(self.sell)
+        profit = np.where(unpriced, np.nan, output_value - input_cost)
+        return rows, input_cost, output_value, profit
+
+    def __call__(self, items) -> int:
+        affected = self.set_prices(items)
+        if not self.synced:
+            # The table may hold rows from an earlier run: write every recipe
+            # once and drop recipes no longer in the book
+            affected = set(range(len(self.recipes)))
+        if not affected:
+            return 0
+        rows, input_cost, output_value, profit = self.evaluate(affected)
+        with Session(self.engine or get_engine()) as session:
+            if not self.synced:
+                names = [recipe.name for recipe in self.recipes]
+                session.exec(delete(RecipeProfit).where(RecipeProfit.name.not_in(names)))
+                self.synced = True
+            unpriced = []
+            for row, cost, value, gain in zip(rows, input_cost, output_value, profit):
+                recipe = self.recipes[row]
+                if np.isnan(gain):
+                    unpriced.append(recipe.name)
+                    continue
+                session.merge(
+                    RecipeProfit(
+                        name=recipe.name,
+                        kind=recipe.kind,
+                        input_cost=int(cost),
+                        output_value=int(value),
+                        profit=int(gain),
+                    )
+                )
+            if unpriced:
+                session.exec(delete(RecipeProfit).where(RecipeProfit.name.in_(unpriced)))
+            session.commit()
+        return len(rows)
+
+
+def _same(a: float, b: float) -> bool:
+    return a == b or (np.isnan(a) and np.isnan(b))
+
+
+def top_recipes(session: Session, kind: str | None = None, limit: int = 50) -> list[RecipeProfit]:
+    """Most profitable recipes, optionally of one kind."""
+    statement = select(RecipeProfit)
+    if kind is not None:
+        statement = statement.where(RecipeProfit.kind == kind)
+    statement = statement.order_by(RecipeProfit.profit.desc()).limit(limit)
+    return list(session.exec(statement).all())
@@ -0,0 +1,186 @@
+"""
+Latest joined price table published into a named shared memory block so
+dashboard processes can read the live market without querying SQLite.
+
+Layout: a fixed header followed by ``capacity`` fixed-size records.
+
+- header: magic, sequence number, record count, capacity
+- record: item id, high, low, margin, 24h volume (missing prices are MISSING)
+
+The sequence number works as a seqlock: the writer makes it odd before
+touching the records and even again afterwards, and readers retry until
+they copy the block between two identical even sequence numbers. Reads are
+therefore not zero-copy: each one copies the used part of the table (one
+memcpy, ~1 MB at capacity) out of the block before decoding it. One writer
+(the ingester) and any number of readers are supported.
+"""
+
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from aggregator.util.margin import ge_margin
+
+SHM_NAME_ENV = "OSRS_GE_SHM_NAME"
+DEFAULT_SHM_NAME = "osrs_ge_prices"
+DEFAULT_CAPACITY = 32_768  # comfortably above the ~4k tradeable items
+
+MAGIC = b"OGSM"
+HEADER = struct.Struct("<4sQII")  # magic, seq, count, capacity
+RECORD = struct.Struct("<iqqqq")  # id, high, low, margin, volume_24h
+SEQ_OFFSET = 4
+MISSING = -(2**63)
+
+
+class SnapshotBusy(Exception):
+    """Raised when a consistent copy could not be taken in time."""
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing block without letting this process unlink it on exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _encode(value: int | None) -> int:
+    return MISSING if value is None else value
+
+
+def _decode(value: int) -> int | None:
+    return None if value == MISSING else value
+
+
+def price_rows(items) -> list[tuple]:
+    """Turn Item rows into (id, high, low, margin, volume_24h) records."""
+    rows = []
+    for item in items:
+        margin = (
+            ge_margin(item.high, item.low)
+            if item.high is not None and item.low is not None
+            else None
+        )
+        rows.append((item.id, item.high, item.low, margin, item.volume_24h))
+    return rows
+
+
+class SharedPriceWriter:
+    """Owns the shared block and publishes a new table on every tick."""
+
+    def __init__(self, name: str = DEFAULT_SHM_NAME, capacity: int = DEFAULT_CAPACITY):
+        size = HEADER.size + capacity * RECORD.size
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            HEADER.pack_into(self.shm.buf, 0, MAGIC, 0, 0, capacity)
+        except FileExistsError:
+            # Left behind by a previous ingester run; reuse it if it fits
+            self.shm = shared_memory.SharedMemory(name=name)
+            magic, seq, _, existing = HEADER.unpack_from(self.shm.buf, 0)
+            if magic != MAGIC or existing < capacity:
+                self.shm.close()
+                raise ValueError(f"Shared memory block {name!r} has an incompatible layout")
+            capacity = existing
+            if seq % 2:
+                # That writer died mid-publish: drop the torn table and make
+                # seq even again, or every later publish would look in progress
+                HEADER.pack_into(self.shm.buf, 0, MAGIC, seq + 1, 0, capacity)
+        self.name = name
+        self.capacity = capacity
+
+    @property
+    def seq(self) -> int:
+        return HEADER.unpack_from(self.shm.buf, 0)[1]
+
+    def publish(self, rows) -> int:
+        """Replace the table with rows and return the new version."""
+        rows = list(rows)
+        if len(rows) > self.capacity:
+            raise ValueError(f"{len(rows)} rows exceed capacity {self.capacity}")
+        body = b"".join(
+            RECORD.pack(item_id, _encode(high), _encode(low), _encode(margin), volume or 0)
+            for item_id, high, low, margin, volume in rows
+        )
+        buf = self.shm.buf
+        seq = self.seq
+        struct.pack_into("<Q", buf, SEQ_OFFSET, seq + 1)  # odd: write in progress
+        buf[HEADER.size : HEADER.size + len(body)] = body
+        HEADER.pack_into(buf, 0, MAGIC, seq + 1, len(rows), self.capacity)
+        struct.pack_into("<Q", buf, SEQ_OFFSET, seq + 2)
+        return (seq + 2) // 2
+
+    def publish_items(self, items) -> int:
+        return self.publish(price_rows(items))
+
+    def close(self, unlink: bool = True) -> None:
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class SharedPriceReader:
+    """Read-only view of a block published by SharedPriceWriter."""
+
+    def __init__(self, name: str = DEFAULT_SHM_NAME):
+        self.shm = _attach(name)
+        magic, *_ = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC:
+            self.shm.close()
+            raise ValueError(f"Shared memory block {name!r} is not a price table")
+
+    @property
+    def version(self) -> int:
+        """Number of completed publishes; cheap to poll for changes."""
+        return HEADER.unpack_from(self.shm.buf, 0)[1] // 2
+
+    def read_bytes(self, timeout: float = 1.0) -> tuple[int, int, bytes]:
+        """Copy (version, count, record bytes) consistently under the seqlock."""
+        buf = self.shm.buf
+        deadline = time.monotonic() + timeout
+        while True:
+            _, seq, count, _ = HEADER.unpack_from(buf, 0)
+            if seq % 2 == 0:
+                body = bytes(buf[HEADER.size : HEADER.size + count * RECORD.size])
+                if HEADER.unpack_from(buf, 0)[1] == seq:
+                    return seq // 2, count, body
+            if time.monotonic() > deadline:
+                raise SnapshotBusy("Timed out waiting for a consistent price snapshot")
+            time.sleep(0.0005)
+
+    def read(self, timeout: float = 1.0) -> tuple[int, list[tuple]]:
+        """Return (version, rows) with None for missing prices."""
+        version, _, body = self.read_bytes(timeout)
+        rows = [
+            (item_id, _decode(high), _decode(low), _decode(margin), volume)
+            for item_id, high, low, margin, volume in RECORD.iter_unpack(body)
+        ]
+        return version, rows
+
+    def read_array(self, timeout: float = 1.0):
+        """Return (version, NumPy structured array) decoded from one memcpy."""
+        import numpy as np
+
+        dtype = np.dtype(
+            [
+                ("id", "<i4"),
+                ("high", "<i8"),
+                ("low", "<i8"),
+                ("margin", "<i8"),
+                ("volume_24h", "<i8"),
+            ]
+        )
+        version, _, body = self.read_bytes(timeout)
+        return version, np.frombuffer(body, dtype=dtype)
+
+    def close(self) -> None:
+        self.shm.close()
+
+
+def open_reader(name: str = DEFAULT_SHM_NAME) -> SharedPriceReader | None:
+    """Attach to the published table, or return None if no ingester publishes one."""
+    try:
+        return SharedPriceReader(name)
+    except FileNotFoundError:
+        return None
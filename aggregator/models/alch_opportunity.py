@@ -0,0 +1,14 @@
+from sqlmodel import SQLModel, Field
+
+
+class AlchOpportunity(SQLModel, table=True):
+    """High-alch economics of one item at the latest prices."""
+
+    __tablename__ = "alchopportunity"
+    item_id: int = Field(primary_key=True)
+    highalch: int
+    buy_price: int
+    nature_price: int
+    profit: int = Field(index=True)  # per cast: highalch - buy_price - nature_price
+    max_quantity: int  # casts per 4h window after buy limit, liquidity and cast rate
+    potential_profit: int = Field(index=True)  # profit * max_quantity
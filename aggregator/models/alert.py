@@ -0,0 +1,14 @@
+from typing import List
+from pydantic import BaseModel
+
+
+class AlertRule(BaseModel):
+    """Fire when condition (see aggregator.db.alerts) holds for one of items (empty = any item)."""
+
+    name: str
+    condition: str
+    items: List[int] = []
+
+
+class AlertRuleBook(BaseModel):
+    rules: List[AlertRule]
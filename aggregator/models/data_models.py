@@ -1,4 +1,8 @@
+from dataclasses import dataclass
+from functools import cached_property
 from typing import Dict, Optional, List
+
+import numpy as np
 from pydantic import BaseModel
 
 
@@ -42,25 +46,80 @@ class Volume5mItem(BaseModel):
     lowPriceVolume: Optional[int] = 0
 
 
+@dataclass(frozen=True)
+class ColumnStats:
+    count: int
+    sum: Optional[float]
+    mean: Optional[float]
+    median: Optional[float]
+
+
+@dataclass(frozen=True)
+class Volume5mStats:
+    columns: Dict[str, ColumnStats]
+    vwap_high: Optional[float]
+    vwap_low: Optional[float]
+
+
+VOLUME5M_COLUMNS = ("avgHighPrice", "highPriceVolume", "avgLowPrice", "lowPriceVolume")
+
+
+def _column_stats(values: np.ndarray) -> ColumnStats:
+    present = values[~np.isnan(values)]
+    if not len(present):
+        return ColumnStats(0, None, None, None)
+    total = float(present.sum())
+    return ColumnStats(len(present), total, total / len(present), float(np.median(present)))
+
+
+def _vwap(price: np.ndarray, volume: np.ndarray) -> Optional[float]:
+    keep = ~np.isnan(price) & ~np.isnan(volume)
+    traded = volume[keep].sum()
+    return float((price[keep] * volume[keep]).sum() / traded) if traded > 0 else None
+
+
 class Volume5m(BaseModel):
+    """
+    The /5m payload. Columns and aggregates are built from data on first
+    use and cached on the instance, so treat data as read-only afterwards.
+    """
+
     data: Dict[str, Volume5mItem]
 
+    @cached_property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """item_id plus one float64 array per Volume5mItem field (NaN where None), row-aligned."""
+        rows = [
+            (item_id, item.avgHighPrice, item.highPriceVolume, item.avgLowPrice, item.lowPriceVolume)
+            for item_id, item in self.data.items()
+        ]
+        table = np.array([row[1:] for row in rows], dtype=np.float64).reshape(len(rows), len(VOLUME5M_COLUMNS))
+        columns = {"item_id": np.array([int(row[0]) for row in rows], dtype=np.int64)}
+        columns.update((name, table[:, i]) for i, name in enumerate(VOLUME5M_COLUMNS))
+        return columns
+
+    @cached_property
+    def stats(self) -> Volume5mStats:
+        """Count, sum, mean and median of every column, and the volume-weighted prices."""
+        columns = self.columns
+        return Volume5mStats(
+            columns={name: _column_stats(columns[name]) for name in VOLUME5M_COLUMNS},
+            vwap_high=_vwap(columns["avgHighPrice"], columns["highPriceVolume"]),
+            vwap_low=_vwap(columns["avgLowPrice"], columns["lowPriceVolume"]),
+        )
+
     @property
     def avg_high_price(self) -> Optional[float]:
-        values = [item.avgHighPrice for item in self.data.values() if item.avgHighPrice is not None]
-        return sum(values) / len(values) if values else None
+        return self.stats.columns["avgHighPrice"].mean
 
     @property
     def avg_high_volume(self) -> Optional[float]:
-        values = [item.highPriceVolume for item in self.data.values() if item.highPriceVolume is not None]
-        return sum(values) / len(values) if values else None
+        return self.stats.columns["highPriceVolume"].mean
 
     @property
     def avg_low_price(self) -> Optional[float]:
-        values = [item.avgLowPrice for item in self.data.values() if item.avgLowPrice is not None]
-        return sum(values) / len(values) if values else None
+        return self.stats.columns["avgLowPrice"].mean
 
     @property
     def avg_low_volume(self) -> Optional[float]:
-        values = [item.lowPriceVolume for item in self.data.values() if item.lowPriceVolume is not None]
-        return sum(values) / len(values) if values else None
+        return self.stats.columns["lowPriceVolume"].mean
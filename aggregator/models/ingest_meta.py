@@ -0,0 +1,11 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+
+class IngestMeta(SQLModel, table=True):
+    """Single row (id=1) bumped by every price update so readers can cheaply detect new data."""
+
+    __tablename__ = "ingestmeta"
+    id: int | None = Field(default=None, primary_key=True)
+    generation: int = Field(default=0)
+    updated_at: datetime | None = None
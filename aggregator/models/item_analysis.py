@@ -0,0 +1,13 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+
+class ItemAnalysis(SQLModel, table=True):
+    """Result of one whole-market analysis (volatility, trend, ...) for one item."""
+
+    __tablename__ = "itemanalysis"
+    analysis: str = Field(primary_key=True)
+    item_id: int = Field(primary_key=True)
+    value: float = Field(index=True)
+    samples: int
+    computed_at: datetime
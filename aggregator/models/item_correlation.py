@@ -0,0 +1,11 @@
+from sqlmodel import SQLModel, Field
+
+
+class ItemCorrelation(SQLModel, table=True):
+    """One of an item's top-N most correlated neighbours by 5m return."""
+
+    __tablename__ = "itemcorrelation"
+    item_id: int = Field(primary_key=True)
+    rank: int = Field(primary_key=True)
+    neighbour_id: int
+    correlation: float
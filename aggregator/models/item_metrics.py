@@ -0,0 +1,18 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+
+class ItemMetrics(SQLModel, table=True):
+    """Rolling volatility and liquidity of one item over its recent 5m snapshots."""
+
+    __tablename__ = "item_metrics"
+    item_id: int = Field(primary_key=True)
+    samples: int  # snapshots in the window with both prices
+    spread_pct: float | None = None  # mean (high - low) / mid
+    spread_volatility: float | None = Field(default=None, index=True)  # stddev of spread_pct
+    atr_pct: float | None = Field(default=None, index=True)  # mean |mid change| per 5m / mid
+    volume_p50: float | None = None  # units traded per 5m
+    volume_p90: float | None = None
+    buy_fill_per_hour: float | None = Field(default=None, index=True)  # insta-sells filling a buy offer
+    sell_fill_per_hour: float | None = None  # insta-buys filling a sell offer
+    updated_at: datetime
@@ -0,0 +1,11 @@
+from sqlmodel import SQLModel, Field
+
+
+class ItemRanking(SQLModel, table=True):
+    """Position of one item in the top-K list for a metric (margin, roi, margin_volume)."""
+
+    __tablename__ = "itemranking"
+    metric: str = Field(primary_key=True)
+    rank: int = Field(primary_key=True)
+    item_id: int
+    value: float
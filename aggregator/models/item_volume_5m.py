@@ -1,9 +1,12 @@
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 from datetime import datetime
 
 
 class ItemSnapshot(SQLModel, table=True):
     __tablename__ = "itemsnapshot"
+    # Per-item range scans (history, charts) read this instead of sorting
+    __table_args__ = (Index("ix_itemsnapshot_item_id_timestamp", "item_id", "timestamp"),)
     id: int | None = Field(default=None, primary_key=True)
     item_id: int = Field(index=True)
     timestamp: datetime = Field(index=True)
@@ -0,0 +1,13 @@
+from sqlmodel import SQLModel, Field
+
+
+class PriceUpdate(SQLModel, table=True):
+    """One item whose high/low/24h volume changed in the tick that produced generation."""
+
+    __tablename__ = "priceupdate"
+    id: int | None = Field(default=None, primary_key=True)
+    generation: int = Field(index=True)
+    item_id: int
+    high: int | None = None
+    low: int | None = None
+    volume_24h: int = Field(default=0)
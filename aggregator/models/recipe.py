@@ -0,0 +1,28 @@
+from typing import Dict, List
+from pydantic import BaseModel
+from sqlmodel import SQLModel, Field
+
+
+class Recipe(BaseModel):
+    """Turn inputs into outputs (item id -> quantity); cost covers any coin fees."""
+
+    name: str
+    kind: str  # set, decant, craft, ...
+    inputs: Dict[int, int]
+    outputs: Dict[int, int]
+    cost: int = 0
+
+
+class RecipeBook(BaseModel):
+    recipes: List[Recipe]
+
+
+class RecipeProfit(SQLModel, table=True):
+    """Profit of one recipe at the latest prices, buying inputs low and selling outputs high."""
+
+    __tablename__ = "recipeprofit"
+    name: str = Field(primary_key=True)
+    kind: str = Field(index=True)
+    input_cost: int
+    output_value: int  # after GE tax
+    profit: int = Field(index=True)
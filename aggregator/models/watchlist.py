@@ -0,0 +1,12 @@
+from datetime import datetime, timezone
+
+from sqlmodel import SQLModel, Field
+
+
+class WatchlistEntry(SQLModel, table=True):
+    """One item on one user's watchlist."""
+
+    __tablename__ = "watchlistentry"
+    owner: str = Field(primary_key=True)
+    item_id: int = Field(primary_key=True)
+    added_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
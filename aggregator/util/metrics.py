@@ -0,0 +1,132 @@
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# (metric name, sorted label items)
+MetricKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+def _key(name: str, labels: dict) -> MetricKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels
+    )
+    return "{" + body + "}"
+
+
+class Metrics:
+    """
+    Thread-safe in-process registry of counters, gauges and timers that can
+    be rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[MetricKey, float] = {}
+        self.gauges: dict[MetricKey, float] = {}
+        # key -> [count, sum of seconds]
+        self.timers: dict[MetricKey, list[float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Add value to a counter."""
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to value."""
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Record one duration for a timer."""
+        key = _key(name, labels)
+        with self._lock:
+            count_sum = self.timers.setdefault(key, [0, 0.0])
+            count_sum[0] += 1
+            count_sum[1] += seconds
+        # Also keep the latest value so slow ticks are visible without rate()
+        self.set(f"{name}_last", seconds, **labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time the enclosed block and record it with observe()."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def get(self, name: str, **labels) -> float | None:
+        """Return the current value of a counter or gauge, or a timer's count."""
+        key = _key(name, labels)
+        with self._lock:
+            if key in self.counters:
+                return self.counters[key]
+            if key in self.gauges:
+                return self.gauges[key]
+            if key in self.timers:
+                return self.timers[key][0]
+        return None
+
+    def reset(self) -> None:
+        """Drop every recorded value."""
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.timers.clear()
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text format."""
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            timers = {k: list(v) for k, v in self.timers.items()}
+
+        lines = []
+        for kind, values in (("counter", counters), ("gauge", gauges)):
+            for name in sorted({name for name, _ in values}):
+                lines.append(f"# TYPE {name} {kind}")
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name in sorted({name for name, _ in timers}):
+            lines.append(f"# TYPE {name} summary")
+            for (metric, labels), (count, total) in sorted(timers.items()):
+                if metric == name:
+                    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+
+# Registry shared by the ingester
+metrics = Metrics()
+
+
+def start_metrics_server(port: int, registry: Metrics = metrics, host: str = "") -> ThreadingHTTPServer:
+    """Serve registry on http://host:port/metrics from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # scrapes every few seconds would flood stdout
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,145 @@
+"""
+Capital-constrained flip portfolio optimizer.
+
+Given a cash budget and a time horizon, choose how many of each item to buy
+at the current low price and sell at the current high price so the total
+expected GE profit (after tax) is as large as possible, subject to:
+
+- the GE buy limit, which resets every BUY_LIMIT_HOURS (0 = unknown, no cap)
+- a liquidity cap of liquidity_share of the volume expected to trade over
+  the horizon, so positions can actually be filled and unwound
+
+This is a bounded knapsack. It is solved with the greedy LP relaxation:
+items are taken in order of profit per coin spent, each up to its cap,
+until the budget runs out. Every step is a NumPy array operation, so the
+whole catalogue ranks in a few milliseconds.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from aggregator.util.margin import ge_margin
+
+BUY_LIMIT_HOURS = 4
+DEFAULT_HORIZON_HOURS = 4.0
+DEFAULT_LIQUIDITY_SHARE = 0.1
+TAX_CAP = 5_000_000
+FILL_PASSES = 3
+
+
+@dataclass
+class Allocation:
+    item_id: int
+    name: str
+    quantity: int
+    buy_price: int
+    sell_price: int
+    cost: int
+    profit: int
+
+
+def unit_profit(high: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """Vectorised ge_margin: profit per item after GE tax."""
+    return high - np.minimum(high // 100, TAX_CAP) - low
+
+
+def quantity_caps(
+    limit: np.ndarray,
+    volume_24h: np.ndarray,
+    horizon_hours: float = DEFAULT_HORIZON_HOURS,
+    liquidity_share: float = DEFAULT_LIQUIDITY_SHARE,
+) -> np.ndarray:
+    """Most units of each item that can be bought within the horizon."""
+    windows = max(1, int(np.ceil(horizon_hours / BUY_LIMIT_HOURS)))
+    buy_cap = np.where(limit > 0, limit * windows, np.iinfo(np.int64).max)
+    liquidity_cap = np.floor(volume_24h * (horizon_hours / 24) * liquidity_share)
+    return np.minimum(buy_cap, liquidity_cap).astype(np.int64)
+
+
+def _fill(order: np.ndarray, cost: np.ndarray, room: np.ndarray, budget: int) -> tuple[np.ndarray, int]:
+    """One greedy pass in `order`: full caps while they fit, then a partial fill."""
+    spend = cost[order] * room[order]
+    cumulative = np.cumsum(spend)
+    take = np.where(cumulative <= budget, room[order], 0)
+    boundary = np.searchsorted(cumulative, budget, side="right")
+    if boundary < len(order):
+        spent_before = cumulative[boundary - 1] if boundary else 0
+        take[boundary] = min(room[order[boundary]], (budget - spent_before) // cost[order[boundary]])
+    quantity = np.zeros_like(room)
+    quantity[order] = take
+    return quantity, budget - int((cost * quantity).sum())
+
+
+def optimize(
+    high: np.ndarray,
+    low: np.ndarray,
+    limit: np.ndarray,
+    volume_24h: np.ndarray,
+    budget: int,
+    horizon_hours: float = DEFAULT_HORIZON_HOURS,
+    liquidity_share: float = DEFAULT_LIQUIDITY_SHARE,
+) -> np.ndarray:
+    """Return the quantity to buy of each item (aligned with the input arrays)."""
+    high = np.asarray(high, dtype=np.int64)
+    low = np.asarray(low, dtype=np.int64)
+    profit = unit_profit(high, low)
+    caps = quantity_caps(
+        np.asarray(limit, dtype=np.int64),
+        np.asarray(volume_24h, dtype=np.int64),
+        horizon_hours,
+        liquidity_share,
+    )
+    eligible = (profit > 0) & (low > 0) & (caps > 0)
+    candidates = np.flatnonzero(eligible)
+    # Best return per coin first; higher absolute profit breaks ties
+    ratio = profit[candidates] / low[candidates]
+    order = candidates[np.lexsort((-profit[candidates], -ratio))]
+
+    quantity = np.zeros(len(high), dtype=np.int64)
+    remaining = int(budget)
+    # Later passes spend what the partial fill left over on cheaper items
+    for _ in range(FILL_PASSES):
+        room = caps - quantity
+        pending = order[(room[order] > 0) & (low[order] <= remaining)]
+        if not len(pending):
+            break
+        added, remaining = _fill(pending, low, room, remaining)
+        quantity += added
+    return quantity
+
+
+def optimize_items(
+    items,
+    budget: int,
+    horizon_hours: float = DEFAULT_HORIZON_HOURS,
+    liquidity_share: float = DEFAULT_LIQUIDITY_SHARE,
+) -> list[Allocation]:
+    """Optimise over Item rows; returns allocations, most profitable first."""
+    priced = [i for i in items if i.high is not None and i.low is not None]
+    if not priced:
+        return []
+    quantity = optimize(
+        [i.high for i in priced],
+        [i.low for i in priced],
+        [i.limit or 0 for i in priced],
+        [i.volume_24h or 0 for i in priced],
+        budget,
+        horizon_hours,
+        liquidity_share,
+    )
+    allocations = [
+        Allocation(
+            item_id=item.id,
+            name=item.name,
+            quantity=int(q),
+            buy_price=item.low,
+            sell_price=item.high,
+            cost=int(q) * item.low,
+            profit=int(q) * ge_margin(item.high, item.low),
+        )
+        for item, q in zip(priced, quantity)
+        if q > 0
+    ]
+    allocations.sort(key=lambda a: a.profit, reverse=True)
+    return allocations
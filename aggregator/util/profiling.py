@@ -0,0 +1,129 @@
+"""
+Opt-in profiling for the ingester and the Streamlit pages.
+
+Runs a callable under cProfile while timing every SQL statement through
+SQLAlchemy cursor events, then writes:
+
+- ``<name>.pstats``: load with ``python -m pstats``, snakeviz or flameprof
+- ``<name>.sql.json``: per-statement count, total and max seconds
+
+Usage::
+
+    python -m aggregator.db.data_input --profile --cycles 3
+    python -m aggregator.util.profiling page usage/best_margin.py
+"""
+
+import argparse
+import cProfile
+import io
+import json
+import logging
+import pstats
+import runpy
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILE_ENV = "OSRS_GE_PROFILE"
+PROFILE_DIR = Path("profiles")
+PROFILE_CYCLES = 3
+
+logger = logging.getLogger(__name__)
+
+
+class SQLTimer:
+    """Aggregate execution time per SQL statement for every engine."""
+
+    def __init__(self):
+        self.stats: dict[str, dict] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.start = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - getattr(self._local, "start", time.perf_counter())
+        with self._lock:
+            entry = self.stats.setdefault(
+                statement, {"count": 0, "total_s": 0.0, "max_s": 0.0}
+            )
+            entry["count"] += 1
+            entry["total_s"] += elapsed
+            entry["max_s"] = max(entry["max_s"], elapsed)
+
+    def __enter__(self):
+        event.listen(Engine, "before_cursor_execute", self._before)
+        event.listen(Engine, "after_cursor_execute", self._after)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, "before_cursor_execute", self._before)
+        event.remove(Engine, "after_cursor_execute", self._after)
+
+    def report(self) -> list[dict]:
+        """Statements sorted by total time, slowest first."""
+        rows = [{"statement": s, **v} for s, v in self.stats.items()]
+        return sorted(rows, key=lambda r: r["total_s"], reverse=True)
+
+
+def profile_call(func, *args, name: str = "profile", output_dir: Path = PROFILE_DIR, **kwargs):
+    """
+    Run func(*args, **kwargs) under cProfile and the SQL timer and dump the
+    results into output_dir. Returns func's result.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    profiler = cProfile.Profile()
+    with SQLTimer() as sql_timer:
+        profiler.enable()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            profiler.disable()
+
+    pstats_path = output_dir / f"{name}.pstats"
+    sql_path = output_dir / f"{name}.sql.json"
+    profiler.dump_stats(pstats_path)
+    sql_path.write_text(json.dumps(sql_timer.report(), indent=2))
+
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(20)
+    logger.info("%s", summary.getvalue())
+    logger.info("Wrote %s and %s", pstats_path, sql_path)
+    return result
+
+
+def profile_page(path: str, output_dir: Path = PROFILE_DIR) -> None:
+    """Profile one run of a Streamlit page script (bare mode, no server)."""
+    name = Path(path).stem
+    profile_call(runpy.run_path, path, run_name="__main__", name=name, output_dir=output_dir)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Profile the ingester or a page.")
+    parser.add_argument("--output", type=Path, default=PROFILE_DIR)
+    sub = parser.add_subparsers(dest="target", required=True)
+    ingest = sub.add_parser("ingest", help="profile N ingest cycles")
+    ingest.add_argument("--cycles", type=int, default=PROFILE_CYCLES)
+    ingest.add_argument("--interval", type=float, default=0)
+    page = sub.add_parser("page", help="profile one rerun of a Streamlit page")
+    page.add_argument("path")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.target == "ingest":
+        from aggregator.db.data_input import run_ingest
+
+        profile_call(
+            run_ingest, args.cycles, args.interval, name="ingest", output_dir=args.output
+        )
+    else:
+        profile_page(args.path, args.output)
+
+
+if __name__ == "__main__":
+    main()
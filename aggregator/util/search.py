@@ -0,0 +1,131 @@
+"""
+In-memory item name search.
+
+SearchIndex is built once from (id, name) pairs and answers ranked top-k
+queries without touching the database:
+
+- a sorted list of normalised names (and of every word in them) gives
+  exact, prefix and word-prefix matches by bisection
+- a trigram inverted index gives typo-tolerant fuzzy candidates, scored by
+  the Dice coefficient of the query's and the name's trigram sets
+
+Scores combine both, so "dragon d" ranks "Dragon dagger" above "Dragon
+bones" and "abysal whip" still finds "Abyssal whip".
+"""
+
+import heapq
+import re
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from aggregator.models.item_model import Item
+
+EXACT_BONUS = 3.0
+PREFIX_BONUS = 2.0
+WORD_PREFIX_BONUS = 1.0
+MIN_SIMILARITY = 0.3
+MIN_FUZZY_LENGTH = 3  # shorter queries are prefix-only
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    id: int
+    name: str
+    score: float
+
+
+def normalise(text: str) -> str:
+    """Lower-case and collapse punctuation/whitespace runs to single spaces."""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    """Trigrams of each word padded with spaces, so short words still produce some."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _prefix_range(keys: list[str], prefix: str) -> range:
+    start = bisect_left(keys, prefix)
+    end = bisect_left(keys, prefix + "\uffff", lo=start)
+    return range(start, end)
+
+
+class SearchIndex:
+    """Prefix and trigram index over item names."""
+
+    def __init__(self, items):
+        self.ids: list[int] = []
+        self.names: list[str] = []
+        self.gram_counts: list[int] = []
+        self.postings: dict[str, list[int]] = {}
+        names, words = [], []
+        for doc, (item_id, name) in enumerate(items):
+            norm = normalise(name)
+            self.ids.append(item_id)
+            self.names.append(name)
+            grams = trigrams(norm)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(doc)
+            names.append((norm, doc))
+            words.extend((word, doc) for word in norm.split())
+        names.sort()
+        words.sort()
+        self._name_keys = [n for n, _ in names]
+        self._name_docs = [d for _, d in names]
+        self._word_keys = [w for w, _ in words]
+        self._word_docs = [d for _, d in words]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int = 10) -> list[SearchResult]:
+        """Return up to k best matches for query, highest score first."""
+        query = normalise(query)
+        if not query:
+            return []
+        scores: dict[int, float] = {}
+
+        for i in _prefix_range(self._name_keys, query):
+            doc = self._name_docs[i]
+            exact = self._name_keys[i] == query
+            scores[doc] = max(scores.get(doc, 0.0), EXACT_BONUS if exact else PREFIX_BONUS)
+        last_word = query.split()[-1]
+        for i in _prefix_range(self._word_keys, last_word):
+            doc = self._word_docs[i]
+            scores[doc] = max(scores.get(doc, 0.0), WORD_PREFIX_BONUS)
+
+        shared = Counter()
+        query_grams = trigrams(query) if len(query) >= MIN_FUZZY_LENGTH else set()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+        for doc, count in shared.items():
+            similarity = 2 * count / (len(query_grams) + self.gram_counts[doc])
+            if similarity >= MIN_SIMILARITY or doc in scores:
+                scores[doc] = scores.get(doc, 0.0) + similarity
+
+        # Ties go to the shorter name, which is usually the base item
+        best = heapq.nsmallest(
+            k, scores.items(), key=lambda s: (-s[1], len(self.names[s[0]]), self.names[s[0]])
+        )
+        return [SearchResult(self.ids[doc], self.names[doc], score) for doc, score in best]
+
+
+def mapping_signature(session: Session) -> tuple[int, int | None]:
+    """Cheap (row count, max id) fingerprint that changes when items are added."""
+    return tuple(session.exec(select(func.count(Item.id), func.max(Item.id))).one())
+
+
+def build_index(session: Session) -> SearchIndex:
+    """Build a SearchIndex from the item table, reading only ids and names."""
+    return SearchIndex(session.exec(select(Item.id, Item.name)).all())
@@ -0,0 +1,217 @@
+"""
+Ingest pipeline micro-benchmark driven by recorded API payloads.
+
+Replays the ``/mapping``, ``/latest``, ``/volumes`` and ``/5m`` payloads in
+``benchmarks/fixtures`` (scaled up to the requested item counts) through the
+same code the ingester runs and times each stage separately:
+
+- decode: ``json.loads`` of the raw response bodies
+- validate: building the pydantic models the wrappers return
+- join: ``build_items`` (latest + mapping + 24h volume)
+- db_write: upserting the joined items and committing, into a throwaway SQLite file
+- snapshot_write: ``save_volume5m_to_db``
+
+Usage::
+
+    python -m benchmarks.ingest --sizes 4000 40000 --output ingest.json
+    python -m benchmarks.ingest --record        # refresh the fixtures from the wiki
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+ENDPOINTS = ("mapping", "latest", "volumes", "5m")
+DEFAULT_SIZES = (4_000, 40_000, 400_000)
+STAGES = ("decode", "validate", "join", "db_write", "snapshot_write")
+
+
+def load_fixtures(directory: Path = FIXTURES_DIR) -> dict:
+    """Load the recorded payload for every endpoint."""
+    return {name: json.loads((directory / f"{name}.json").read_text()) for name in ENDPOINTS}
+
+
+def record_fixtures(directory: Path = FIXTURES_DIR) -> None:
+    """Fetch fresh payloads from the wiki API and store them as fixtures."""
+    from aggregator.db import data_input
+
+    urls = {
+        "mapping": data_input.MAPPING_API_URL,
+        "latest": data_input.LATEST_API_URL,
+        "volumes": data_input.VOLUME_API_URL,
+        "5m": data_input.VOLUME_5M_API_URL,
+    }
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, url in urls.items():
+        payload = data_input.fetch_data(url)
+        (directory / f"{name}.json").write_text(json.dumps(payload))
+
+
+def scale_payloads(payloads: dict, size: int) -> dict:
+    """
+    Return payloads with ``size`` items, copying the recorded items under new
+    ids when the recording is smaller than ``size``.
+    """
+    base = payloads["mapping"]
+    max_id = max(item["id"] for item in base)
+    mapping, latest, volumes, five_min = [], {}, {}, {}
+    for n in range(size):
+        template = base[n % len(base)]
+        copy_no = n // len(base)
+        new_id = template["id"] + copy_no * (max_id + 1)
+        old_key = str(template["id"])
+
+        item = dict(template, id=new_id)
+        if copy_no:
+            item["name"] = f"{template['name']} #{copy_no}"
+        mapping.append(item)
+        if old_key in payloads["latest"]["data"]:
+            latest[str(new_id)] = payloads["latest"]["data"][old_key]
+        if old_key in payloads["volumes"]["data"]:
+            volumes[str(new_id)] = payloads["volumes"]["data"][old_key]
+        if old_key in payloads["5m"]["data"]:
+            five_min[str(new_id)] = payloads["5m"]["data"][old_key]
+
+    return {
+        "mapping": mapping,
+        "latest": dict(payloads["latest"], data=latest),
+        "volumes": dict(payloads["volumes"], data=volumes),
+        "5m": dict(payloads["5m"], data=five_min),
+    }
+
+
+def run_once(bodies: dict[str, bytes], db_url: str) -> dict[str, float]:
+    """Push one set of raw bodies through every stage, returning seconds per stage."""
+    from sqlmodel import Session
+
+    from aggregator.db.data_input import (
+        build_items,
+        parse_latest,
+        parse_mapping,
+        parse_volume,
+        parse_volume5m,
+        save_volume5m_to_db,
+    )
+    from aggregator.db.database import dispose_db, init_db
+    from aggregator.db.storage import get_storage
+
+    timings = {}
+
+    start = time.perf_counter()
+    decoded = {name: json.loads(body) for name, body in bodies.items()}
+    timings["decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mapping_data = parse_mapping(decoded["mapping"])
+    latest_data = parse_latest(decoded["latest"])
+    volume_data = parse_volume(decoded["volumes"])
+    volume_5m_data = parse_volume5m(decoded["5m"])
+    timings["validate"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    items = build_items(latest_data, mapping_data, volume_data)
+    timings["join"] = time.perf_counter() - start
+
+    engine = init_db(db_url)
+    try:
+        start = time.perf_counter()
+        with Session(engine) as session:
+            get_storage(engine).upsert_items(session, items)
+            session.commit()
+        timings["db_write"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        save_volume5m_to_db(volume_5m_data, engine)
+        timings["snapshot_write"] = time.perf_counter() - start
+    finally:
+        dispose_db()
+    return timings
+
+
+def benchmark(payloads: dict, sizes: list[int], repeat: int) -> list[dict]:
+    """Time every stage for each size, keeping the median of ``repeat`` runs."""
+    results = []
+    for size in sizes:
+        scaled = scale_payloads(payloads, size)
+        bodies = {name: json.dumps(payload).encode() for name, payload in scaled.items()}
+        runs = []
+        for _ in range(repeat):
+            # Fresh database per run so db_write always measures the insert path
+            with tempfile.TemporaryDirectory() as tmp:
+                runs.append(run_once(bodies, f"sqlite:///{Path(tmp) / 'bench.db'}"))
+        stages = {stage: statistics.median(r[stage] for r in runs) for stage in STAGES}
+        results.append(
+            {
+                "items": size,
+                "payload_bytes": {name: len(body) for name, body in bodies.items()},
+                "stages_s": stages,
+                "total_s": sum(stages.values()),
+                "items_per_s": size / sum(stages.values()),
+            }
+        )
+    return results
+
+
+def environment() -> dict:
+    """Describe where the numbers came from so runs can be compared."""
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=FIXTURES_DIR,
+        ).stdout.strip()
+    except OSError:
+        revision = ""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": revision or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def format_report(results: list[dict]) -> str:
+    """Render results as a plain-text table."""
+    header = f"{'items':>9}" + "".join(f"{s:>16}" for s in STAGES) + f"{'items/s':>12}"
+    lines = [header]
+    for r in results:
+        stages = "".join(f"{r['stages_s'][s] * 1000:>14.1f}ms" for s in STAGES)
+        lines.append(f"{r['items']:>9}{stages}{r['items_per_s']:>12.0f}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument(
+        "--record", action="store_true", help="re-record fixtures from the live API"
+    )
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_fixtures(args.fixtures)
+        return 0
+
+    results = benchmark(load_fixtures(args.fixtures), args.sizes, args.repeat)
+    print(format_report(results))
+    if args.output:
+        args.output.write_text(
+            json.dumps({"environment": environment(), "results": results}, indent=2)
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
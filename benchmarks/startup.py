@@ -0,0 +1,254 @@
+"""
+Cold-start benchmark for the ingester and the Streamlit pages.
+
+Each target is run in a fresh interpreter under ``python -X importtime`` so
+the numbers reflect a container cold start. For every target we record:
+
+- the per-package import cost (from the ``-X importtime`` breakdown),
+- the time spent importing/running the target itself,
+- the time to the first ``Item`` query,
+- the wall clock of the whole process.
+
+Usage::
+
+    python -m benchmarks.startup                      # print a report
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --check              # fail on budget regressions
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).resolve().parent / "startup_budget.json"
+
+# target name -> (kind, module name or page path relative to the repo root)
+TARGETS = {
+    "aggregator.db.data_input": ("module", "aggregator.db.data_input"),
+    "usage/best_margin.py": ("page", "usage/best_margin.py"),
+    "usage/flip_portfolio.py": ("page", "usage/flip_portfolio.py"),
+    "usage/high_alch.py": ("page", "usage/high_alch.py"),
+    "usage/item_lookup.py": ("page", "usage/item_lookup.py"),
+    "usage/sell_spike.py": ("page", "usage/sell_spike.py"),
+    "usage/watchlist.py": ("page", "usage/watchlist.py"),
+}
+
+RESULT_PREFIX = "STARTUP_RESULT "
+# Written to stderr by the child right before it touches the target, so the
+# harness's own imports can be left out of the breakdown.
+IMPORT_MARKER = "STARTUP_MARKER"
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """
+    Parse ``-X importtime`` output into a list of entries with
+    ``module``, ``self_us``, ``cumulative_us`` and ``depth``.
+    """
+    if IMPORT_MARKER in stderr:
+        stderr = stderr.split(IMPORT_MARKER, 1)[1]
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        if not self_us.strip().isdigit():
+            continue  # header line
+        stripped = name.lstrip(" ")
+        # The first level is indented by one space, each nested import by two more
+        depth = (len(name) - len(stripped) - 1) // 2
+        entries.append(
+            {
+                "module": stripped.strip(),
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": depth,
+            }
+        )
+    return entries
+
+
+def summarize_imports(entries: list[dict], top: int = 10) -> dict:
+    """
+    Total the import time and attribute each module's self time to its root
+    package, reporting the heaviest packages.
+    """
+    total_us = sum(e["cumulative_us"] for e in entries if e["depth"] == 0)
+    by_package: dict[str, int] = {}
+    for entry in entries:
+        root = entry["module"].split(".")[0]
+        by_package[root] = by_package.get(root, 0) + entry["self_us"]
+    heaviest = sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {
+        "total_ms": total_us / 1000,
+        "packages_ms": {name: us / 1000 for name, us in heaviest},
+    }
+
+
+def run_child(kind: str, target: str) -> None:
+    """Import or execute a single target and print its timings as JSON."""
+    import runpy
+
+    result: dict = {"error": None}
+    print(IMPORT_MARKER, file=sys.stderr, flush=True)
+    start = time.perf_counter()
+    try:
+        if kind == "module":
+            __import__(target)
+        else:
+            runpy.run_path(str(REPO_ROOT / target), run_name="__main__")
+        result["target_ms"] = (time.perf_counter() - start) * 1000
+
+        query_start = time.perf_counter()
+        from sqlmodel import Session, select
+
+        from aggregator.db.database import get_engine
+        from aggregator.models.item_model import Item
+
+        with Session(get_engine()) as session:
+            session.exec(select(Item).limit(1)).first()
+        result["first_query_ms"] = (time.perf_counter() - query_start) * 1000
+    except Exception as e:  # report rather than crash so other targets still run
+        result["error"] = f"{type(e).__name__}: {e}"
+    print(RESULT_PREFIX + json.dumps(result))
+
+
+def measure(name: str, db_url: str) -> dict:
+    """Run one target in a fresh interpreter and collect its timings."""
+    kind, target = TARGETS[name]
+    env = dict(os.environ)
+    env["OSRS_GE_DB_URL"] = db_url
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (str(REPO_ROOT), env.get("PYTHONPATH")) if p
+    )
+    cmd = [
+        sys.executable,
+        "-X",
+        "importtime",
+        "-m",
+        "benchmarks.startup",
+        "--child",
+        kind,
+        target,
+    ]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True, env=env, cwd=REPO_ROOT)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    child = {"error": f"no result (exit code {proc.returncode})"}
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            child = json.loads(line[len(RESULT_PREFIX) :])
+    imports = summarize_imports(parse_importtime(proc.stderr))
+    return {
+        "wall_ms": wall_ms,
+        "import_ms": imports["total_ms"],
+        "packages_ms": imports["packages_ms"],
+        "target_ms": child.get("target_ms"),
+        "first_query_ms": child.get("first_query_ms"),
+        "error": child.get("error"),
+    }
+
+
+def benchmark(names: list[str], runs: int, db_url: str) -> dict:
+    """Measure every target ``runs`` times and keep the median of each metric."""
+    results = {}
+    for name in names:
+        samples = [measure(name, db_url) for _ in range(runs)]
+        errors = [s["error"] for s in samples if s["error"]]
+        summary = {"runs": runs, "error": errors[0] if errors else None}
+        for key in ("wall_ms", "import_ms", "target_ms", "first_query_ms"):
+            values = [s[key] for s in samples if s[key] is not None]
+            summary[key] = statistics.median(values) if values else None
+        summary["packages_ms"] = samples[-1]["packages_ms"]
+        results[name] = summary
+    return results
+
+
+def check_budget(results: dict, budget: dict) -> list[str]:
+    """Return a message for every metric that is over its budget or errored."""
+    failures = []
+    for name, limits in budget.items():
+        result = results.get(name)
+        if result is None:
+            continue
+        if result["error"]:
+            failures.append(f"{name}: {result['error']}")
+            continue
+        for key, limit in limits.items():
+            value = result.get(key)
+            if value is not None and value > limit:
+                failures.append(f"{name}: {key} {value:.1f} > budget {limit:.1f}")
+    return failures
+
+
+def format_report(results: dict) -> str:
+    """Render results as a plain-text table."""
+    lines = [
+        f"{'target':<28}{'wall':>10}{'imports':>10}{'target':>10}{'query':>10}",
+    ]
+    for name, r in results.items():
+
+        def fmt(v):
+            return f"{v:>8.1f}ms" if v is not None else f"{'-':>10}"
+
+        lines.append(
+            f"{name:<28}{fmt(r['wall_ms'])}{fmt(r['import_ms'])}"
+            f"{fmt(r['target_ms'])}{fmt(r['first_query_ms'])}"
+        )
+        if r["error"]:
+            lines.append(f"    error: {r['error']}")
+        heaviest = ", ".join(f"{k} {v:.0f}ms" for k, v in r["packages_ms"].items())
+        lines.append(f"    heaviest imports: {heaviest}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("targets", nargs="*", help="targets to run (default: all)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--check", action="store_true", help="fail over budget")
+    parser.add_argument("--budget", type=Path, default=BUDGET_FILE)
+    parser.add_argument(
+        "--db-url", help="database to query (default: a throwaway SQLite file)"
+    )
+    parser.add_argument("--child", nargs=2, metavar=("KIND", "TARGET"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(*args.child)
+        return 0
+
+    names = args.targets or list(TARGETS)
+    unknown = [n for n in names if n not in TARGETS]
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = args.db_url or f"sqlite:///{Path(tmp) / 'startup.db'}"
+        results = benchmark(names, args.runs, db_url)
+
+    print(format_report(results))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.check:
+        failures = check_budget(results, json.loads(args.budget.read_text()))
+        for failure in failures:
+            print(f"BUDGET EXCEEDED {failure}", file=sys.stderr)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from sqlmodel import Session
+
+from aggregator.analytics.correlation import (
+    compute_correlations,
+    main,
+    neighbours_of,
+    return_matrix,
+    top_neighbours,
+)
+from aggregator.analytics.snapshots import SnapshotShard
+from aggregator.db.database import dispose_db, init_db
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_shard(prices: dict[int, list[float | None]]) -> SnapshotShard:
+    ids, ts, mids = [], [], []
+    for item_id, series in prices.items():
+        for step, price in enumerate(series):
+            ids.append(item_id)
+            ts.append(step * 300)
+            mids.append(np.nan if price is None else price)
+    mids = np.array(mids)
+    zeros = np.zeros(len(ids), dtype=np.int64)
+    return SnapshotShard(np.array(ids), np.array(ts), mids, mids, zeros, zeros)
+
+
+def brute_force(z, top_n):
+    corr = (z.T @ z / len(z)).astype(np.float64)
+    np.fill_diagonal(corr, -np.inf)
+    return np.argsort(-corr, axis=1, kind="stable")[:, :top_n]
+
+
+class TestReturnMatrix:
+    """Test alignment and standardisation."""
+
+    def test_standardised_columns(self):
+        """Test that each column has zero mean and unit variance."""
+        rng = np.random.default_rng(0)
+        shard = make_shard({i: list(100 * np.exp(np.cumsum(rng.normal(0, 0.01, 40)))) for i in (5, 7, 9)})
+
+        item_ids, z = return_matrix(shard)
+
+        assert item_ids.tolist() == [5, 7, 9]
+        assert z.dtype == np.float32
+        assert z.shape == (39, 3)
+        assert np.allclose(z.mean(axis=0), 0, atol=1e-5)
+        assert np.allclose((z**2).mean(axis=0), 1, atol=1e-4)
+
+    def test_sparse_and_flat_items_dropped(self):
+        """Test that items with too few returns or no movement are excluded."""
+        rng = np.random.default_rng(1)
+        moving = list(100 * np.exp(np.cumsum(rng.normal(0, 0.01, 20))))
+        shard = make_shard(
+            {
+                1: moving,
+                2: [p * 2 for p in moving],
+                3: [100.0] * 20,
+                4: [50.0, 51.0] + [None] * 18,
+            }
+        )
+
+        item_ids, _ = return_matrix(shard)
+
+        assert item_ids.tolist() == [1, 2]
+
+    def test_gaps_do_not_hide_co_movement(self):
+        """Test that an identical series with missing snapshots still correlates fully."""
+        rng = np.random.default_rng(4)
+        prices = list(100 * np.exp(np.cumsum(rng.normal(0, 0.01, 400))))
+        gaps = rng.random(len(prices))
+        shard = make_shard(
+            {
+                1: prices,
+                2: [p * 3 for p in prices],
+                3: [None if g < 0.15 else p for g, p in zip(gaps, prices)],
+                4: [None if g < 0.3 else p for g, p in zip(gaps, prices)],
+            }
+        )
+
+        item_ids, z = return_matrix(shard)
+        neighbours, values = top_neighbours(z, top_n=3)
+
+        assert item_ids.tolist() == [1, 2, 3, 4]
+        assert values[0, 0] == pytest.approx(1, abs=1e-3)
+        assert values[2, :2].min() > 0.9
+        assert values[3].min() > 0.8
+
+
+class TestTopNeighbours:
+    """Test the blocked neighbour search."""
+
+    @pytest.mark.parametrize("block_size", [1, 7, 64])
+    def test_matches_full_matrix(self, block_size):
+        """Test that any block size agrees with the full correlation matrix."""
+        rng = np.random.default_rng(2)
+        factors = rng.normal(size=(200, 4))
+        z = (factors @ rng.normal(size=(4, 30)) + rng.normal(size=(200, 30))).astype(np.float32)
+        z = (z - z.mean(axis=0)) / z.std(axis=0)
+
+        neighbours, values = top_neighbours(z, top_n=5, block_size=block_size)
+
+        assert (neighbours == brute_force(z, 5)).all()
+        assert (np.diff(values, axis=1) <= 0).all()
+        assert (neighbours != np.arange(30)[:, None]).all()
+
+    def test_pairs_without_overlap(self):
+        """Test that columns sharing too few returns are never neighbours."""
+        rng = np.random.default_rng(5)
+        z = np.zeros((40, 3), dtype=np.float32)
+        z[:20, 0], z[20:, 1], z[:, 2] = rng.normal(size=20), rng.normal(size=20), rng.normal(size=40)
+
+        neighbours, values = top_neighbours(z, top_n=2, min_overlap=10)
+
+        assert neighbours[0, 0] == 2 and values[0, 1] == -np.inf
+
+
+class TestComputeCorrelations:
+    """Test the end-to-end job."""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        engine = init_db(f"sqlite:///{tmp_path / 'corr.db'}")
+        rng = np.random.default_rng(3)
+        common = rng.normal(0, 0.01, 60)
+        with Session(engine) as session:
+            for item_id in (1, 2, 3):
+                noise = rng.normal(0, 0.004 if item_id < 3 else 0.05, 60)
+                shocks = (common if item_id < 3 else 0) + noise
+                for step, price in enumerate(1_000 * np.exp(np.cumsum(shocks))):
+                    session.add(
+                        ItemSnapshot(
+                            item_id=item_id,
+                            timestamp=T0 + timedelta(minutes=5 * step),
+                            avg_high_price=float(price),
+                            avg_low_price=float(price),
+                        )
+                    )
+            session.commit()
+        yield engine
+        dispose_db()
+
+    def test_stores_neighbours(self, engine):
+        """Test that co-moving items are each other's best neighbour."""
+        written = compute_correlations(engine, top_n=2)
+
+        with Session(engine) as session:
+            first = neighbours_of(session, 1)
+            second = neighbours_of(session, 2, limit=1)
+        assert written == 6
+        assert [n.neighbour_id for n in first] == [2, 3]
+        assert first[0].correlation > 0.5
+        assert second[0].neighbour_id == 1
+
+    def test_rerun_replaces(self, engine):
+        """Test that a second run replaces the table and an empty window clears it."""
+        compute_correlations(engine, top_n=2)
+
+        assert compute_correlations(engine, since=T0 + timedelta(days=1)) == 0
+        with Session(engine) as session:
+            assert neighbours_of(session, 1) == []
+
+    def test_main(self, engine, caplog):
+        """Test the command line entry point."""
+        caplog.set_level(logging.INFO)
+        main(["--db-url", str(engine.url), "--days", "100000", "--top", "1"])
+
+        assert "Stored 3 neighbour rows" in caplog.text
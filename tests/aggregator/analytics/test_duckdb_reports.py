@@ -0,0 +1,211 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+duckdb = pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from aggregator.analytics import duckdb_reports
+from aggregator.analytics.duckdb_reports import (
+    connect,
+    daily_vwap,
+    export_parquet,
+    main,
+    sqlite_path,
+    volume_percentiles,
+    weekly_summary,
+)
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+T0 = datetime(2025, 1, 6)  # a Monday
+
+# item_id, minutes after T0, avg high, high volume, avg low, low volume
+ROWS = [
+    (1, 0, 100.0, 10, 90.0, 30),
+    (1, 5, 110.0, 30, None, 5),
+    (1, 24 * 60, 200.0, 1, 180.0, 1),
+    (2, 0, 5.0, 0, 4.0, 0),
+    (2, 7 * 24 * 60, 7.0, 100, 5.0, 100),
+]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """Parquet archive holding ROWS, written with DuckDB itself."""
+    path = tmp_path / "archive.parquet"
+    conn = duckdb.connect()
+    conn.execute(
+        "CREATE TABLE s (item_id BIGINT, timestamp TIMESTAMP, avg_high_price DOUBLE, "
+        "high_price_volume BIGINT, avg_low_price DOUBLE, low_price_volume BIGINT)"
+    )
+    conn.executemany(
+        "INSERT INTO s VALUES (?, ?, ?, ?, ?, ?)",
+        [(i, T0 + timedelta(minutes=m), h, hv, l, lv) for i, m, h, hv, l, lv in ROWS],
+    )
+    conn.execute(f"COPY s TO '{path}' (FORMAT parquet)")
+    conn.close()
+    return str(path)
+
+
+@pytest.fixture
+def conn(archive):
+    conn = connect(archive=archive, sqlite=False)
+    yield conn
+    conn.close()
+
+
+class TestConnect:
+    """Test building the snapshots view."""
+
+    def test_requires_a_source(self):
+        """Test that a connection with nothing attached is refused."""
+        with pytest.raises(ValueError):
+            connect(sqlite=False)
+
+    def test_sqlite_path(self):
+        """Test extracting the database file from a URL."""
+        assert sqlite_path("sqlite:///data/item_data.db") == "data/item_data.db"
+        with pytest.raises(ValueError):
+            sqlite_path("postgresql://localhost/osrs")
+
+    def test_missing_duckdb(self, monkeypatch):
+        """Test the error when the optional dependency is absent."""
+        monkeypatch.setattr(duckdb_reports, "duckdb", None)
+        with pytest.raises(RuntimeError):
+            connect(archive="x.parquet", sqlite=False)
+
+    def test_archived_rows_not_counted_twice(self, archive):
+        """Test that live rows already exported to the archive are left out of the view."""
+        conn = duckdb.connect()
+        conn.execute(f"CREATE TABLE live AS SELECT * FROM read_parquet('{archive}')")
+        conn.execute("INSERT INTO live VALUES (2, ?, 8.0, 1, 6.0, 1)", [T0 + timedelta(days=8)])
+        conn.execute("CREATE TABLE empty AS SELECT * FROM live LIMIT 0")
+        archived = f"read_parquet(['{archive}'])"
+
+        conn.execute(f"CREATE VIEW snapshots AS {duckdb_reports._view('live', archived)}")
+        counts = {r["item_id"]: r["samples"] for r in volume_percentiles(conn).to_pylist()}
+        conn.execute(f"CREATE OR REPLACE VIEW snapshots AS {duckdb_reports._view('live', 'empty')}")
+        without_archive = volume_percentiles(conn).to_pylist()
+        conn.close()
+
+        assert counts == {1: 3, 2: 3}
+        assert sum(r["samples"] for r in without_archive) == len(ROWS) + 1
+
+    def test_sqlite_extension_installed_once(self):
+        """Test that the sqlite extension is only downloaded when LOAD fails."""
+
+        class Conn:
+            def __init__(self, installed):
+                self.installed, self.calls = installed, []
+
+            def execute(self, sql):
+                self.calls.append(sql)
+                if sql == "INSTALL sqlite":
+                    self.installed = True
+                elif not self.installed:
+                    raise duckdb.IOException("sqlite extension not installed")
+
+        installed, missing = Conn(installed=True), Conn(installed=False)
+        duckdb_reports._load_sqlite(installed)
+        duckdb_reports._load_sqlite(missing)
+
+        assert installed.calls == ["LOAD sqlite"]
+        assert missing.calls == ["LOAD sqlite", "INSTALL sqlite", "LOAD sqlite"]
+
+
+class TestReports:
+    """Test the report queries over a Parquet archive."""
+
+    def test_daily_vwap(self, conn):
+        """Test volume weighting, missing prices and day buckets."""
+        rows = daily_vwap(conn, item_ids=[1]).to_pylist()
+
+        assert [r["day"] for r in rows] == [date(2025, 1, 6), date(2025, 1, 7)]
+        first = rows[0]
+        # The 5 units sold without a price do not dilute the average
+        assert first["vwap"] == pytest.approx((100 * 10 + 110 * 30 + 90 * 30) / 70)
+        assert first["high_vwap"] == pytest.approx((100 * 10 + 110 * 30) / 40)
+        assert first["low_vwap"] == pytest.approx(90)
+        assert (first["high_volume"], first["low_volume"]) == (40, 35)
+
+    def test_daily_vwap_without_volume(self, conn):
+        """Test that days with no traded volume have no vwap."""
+        rows = daily_vwap(conn, until=T0 + timedelta(days=1), item_ids=[2]).to_pylist()
+        assert rows[0]["vwap"] is None
+
+    def test_volume_percentiles(self, conn):
+        """Test per-item percentiles of 5m volume."""
+        rows = volume_percentiles(conn, percentiles=(0.5, 0.995)).to_pylist()
+
+        assert [r["item_id"] for r in rows] == [1, 2]
+        assert rows[0]["samples"] == 3
+        assert rows[0]["p50"] == 35
+        assert set(rows[0]) == {"item_id", "samples", "p50", "p99_5"}
+
+    def test_weekly_summary(self, conn):
+        """Test ISO week buckets of the mid price."""
+        rows = weekly_summary(conn, item_ids=[2]).to_pylist()
+
+        assert [r["week"] for r in rows] == [date(2025, 1, 6), date(2025, 1, 13)]
+        assert rows[1]["mean"] == 6.0
+        assert rows[1]["volume"] == 200
+
+    def test_filters(self, conn):
+        """Test since/until (tz-aware) and item filters."""
+        since = datetime(2025, 1, 7, tzinfo=timezone.utc)
+        assert daily_vwap(conn, since=since).num_rows == 2
+        assert daily_vwap(conn, item_ids=[]).num_rows == 0
+
+    def test_output(self, conn):
+        """Test that unknown output formats are rejected."""
+        with pytest.raises(ValueError):
+            daily_vwap(conn, output="csv")
+
+
+class TestMain:
+    """Test the command line entry point."""
+
+    def test_writes_csv(self, archive, tmp_path, capsys):
+        """Test that a report can be written to a file."""
+        out = tmp_path / "vwap.csv"
+
+        main(["vwap", "--archive", archive, "--archive-only", "--item", "1", "--output", str(out)])
+
+        assert "Wrote 2 rows" in capsys.readouterr().out
+        assert out.read_text().splitlines()[0].startswith("item_id,day,vwap")
+
+    def test_prints(self, archive, capsys):
+        """Test that a report is printed without --output."""
+        main(["weekly", "--archive", archive, "--archive-only"])
+        assert "week" in capsys.readouterr().out
+
+
+class TestSqlite:
+    """Test attaching the SQLite database (needs DuckDB's sqlite extension)."""
+
+    def test_sqlite_and_archive(self, tmp_path, archive):
+        """Test that SQLite rows and archived rows are queried together and can be exported."""
+        db = tmp_path / "item_data.db"
+        engine = create_engine(f"sqlite:///{db}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(
+                ItemSnapshot(
+                    item_id=3,
+                    timestamp=datetime(2025, 2, 1, tzinfo=timezone.utc),
+                    avg_high_price=50,
+                    high_price_volume=2,
+                )
+            )
+            session.commit()
+        engine.dispose()
+        try:
+            conn = connect(str(db), archive)
+        except duckdb.Error as e:
+            pytest.skip(f"DuckDB sqlite extension unavailable: {e}")
+
+        assert [r["item_id"] for r in volume_percentiles(conn).to_pylist()] == [1, 2, 3]
+        assert export_parquet(conn, str(tmp_path / "old.parquet")) == 1
+        conn.close()
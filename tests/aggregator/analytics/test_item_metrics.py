@@ -0,0 +1,137 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from sqlmodel import Session, select
+
+from aggregator.analytics.item_metrics import ItemMetricsStage, main
+from aggregator.db.database import dispose_db
+from aggregator.models.item_metrics import ItemMetrics
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def add_snapshot(engine, step, rows):
+    """Write one 5m snapshot: {item_id: (high, low, high_volume, low_volume)}."""
+    with Session(engine) as session:
+        for item_id, (high, low, hv, lv) in rows.items():
+            session.add(
+                ItemSnapshot(
+                    item_id=item_id,
+                    timestamp=T0 + timedelta(minutes=5 * step, microseconds=123),
+                    avg_high_price=high,
+                    avg_low_price=low,
+                    high_price_volume=hv,
+                    low_price_volume=lv,
+                )
+            )
+        session.commit()
+
+
+def stored(engine):
+    with Session(engine) as session:
+        return {m.item_id: m for m in session.exec(select(ItemMetrics)).all()}
+
+
+class TestItemMetricsStage:
+    """Test the incremental metrics stage."""
+
+    def test_metrics(self, engine):
+        """Test each metric against a hand calculation."""
+        for step, (high, low) in enumerate([(110, 90), (120, 100), (115, 95), (110, 90)]):
+            add_snapshot(engine, step, {1: (high, low, 10 * (step + 1), 20)})
+
+        assert ItemMetricsStage(engine)() == 1
+
+        m = stored(engine)[1]
+        spreads = np.array([20 / 100, 20 / 110, 20 / 105, 20 / 100])
+        mids = np.array([100, 110, 105, 100])
+        assert m.samples == 4
+        assert m.spread_pct == pytest.approx(spreads.mean())
+        assert m.spread_volatility == pytest.approx(spreads.std())
+        assert m.atr_pct == pytest.approx(np.abs(np.diff(mids)).mean() / mids.mean())
+        assert m.volume_p50 == pytest.approx(np.percentile([30, 40, 50, 60], 50))
+        assert m.buy_fill_per_hour == 20 * 12
+        assert m.sell_fill_per_hour == 25 * 12
+
+    def test_incremental_reads_only_new_snapshots(self, engine):
+        """Test that later calls only touch items in new snapshots."""
+        stage = ItemMetricsStage(engine)
+        add_snapshot(engine, 0, {1: (110, 90, 1, 1), 2: (55, 45, 1, 1)})
+        add_snapshot(engine, 1, {1: (110, 90, 1, 1), 2: (55, 45, 1, 1)})
+        assert stage() == 2
+
+        assert stage() == 0
+        add_snapshot(engine, 2, {1: (130, 90, 1, 1)})
+        assert stage() == 1
+        assert stored(engine)[1].samples == 3
+        assert stored(engine)[2].samples == 2
+
+    def test_window_rolls(self, engine):
+        """Test that snapshots older than the window fall out."""
+        stage = ItemMetricsStage(engine, window=3)
+        for step in range(5):
+            add_snapshot(engine, step, {1: (100 + step, 90, 1, 1)})
+            stage()
+
+        m = stored(engine)[1]
+        assert m.samples == 3
+        assert m.spread_pct == pytest.approx(np.mean([12 / 96, 13 / 96.5, 14 / 97]))
+
+    def test_warm_start_limited_to_window(self, engine):
+        """Test that a fresh stage only loads one window of history."""
+        for step in range(6):
+            add_snapshot(engine, step, {1: (110, 90, 1, 1)})
+
+        ItemMetricsStage(engine, window=4)()
+
+        assert stored(engine)[1].samples == 4
+
+    def test_cold_start_catches_up_in_batches(self, engine):
+        """Test that a fresh stage reads the window a batch at a time and ends up complete."""
+        for step in range(6):
+            add_snapshot(engine, step, {1: (100 + step, 90, 1, 1)})
+        stage = ItemMetricsStage(engine, window=6, batch=2)
+
+        samples = []
+        while stage():
+            samples.append(stored(engine)[1].samples)
+
+        assert samples == [2, 4, 6]
+        backfill = ItemMetricsStage(engine, window=6, batch=6)
+        backfill()
+        np.testing.assert_allclose(stage.high[0], backfill.high[0])
+
+    def test_missing_prices_stored_as_null(self, engine):
+        """Test that an item with no buy side gets NULL spread metrics."""
+        for step in range(3):
+            add_snapshot(engine, step, {1: (110, 90, 1, 1), 2: (50, None, 1, 0)})
+
+        ItemMetricsStage(engine)()
+
+        assert set(stored(engine)) == {1}
+
+    def test_capacity_grows(self, engine):
+        """Test that more items than the initial buffer capacity are handled."""
+        stage = ItemMetricsStage(engine)
+        stage_rows = len(stage.high)
+        rows = {i: (110, 90, 1, 1) for i in range(stage_rows + 5)}
+        add_snapshot(engine, 0, rows)
+        add_snapshot(engine, 1, rows)
+
+        assert stage() == stage_rows + 5
+
+    def test_main(self, engine, caplog):
+        """Test the backfill entry point."""
+        caplog.set_level(logging.INFO)
+        add_snapshot(engine, 0, {1: (110, 90, 1, 1)})
+        add_snapshot(engine, 1, {1: (110, 90, 1, 1)})
+
+        try:
+            main(["--db-url", str(engine.url)])
+        finally:
+            dispose_db()
+
+        assert "Updated metrics for 1 items" in caplog.text
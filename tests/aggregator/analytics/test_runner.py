@@ -0,0 +1,182 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from sqlmodel import Session, select
+
+from aggregator.analytics.runner import (
+    ANALYSES,
+    main,
+    run_analytics,
+    shard_ranges,
+    trend,
+    volatility,
+)
+from aggregator.analytics import snapshots
+from aggregator.analytics.snapshots import load_shard, read_only_engine
+from aggregator.db.database import dispose_db, get_engine, init_db
+from aggregator.models.item_analysis import ItemAnalysis
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    """SQLite file with 12 items of synthetic 5m history."""
+    url = f"sqlite:///{tmp_path / 'history.db'}"
+    engine = init_db(url)
+    rng = np.random.default_rng(1)
+    with Session(engine) as session:
+        for item_id in range(1, 13):
+            price = 1_000.0 * item_id
+            for step in range(50):
+                price *= 1 + rng.normal(0.001 * item_id, 0.01)
+                session.add(
+                    ItemSnapshot(
+                        item_id=item_id,
+                        timestamp=T0 + timedelta(minutes=5 * step),
+                        avg_high_price=price * 1.01,
+                        avg_low_price=price * 0.99,
+                        high_price_volume=10,
+                        low_price_volume=12,
+                    )
+                )
+        session.add(ItemSnapshot(item_id=99, timestamp=T0, avg_high_price=None, avg_low_price=5))
+        session.commit()
+    yield url
+    dispose_db()
+
+
+class TestSnapshots:
+    """Test columnar loading."""
+
+    def test_load_range(self, db_url):
+        """Test that only the requested id range is read, sorted by item and time."""
+        engine = read_only_engine(db_url)
+        shard = load_shard(engine, 3, 5)
+        engine.dispose()
+
+        assert set(shard.item_id.tolist()) == {3, 4}
+        assert len(shard) == 100
+        assert (np.diff(shard.timestamp[:50]) == 300).all()
+        assert [g[0] for g in shard.groups()] == [3, 4]
+
+    def test_timestamps_are_utc(self, db_url, monkeypatch):
+        """Test that stored timestamps convert as UTC whatever the host time zone."""
+        monkeypatch.setenv("TZ", "EST+05")
+        time.tzset()
+        try:
+            engine = read_only_engine(db_url)
+            shard = load_shard(engine, 1, 2)
+            engine.dispose()
+            # Drivers hand back naive datetimes for timestamp without time zone
+            naive = snapshots._unix_seconds(T0.replace(tzinfo=None))
+            aware = snapshots._unix_seconds(T0.astimezone(timezone(timedelta(hours=-5))))
+        finally:
+            monkeypatch.undo()
+            time.tzset()
+
+        assert shard.timestamp[0] == naive == aware == int(T0.timestamp())
+
+    def test_read_only(self, db_url):
+        """Test that the worker connection refuses writes."""
+        engine = read_only_engine(db_url)
+        with pytest.raises(Exception, match="readonly"):
+            with engine.begin() as conn:
+                conn.exec_driver_sql("DELETE FROM itemsnapshot")
+        engine.dispose()
+
+    def test_missing_values(self, db_url):
+        """Test that NULL prices load as NaN."""
+        engine = read_only_engine(db_url)
+        shard = load_shard(engine, 99, 100)
+        engine.dispose()
+
+        assert np.isnan(shard.avg_high_price[0])
+
+    def test_chunked_load(self, db_url):
+        """Test that reading in small chunks gives the same columns as one chunk."""
+        engine = read_only_engine(db_url)
+        whole = load_shard(engine)
+        with patch("aggregator.analytics.snapshots.CHUNK_ROWS", 7):
+            chunked = load_shard(engine)
+        empty = load_shard(engine, 50, 60)
+        engine.dispose()
+
+        for name in ("item_id", "timestamp", "avg_high_price", "high_price_volume"):
+            np.testing.assert_array_equal(getattr(chunked, name), getattr(whole, name))
+        assert len(empty) == 0
+        assert empty.timestamp.dtype == np.int64
+
+
+class TestAnalyses:
+    """Test the per-shard analyses."""
+
+    def test_volatility_and_trend(self, db_url):
+        """Test that faster-drifting items get steeper trends; items without mids are skipped."""
+        engine = read_only_engine(db_url)
+        shard = load_shard(engine)
+        engine.dispose()
+
+        vol = dict((i, v) for i, v, _ in volatility(shard))
+        slopes = dict((i, v) for i, v, _ in trend(shard))
+
+        assert 99 not in vol and 99 not in slopes
+        assert all(0.005 < v < 0.02 for v in vol.values())
+        assert slopes[12] > slopes[1]
+
+
+class TestShardRanges:
+    """Test id range splitting."""
+
+    def test_ranges_cover_every_item_once(self, db_url):
+        """Test that ranges are contiguous and hold similar numbers of items."""
+        with Session(init_db(db_url)) as session:
+            ranges = shard_ranges(session, 5)
+
+        assert len(ranges) == 5
+        assert ranges[0][0] == 1 and ranges[-1][1] == 100
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+class TestRunAnalytics:
+    """Test the end-to-end runner."""
+
+    def stored(self, analysis):
+        with Session(get_engine()) as session:
+            rows = session.exec(select(ItemAnalysis).where(ItemAnalysis.analysis == analysis)).all()
+        return {r.item_id: r.value for r in rows}
+
+    def test_process_pool_matches_inline(self, db_url):
+        """Test that sharding across processes gives the same results as one process."""
+        counts = run_analytics(list(ANALYSES), db_url, workers=1)
+        inline = self.stored("volatility")
+
+        run_analytics(list(ANALYSES), db_url, workers=2, shards=4)
+        pooled = self.stored("volatility")
+
+        assert counts == {"volatility": 12, "trend": 12}
+        assert pooled == pytest.approx(inline)
+
+    def test_rerun_replaces_results(self, db_url):
+        """Test that a second run replaces rather than duplicates results."""
+        run_analytics(["trend"], db_url, workers=1)
+        run_analytics(["trend"], db_url, workers=1, since=T0 + timedelta(days=1))
+
+        assert self.stored("trend") == {}
+
+    def test_unknown_analysis(self, db_url):
+        """Test that unknown analysis names are rejected."""
+        with pytest.raises(ValueError):
+            run_analytics(["beta"], db_url)
+
+    def test_main(self, db_url, caplog):
+        """Test the command line entry point."""
+        caplog.set_level(logging.INFO)
+        main(["volatility", "--db-url", db_url, "--workers", "1"])
+
+        assert "volatility: 12 items" in caplog.text
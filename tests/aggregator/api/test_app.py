@@ -0,0 +1,424 @@
+import asyncio
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("httpx")
+
+from sqlmodel import Session, SQLModel, create_engine, select
+from starlette.testclient import TestClient
+
+from aggregator.api.app import MAX_LIMIT, ResponseCache, create_app, etag_matches, price_events
+from aggregator.api.client import parse_events
+from aggregator.db.high_alch import NATURE_RUNE_ID, AlchScanner
+from aggregator.db.queries import bump_generation
+from aggregator.db.recipes import RecipeEvaluator
+from aggregator.models.recipe import Recipe
+from aggregator.db.rankings import TopKIndex
+from aggregator.models.item_metrics import ItemMetrics
+from aggregator.models.item_model import Item
+from aggregator.models.item_volume_5m import ItemSnapshot
+from aggregator.models.price_update import PriceUpdate
+
+T0 = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """File-backed SQLite engine with a few items and snapshots."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(
+            [
+                Item(id=1, name="Abyssal whip", high=2_000_000, low=1_900_000, volume_24h=500),
+                Item(id=2, name="Dragon bones", high=3_000, low=2_700, volume_24h=90_000),
+                Item(id=3, name="Dragon dagger", high=None, low=17_000),
+            ]
+        )
+        for i in range(3):
+            session.add(ItemSnapshot(item_id=1, timestamp=T0 + timedelta(minutes=5 * i), avg_high_price=100))
+        session.add(ItemSnapshot(item_id=1, timestamp=T0 + timedelta(minutes=15), avg_high_price=200))
+        bump_generation(session)
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    return TestClient(create_app(engine))
+
+
+def bump(engine):
+    with Session(engine) as session:
+        bump_generation(session)
+        session.commit()
+
+
+class TestEndpoints:
+    """Test the JSON endpoints."""
+
+    def test_top_margins(self, client):
+        """Test that items come back ranked with their margin."""
+        response = client.get("/items/top-margins")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert [i["id"] for i in body["items"]] == [1, 2]
+        assert body["items"][0]["margin"] == 80_000
+        assert body["next_offset"] is None
+
+    def test_pagination(self, client):
+        """Test that a full page advertises the next offset."""
+        body = client.get("/items/top-margins?limit=1").json()
+
+        assert [i["id"] for i in body["items"]] == [1]
+        assert body["next_offset"] == 1
+
+    def test_limit_is_bounded(self, client):
+        """Test that oversized or malformed limits are rejected."""
+        assert client.get(f"/items/top-margins?limit={MAX_LIMIT + 1}").status_code == 400
+        assert client.get("/items/top-margins?limit=abc").status_code == 400
+
+    def test_rankings(self, client, engine):
+        """Test that rankings are served from the persisted top-K table."""
+        with Session(engine) as session:
+            items = session.exec(select(Item)).all()
+        TopKIndex(engine, k=5)(items)
+
+        body = client.get("/rankings/roi?limit=1").json()
+
+        assert [i["id"] for i in body["items"]] == [2]
+        assert body["items"][0]["value"] == pytest.approx(270 / 2_700)
+        assert client.get("/rankings/price").status_code == 400
+
+    def test_alchs(self, client, engine):
+        """Test that profitable alchs are served from the scanner's table."""
+        with Session(engine) as session:
+            session.get(Item, 1).highalch = 2_100_000
+            session.add(Item(id=NATURE_RUNE_ID, name="Nature rune", high=110, low=100))
+            session.commit()
+            items = session.exec(select(Item)).all()
+        AlchScanner(engine)(items)
+
+        body = client.get("/alchs").json()
+
+        assert [i["id"] for i in body["items"]] == [1]
+        assert body["items"][0]["profit"] == 2_100_000 - 1_900_000 - 100
+        assert client.get("/alchs?by=volume").status_code == 400
+
+    def test_recipes(self, client, engine):
+        """Test that recipe profits are served, filtered by kind."""
+        recipe = Recipe(name="Bones to whip", kind="craft", inputs={2: 1}, outputs={1: 1})
+        with Session(engine) as session:
+            items = session.exec(select(Item)).all()
+        RecipeEvaluator([recipe], engine)(items)
+
+        body = client.get("/recipes?kind=craft").json()
+
+        assert [r["name"] for r in body["items"]] == ["Bones to whip"]
+        assert client.get("/recipes?kind=set").json()["items"] == []
+
+    def test_risk_adjusted(self, client, engine):
+        """Test the risk-adjusted margin endpoint."""
+        with Session(engine) as session:
+            session.add(
+                ItemMetrics(item_id=2, samples=5, atr_pct=0.01, buy_fill_per_hour=100, updated_at=T0)
+            )
+            session.commit()
+
+        body = client.get("/items/risk-adjusted").json()
+
+        assert [i["id"] for i in body["items"]] == [2]
+        assert body["items"][0]["metrics"]["atr_pct"] == 0.01
+
+    def test_search(self, client):
+        """Test the name search endpoint."""
+        body = client.get("/items/search?q=dragon").json()
+
+        assert [i["id"] for i in body["items"]] == [2, 3]
+        assert body["items"][1]["margin"] is None
+        assert client.get("/items/search").status_code == 400
+
+    def test_item_lookup(self, client):
+        """Test single item lookup and the 404 path."""
+        assert client.get("/items/2").json()["name"] == "Dragon bones"
+        assert client.get("/items/999").status_code == 404
+
+    def test_history(self, client):
+        """Test the history range endpoint."""
+        start = T0 + timedelta(minutes=5)
+        body = client.get("/items/1/history", params={"start": start.isoformat()}).json()
+
+        assert len(body["items"]) == 3
+        assert body["items"][0]["timestamp"] == start.isoformat()
+        assert client.get("/items/1/history?start=yesterday").status_code == 400
+
+    def test_chart(self, client):
+        """Test the downsampled chart endpoint."""
+        end = T0 + timedelta(hours=1)
+        body = client.get("/items/1/chart", params={"end": end.isoformat(), "hours": 1}).json()
+
+        assert body["bucket_seconds"] == 300
+        assert body["series"]["high"]["price"] == [100, 100, 100, 200]
+        assert body["series"]["high"]["timestamp"][0] == T0.timestamp()
+        assert client.get("/items/1/chart?method=spline").status_code == 400
+        assert client.get("/items/1/chart?width=1").status_code == 400
+
+    def test_spikes(self, client):
+        """Test the spikes endpoint."""
+        body = client.get("/spikes?side=buy&threshold=0.5").json()
+
+        assert [s["item_id"] for s in body["items"]] == [1]
+        assert client.get("/spikes?side=up").status_code == 400
+
+
+class TestCaching:
+    """Test generation-keyed caching and ETags."""
+
+    def test_etag_round_trip(self, client):
+        """Test that If-None-Match with the current ETag returns 304."""
+        first = client.get("/items/top-margins")
+        etag = first.headers["etag"]
+
+        second = client.get("/items/top-margins", headers={"If-None-Match": etag})
+
+        assert second.status_code == 304
+        assert second.content == b""
+        assert first.headers["x-ingest-generation"] == "1"
+
+    def test_cache_reused_within_generation(self, client, engine):
+        """Test that a cached body is served until the generation changes."""
+        client.get("/items/2")
+        with Session(engine) as session:
+            session.get(Item, 2).name = "Renamed"
+            session.commit()
+
+        assert client.get("/items/2").json()["name"] == "Dragon bones"
+
+        bump(engine)
+        response = client.get("/items/2")
+        assert response.json()["name"] == "Renamed"
+        assert response.headers["x-ingest-generation"] == "2"
+
+    def test_if_none_match_lists(self, client):
+        """Test that the ETag is found in a tag list and partial tags do not match."""
+        etag = client.get("/items/top-margins").headers["etag"]
+
+        def status(header):
+            return client.get("/items/top-margins", headers={"If-None-Match": header}).status_code
+
+        assert status(f'"other", W/{etag}') == 304
+        assert status("*") == 304
+        assert status(etag[1:-1]) == 200
+        assert status(f'"x{etag[1:]}') == 200
+
+    def test_new_generation_changes_etag(self, client, engine):
+        """Test that stale ETags stop matching after an ingest."""
+        etag = client.get("/items/top-margins").headers["etag"]
+        bump(engine)
+
+        response = client.get("/items/top-margins", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+
+class TestEtagMatches:
+    """Test If-None-Match parsing."""
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            (None, False),
+            ("", False),
+            ('"1-ab"', True),
+            ('"0-aa" , "1-ab"', True),
+            ('W/"1-ab"', True),
+            ("*", True),
+            ('"1-abc"', False),
+            ('"11-ab"', False),
+            ("1-ab", False),
+        ],
+    )
+    def test_whole_tags(self, header, expected):
+        """Test that whole entity tags in the list are compared, not substrings."""
+        assert etag_matches(header, '"1-ab"') is expected
+
+
+class TestResponseCache:
+    """Test the LRU response cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest untouched entry is dropped first."""
+        cache = ResponseCache(maxsize=2)
+        cache.get(1, "a")
+        cache.put(1, "a", (b"A", '"1-a"'))
+        cache.put(1, "b", (b"B", '"1-b"'))
+        cache.get(1, "a")
+        cache.put(1, "c", (b"C", '"1-c"'))
+
+        assert cache.get(1, "a") == (b"A", '"1-a"')
+        assert cache.get(1, "b") is None
+        assert len(cache) == 2
+
+    def test_generation_change_clears(self):
+        """Test that seeing a new generation empties the cache."""
+        cache = ResponseCache()
+        cache.get(1, "a")
+        cache.put(1, "a", (b"A", '"1-a"'))
+
+        assert cache.get(2, "a") is None
+        cache.put(1, "a", (b"stale", '"1-s"'))
+        assert cache.get(2, "a") is None
+
+
+def collect(engine, since, polls, between=None):
+    """Run price_events for a fixed number of polls and return the frames."""
+
+    async def run():
+        remaining = [polls]
+
+        async def is_disconnected():
+            remaining[0] -= 1
+            if between is not None and remaining[0] == polls - 2:
+                between()
+            return remaining[0] < 0
+
+        return [
+            frame
+            async for frame in price_events(
+                engine, since, poll_interval=0, keepalive=3600, is_disconnected=is_disconnected
+            )
+        ]
+
+    return asyncio.run(run())
+
+
+class TestPriceStream:
+    """Test the server-sent price update stream."""
+
+    def add_updates(self, engine, generation, *item_ids):
+        with Session(engine) as session:
+            bump_generation(session)
+            session.add_all(PriceUpdate(generation=generation, item_id=i, high=i) for i in item_ids)
+            session.commit()
+
+    def test_replays_after_since(self, engine):
+        """Test that generations after since are sent once each, in order."""
+        self.add_updates(engine, 2, 1, 2)
+        self.add_updates(engine, 3, 1)
+
+        frames = collect(engine, since=1, polls=3)
+        events = list(parse_events(b"".join(frames).decode().splitlines()))
+
+        assert [e.id for e in events] == ["2", "3"]
+        assert [i["id"] for i in events[0].json()["items"]] == [1, 2]
+
+    def test_new_generation_pushed(self, engine):
+        """Test that a tick landing while subscribed is pushed."""
+        frames = collect(engine, since=None, polls=4, between=lambda: self.add_updates(engine, 2, 5))
+        events = list(parse_events(b"".join(frames).decode().splitlines()))
+
+        assert [e.json()["items"][0]["id"] for e in events] == [5]
+
+    def record(self, engine, generation, *item_ids):
+        with Session(engine) as session:
+            session.add_all(PriceUpdate(generation=generation, item_id=i, high=i) for i in item_ids)
+            session.commit()
+
+    def collect_steps(self, engine, since, steps):
+        """Run price_events with steps[n] run right before poll n."""
+        steps = list(steps)
+
+        async def run():
+            async def is_disconnected():
+                if not steps:
+                    return True
+                steps.pop(0)()
+                return False
+
+            return [
+                frame
+                async for frame in price_events(
+                    engine, since, poll_interval=0, keepalive=3600, is_disconnected=is_disconnected
+                )
+            ]
+
+        frames = asyncio.run(run())
+        return list(parse_events(b"".join(frames).decode().splitlines()))
+
+    def test_rows_before_their_generation_wait(self, engine):
+        """Test that rows recorded before their generation is published are sent once, after it."""
+        events = self.collect_steps(
+            engine,
+            since=1,
+            steps=[
+                lambda: None,
+                lambda: self.record(engine, 2, 7),  # tick hook ran
+                lambda: None,
+                lambda: bump(engine),  # generation published
+                lambda: None,
+            ],
+        )
+
+        assert [(e.id, e.json()["items"][0]["id"]) for e in events] == [("2", 7)]
+
+    def test_rows_after_their_generation_not_lost(self, engine):
+        """Test that bump -> poll -> record still delivers the generation's rows."""
+        events = self.collect_steps(
+            engine,
+            since=1,
+            steps=[
+                lambda: bump(engine),
+                lambda: None,  # sees generation 2 without rows
+                lambda: self.record(engine, 2, 7),
+                lambda: None,
+                lambda: (bump(engine), self.record(engine, 3, 8)),
+                lambda: None,
+            ],
+        )
+
+        assert [e.id for e in events] == ["2", "3"]
+        assert [e.json()["items"][0]["id"] for e in events] == [7, 8]
+
+    def test_endpoint_resumes_from_last_event_id(self, engine):
+        """Test over a real socket that the endpoint honours Last-Event-ID."""
+        uvicorn = pytest.importorskip("uvicorn")
+        self.add_updates(engine, 2, 1)
+        self.add_updates(engine, 3, 2)
+        config = uvicorn.Config(
+            create_app(engine, poll_interval=0.01),
+            port=0,
+            log_level="error",
+            timeout_graceful_shutdown=1,
+        )
+        server = uvicorn.Server(config)
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        try:
+            deadline = time.monotonic() + 5
+            while not server.started and time.monotonic() < deadline:
+                time.sleep(0.01)
+            port = server.servers[0].sockets[0].getsockname()[1]
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{port}/stream/prices", headers={"Last-Event-ID": "2"}
+            )
+            with urllib.request.urlopen(request, timeout=5) as response:
+                assert response.headers["content-type"].startswith("text/event-stream")
+                event = next(parse_events(line.decode() for line in response))
+        finally:
+            server.should_exit = True
+            thread.join(5)
+
+        assert event.id == "3"
+        assert event.json()["items"][0]["id"] == 2
+
+    def test_endpoint_rejects_bad_since(self, client):
+        """Test that a non-numeric since is a 400."""
+        assert client.get("/stream/prices?since=abc").status_code == 400
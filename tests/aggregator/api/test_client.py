@@ -0,0 +1,31 @@
+from aggregator.api.client import parse_events
+
+
+class TestParseEvents:
+    """Test the SSE line parser."""
+
+    def test_parses_fields(self):
+        """Test that id, event and data are collected per blank-line separated block."""
+        lines = [
+            "retry: 5000\n",
+            "\n",
+            "id: 7\n",
+            "event: prices\n",
+            'data: {"generation":7,"items":[]}\n',
+            "\n",
+        ]
+
+        events = list(parse_events(lines))
+
+        assert len(events) == 1
+        assert events[0].id == "7"
+        assert events[0].event == "prices"
+        assert events[0].json() == {"generation": 7, "items": []}
+
+    def test_comments_and_multiline_data(self):
+        """Test that comments are skipped and data lines are joined."""
+        lines = [": keepalive", "", "data: a", "data: b", ""]
+
+        events = list(parse_events(lines))
+
+        assert [(e.id, e.event, e.data) for e in events] == [(None, "message", "a\nb")]
@@ -0,0 +1,241 @@
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from aggregator.db.alerts import Alert, AlertEngine, WebhookSink, compile_rule, load_rules
+from aggregator.models.alert import AlertRule
+from aggregator.models.item_model import Item
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+NOW = 1_750_000_000.0
+
+
+def rule(condition, items=(), name="r"):
+    return AlertRule(name=name, condition=condition, items=list(items))
+
+
+def item(item_id=1, high=1_000, low=900, volume=5_000, name="Thing"):
+    return Item(id=item_id, name=name, high=high, low=low, volume_24h=volume)
+
+
+class TestCompileRule:
+    """Test validating and compiling conditions."""
+
+    def test_collects_names_and_windows(self):
+        """Test that referenced fields and the longest change() window are recorded."""
+        compiled = compile_rule(rule("margin > 200_000 and change(low, 15) < -0.1 or change(high, 5) > 0"))
+
+        assert compiled.names == {"margin", "low", "high"}
+        assert compiled.history_minutes == 15
+        assert not compiled.uses_snapshot
+        assert compile_rule(rule("avg_high_price > 1")).uses_snapshot
+
+    @pytest.mark.parametrize(
+        "condition",
+        [
+            "__import__('os')",
+            "high.__class__",
+            "open('x')",
+            "price > 1",
+            "high ** 99999999",
+            "'a' < high",
+            "[high][0] > 1",
+            "change(volume_24h, 5) > 0",
+            "change(high, -5) > 0",
+            "change(high) > 0",
+            "abs > 1",
+            "margin >",
+        ],
+    )
+    def test_rejects(self, condition):
+        """Test that anything outside the expression language is refused."""
+        with pytest.raises(ValueError):
+            compile_rule(rule(condition))
+
+    def test_load_rules(self, tmp_path):
+        """Test reading a rule file."""
+        path = tmp_path / "alerts.json"
+        path.write_text('{"rules": [{"name": "whip", "items": [4151], "condition": "margin > 1"}]}')
+
+        rules = load_rules(path)
+
+        assert rules == [AlertRule(name="whip", items=[4151], condition="margin > 1")]
+
+
+class TestAlertEngine:
+    """Test incremental rule evaluation."""
+
+    def test_fires_once_until_rearmed(self):
+        """Test that a rule fires when it becomes true and again only after turning false."""
+        engine = AlertEngine([rule("margin > 50 and volume_24h > 1_000", [1], name="flip")], sinks=[])
+
+        fired = engine.evaluate([item(high=1_000, low=900)], NOW)
+        assert [(a.rule, a.item_id) for a in fired] == [("flip", 1)]
+        assert fired[0].values == {"margin": 90, "volume_24h": 5_000}
+
+        assert engine.evaluate([item(high=1_001, low=900)], NOW) == []
+        assert engine.evaluate([item(high=900, low=900)], NOW) == []
+        assert len(engine.evaluate([item(high=1_000, low=900)], NOW)) == 1
+
+    def test_only_indexed_rules_run(self):
+        """Test that item rules only see their items and unchanged items are skipped."""
+        engine = AlertEngine([rule("high > 0", [2], name="two"), rule("low > 0", name="any")], sinks=[])
+        assert engine.by_item == {2: [0]}
+        assert engine.any_item == [1]
+
+        fired = engine.evaluate([item(1), item(2)], NOW)
+        assert sorted((a.rule, a.item_id) for a in fired) == [("any", 1), ("any", 2), ("two", 2)]
+
+        calls = []
+        engine.change = lambda *args: calls.append(args)
+        assert engine.evaluate([item(1), item(2)], NOW) == []
+
+    def test_missing_values_do_not_match(self):
+        """Test that conditions over missing prices evaluate to false instead of failing."""
+        engine = AlertEngine([rule("roi > 0.01"), rule("margin / (high - 1000) > 1")], sinks=[])
+
+        assert engine.evaluate([item(high=None)], NOW) == []
+        assert engine.evaluate([item(high=1_000, low=0)], NOW) == []
+
+    def test_change_over_window(self):
+        """Test change() against the price from at least the window ago."""
+        engine = AlertEngine([rule("change(low, 15) < -0.10", [1], name="crash")], sinks=[])
+
+        engine.evaluate([item(low=1_000)], NOW - 20 * 60)
+        engine.evaluate([item(low=1_000)], NOW - 10 * 60)
+        assert engine.evaluate([item(low=950)], NOW - 5 * 60) == []
+        fired = engine.evaluate([item(low=850)], NOW)
+
+        assert [a.rule for a in fired] == ["crash"]
+        assert engine.change(1, {"low": 850}, "low", 15, NOW) == pytest.approx(-0.15)
+        # Too little history to look back this far
+        assert engine.change(1, {"low": 850}, "low", 60, NOW) is None
+
+    def test_change_fires_while_price_is_flat(self):
+        """Test that change() rules run on ticks where the item row did not change."""
+        engine = AlertEngine([rule("change(low, 15) < -0.10", [1], name="crash")], sinks=[])
+
+        fired = {}
+        for minute, low in ((0, 100), (5, 100), (10, 80), (15, 80), (20, 80), (25, 80), (30, 80)):
+            fired[minute] = [a.rule for a in engine.evaluate([item(low=low)], NOW + 60 * minute)]
+
+        assert fired == {0: [], 5: [], 10: [], 15: ["crash"], 20: [], 25: [], 30: []}
+        # Re-armed once the 15 minute window has moved past the drop
+        assert (0, 1) not in engine.active
+
+    def test_history_is_bounded(self):
+        """Test that samples older than the longest window are dropped."""
+        engine = AlertEngine([rule("change(high, 10) > 0.5", [1])], sinks=[])
+        for minute in range(60):
+            engine.evaluate([item(high=1_000 + minute), item(2, high=5)], NOW + 60 * minute)
+
+        assert 10 <= len(engine.history[1]) <= 12
+        assert 2 not in engine.history
+
+    def test_snapshot_fields(self, tmp_path):
+        """Test that snapshot fields come from each item's latest snapshot."""
+        db = create_engine(f"sqlite:///{tmp_path / 'alerts.db'}")
+        SQLModel.metadata.create_all(db)
+        now = datetime.fromtimestamp(NOW, timezone.utc)
+        with Session(db) as session:
+            for minutes, volume in ((10, 5), (5, 500)):
+                session.add(
+                    ItemSnapshot(item_id=1, timestamp=now - timedelta(minutes=minutes), high_price_volume=volume)
+                )
+            session.commit()
+        engine = AlertEngine([rule("high_price_volume > 100")], sinks=[], engine=db)
+
+        fired = engine.evaluate([item(1), item(2)], NOW)
+
+        assert [(a.item_id, a.values) for a in fired] == [(1, {"high_price_volume": 500})]
+        db.dispose()
+
+    def test_snapshot_rules_run_for_unchanged_items(self, engine):
+        """Test that a new snapshot can fire a rule while the item row stays the same."""
+        now = datetime.fromtimestamp(NOW, timezone.utc)
+        alerts = AlertEngine(
+            [rule("high_price_volume > 100", name="busy"), rule("high > 0", name="priced")],
+            sinks=[],
+            engine=engine,
+        )
+        assert [a.rule for a in alerts.evaluate([item(1)], NOW)] == ["priced"]
+
+        with Session(engine) as session:
+            session.add(ItemSnapshot(item_id=1, timestamp=now, high_price_volume=500))
+            session.commit()
+
+        assert [a.rule for a in alerts.evaluate([item(1)], NOW + 300)] == ["busy"]
+
+    def test_call_sends_to_sinks(self):
+        """Test that the tick hook hands fired alerts to every sink."""
+        received = []
+        engine = AlertEngine([rule("high > 0")], sinks=[received.append])
+
+        assert engine([item(1), item(2)]) == 2
+        assert engine([item(1), item(2)]) == 0
+        assert [[a.item_id for a in batch] for batch in received] == [[1, 2]]
+
+    def test_many_rules_touch_only_changed_items(self):
+        """Test that thousands of per-item rules cost nothing for unchanged items."""
+        rules = [rule(f"high > {i}", [i % 500], name=str(i)) for i in range(5_000)]
+        engine = AlertEngine(rules, sinks=[])
+        items = [item(i, high=10_000) for i in range(500)]
+        assert len(engine.evaluate(items, NOW)) == 5_000
+
+        items[7] = item(7, high=0)
+        assert engine.evaluate(items, NOW) == []
+        assert not any(key[1] == 7 for key in engine.active)
+
+
+class TestWebhookSink:
+    """Test posting alerts to a webhook."""
+
+    def test_posts_json(self):
+        """Test that alerts are delivered as a JSON POST."""
+        bodies = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                bodies.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        sink = WebhookSink(f"http://127.0.0.1:{server.server_port}/hook")
+        try:
+            fired_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+            sink([Alert("flip", 1, "Thing", {"margin": 90}, fired_at)])
+            sink.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert bodies == [
+            {
+                "alerts": [
+                    {
+                        "rule": "flip",
+                        "item_id": 1,
+                        "name": "Thing",
+                        "values": {"margin": 90},
+                        "fired_at": "2025-01-01T00:00:00+00:00",
+                    }
+                ]
+            }
+        ]
+
+    def test_unreachable_webhook(self, caplog):
+        """Test that a failing webhook is reported without raising."""
+        sink = WebhookSink("http://127.0.0.1:9/hook", timeout=0.5)
+        sink([Alert("flip", 1, "Thing", {})])
+        sink.close()
+
+        assert "Alert webhook failed" in caplog.text
@@ -1,5 +1,12 @@
+import io
+import json
+import threading
+import time
+
 import pytest
+from sqlmodel import Session, select
 from unittest.mock import Mock, patch, MagicMock
+import requests
 from datetime import datetime, timezone
 from aggregator.db.data_input import (
     fetch_data,
@@ -10,7 +17,43 @@ from aggregator.db.data_input import (
     fetch_all_data,
     update_database,
     save_volume5m_to_db,
+    run_ingest,
+    main,
+    INTERVAL_SECONDS,
+    MAX_RETRIES,
+    CircuitOpenError,
+    FetchError,
+    IngestState,
+    fetch_tick_data,
+    get_breaker,
+    reset_breakers,
+    run_tick,
+    HEADERS,
+    save_volume5m_stream,
+    stream_json,
+    stream_volume5m_items,
+    set_journal,
+    replay_journal,
+    add_tick_hook,
+    clear_tick_hooks,
+    RANKING_SIZE,
+    run_tick_hooks,
 )
+from aggregator.db.journal import PayloadJournal, read_journal
+from aggregator.db.database import dispose_db, get_engine, init_db
+from aggregator.util.circuit_breaker import CLOSED, OPEN
+from aggregator.util.metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def no_backoff_sleep():
+    """Skip retry backoff sleeps and start with closed circuit breakers and no hooks."""
+    reset_breakers()
+    clear_tick_hooks()
+    with patch("aggregator.db.data_input.time.sleep") as mock_sleep:
+        yield mock_sleep
+    reset_breakers()
+    clear_tick_hooks()
 from aggregator.models.data_models import (
     MappingData,
     MappingList,
@@ -32,6 +75,7 @@ class TestFetchData:
         """Test successful data fetch."""
         mock_response = Mock()
         mock_response.status_code = 200
+        mock_response.content = b"{}"
         mock_response.json.return_value = {"data": "test"}
         mock_get.return_value = mock_response
 
@@ -45,6 +89,7 @@ class TestFetchData:
         """Test that headers are sent with the request."""
         mock_response = Mock()
         mock_response.status_code = 200
+        mock_response.content = b"{}"
         mock_response.json.return_value = {}
         mock_get.return_value = mock_response
 
@@ -79,6 +124,7 @@ class TestFetchData:
         """Test fetch with empty JSON response."""
         mock_response = Mock()
         mock_response.status_code = 200
+        mock_response.content = b"{}"
         mock_response.json.return_value = {}
         mock_get.return_value = mock_response
 
@@ -94,6 +140,7 @@ class TestFetchData:
         }
         mock_response = Mock()
         mock_response.status_code = 200
+        mock_response.content = b"{}"
         mock_response.json.return_value = complex_data
         mock_get.return_value = mock_response
 
@@ -336,8 +383,9 @@ class TestUpdateDatabase:
 
         assert callable(result)
 
-    @patch("aggregator.db.data_input.session")
-    def test_update_database_inner_function(self, mock_session):
+    @patch("aggregator.db.data_input.get_engine")
+    @patch("aggregator.db.data_input.Session")
+    def test_update_database_inner_function(self, mock_session_class, mock_get_engine):
         """Test the inner function returned by update_database."""
         # Create test data
         mapping_data = MappingList(
@@ -366,8 +414,8 @@ class TestUpdateDatabase:
         update_func = update_database(latest_data, mapping_data, volume_data)
 
         # Mock session methods
-        mock_session.merge = MagicMock()
-        mock_session.commit = MagicMock()
+        mock_session = MagicMock()
+        mock_session_class.return_value.__enter__.return_value = mock_session
 
         # Call the inner function
         update_func(latest_data, mapping_data, volume_data)
@@ -376,8 +424,9 @@ class TestUpdateDatabase:
         mock_session.merge.assert_called()
         mock_session.commit.assert_called_once()
 
-    @patch("aggregator.db.data_input.session")
-    def test_update_database_skips_unmapped_items(self, mock_session):
+    @patch("aggregator.db.data_input.get_engine")
+    @patch("aggregator.db.data_input.Session")
+    def test_update_database_skips_unmapped_items(self, mock_session_class, mock_get_engine):
         """Test that items not in mapping are skipped."""
         mapping_data = MappingList(
             items=[
@@ -396,8 +445,8 @@ class TestUpdateDatabase:
 
         update_func = update_database(latest_data, mapping_data, volume_data)
 
-        mock_session.merge = MagicMock()
-        mock_session.commit = MagicMock()
+        mock_session = MagicMock()
+        mock_session_class.return_value.__enter__.return_value = mock_session
 
         update_func(latest_data, mapping_data, volume_data)
 
@@ -405,8 +454,9 @@ class TestUpdateDatabase:
         mock_session.merge.assert_not_called()
         mock_session.commit.assert_called_once()
 
-    @patch("aggregator.db.data_input.session")
-    def test_update_database_with_missing_volume(self, mock_session):
+    @patch("aggregator.db.data_input.get_engine")
+    @patch("aggregator.db.data_input.Session")
+    def test_update_database_with_missing_volume(self, mock_session_class, mock_get_engine):
         """Test update with missing volume data for an item."""
         mapping_data = MappingList(
             items=[
@@ -423,8 +473,8 @@ class TestUpdateDatabase:
 
         update_func = update_database(latest_data, mapping_data, volume_data)
 
-        mock_session.merge = MagicMock()
-        mock_session.commit = MagicMock()
+        mock_session = MagicMock()
+        mock_session_class.return_value.__enter__.return_value = mock_session
 
         update_func(latest_data, mapping_data, volume_data)
 
@@ -622,3 +672,824 @@ class TestSaveVolume5mToDb:
         assert snapshot.avg_low_price == 4
         assert snapshot.low_price_volume == 180000
         assert snapshot.total_volume == 330000
+
+
+class TestInstrumentation:
+    """Test the metrics recorded by the ingest functions."""
+
+    @pytest.fixture(autouse=True)
+    def clean_metrics(self):
+        """Start each test with an empty registry."""
+        metrics.reset()
+        yield
+        metrics.reset()
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_fetch_records_latency_and_size(self, mock_get):
+        """Test that fetch_data records latency and payload size per endpoint."""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.content = b'{"data": {}}'
+        mock_response.json.return_value = {"data": {}}
+        mock_get.return_value = mock_response
+
+        fetch_data("https://prices.runescape.wiki/api/v1/osrs/latest")
+
+        assert metrics.get("osrs_ge_fetch_seconds", endpoint="latest") == 1
+        assert metrics.get("osrs_ge_payload_bytes", endpoint="latest") == 12
+        assert metrics.get("osrs_ge_decode_seconds", endpoint="latest") == 1
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_fetch_error_counted(self, mock_get):
+        """Test that failed fetches are counted by status."""
+        mock_response = Mock()
+        mock_response.status_code = 503
+        mock_get.return_value = mock_response
+
+        with pytest.raises(Exception):
+            fetch_data("https://prices.runescape.wiki/api/v1/osrs/5m")
+
+        assert (
+            metrics.get("osrs_ge_fetch_errors_total", endpoint="5m", status=503)
+            == MAX_RETRIES + 1
+        )
+        assert metrics.get("osrs_ge_fetch_retries_total", endpoint="5m") == MAX_RETRIES
+
+    @patch("aggregator.db.data_input.fetch_data")
+    def test_wrapper_records_validate_time(self, mock_fetch):
+        """Test that wrappers time model validation."""
+        mock_fetch.return_value = {"data": {}}
+        latest_wrapper()
+        assert metrics.get("osrs_ge_validate_seconds", endpoint="latest") == 1
+
+    @patch("aggregator.db.data_input.Session")
+    def test_snapshot_rows_counted(self, mock_session_class, sample_volume_5m_data):
+        """Test that snapshot rows and commit time are recorded."""
+        mock_session_class.return_value.__enter__.return_value = MagicMock()
+
+        save_volume5m_to_db(sample_volume_5m_data, Mock())
+
+        assert metrics.get("osrs_ge_rows_written_total", table="itemsnapshot") == 3
+        assert metrics.get("osrs_ge_commit_seconds", table="itemsnapshot") == 1
+
+
+class TestRunIngest:
+    """Test the ingest loop."""
+
+    @patch("aggregator.db.data_input.get_engine")
+    @patch("aggregator.db.data_input.save_volume5m_to_db")
+    @patch("aggregator.db.data_input.update_database")
+    @patch("aggregator.db.data_input.fetch_tick_data")
+    def test_runs_requested_cycles(
+        self, mock_fetch_tick, mock_update, mock_save, mock_get_engine, no_backoff_sleep
+    ):
+        """Test that the loop stops after the requested cycles."""
+
+        def fetch(state, include_5m=True):
+            state.mapping = MappingList(items=[])
+            state.latest = LatestData(data={})
+            state.volume = Volume24h(data={})
+            state.volume_5m = Volume5m(data={})
+            return dict.fromkeys(("mapping", "latest", "volume", "volume_5m"), True)
+
+        mock_fetch_tick.side_effect = fetch
+
+        run_ingest(cycles=2, interval=0)
+
+        assert mock_fetch_tick.call_count == 2
+        assert mock_update.return_value.call_count == 2
+        # Snapshots are only written every SNAPSHOT_EVERY ticks
+        mock_save.assert_called_once()
+        no_backoff_sleep.assert_not_called()
+        assert metrics.get("osrs_ge_tick_seconds") >= 2
+
+    @patch("aggregator.db.data_input.get_engine")
+    @patch("aggregator.db.data_input.run_tick")
+    def test_tick_failure_does_not_stop_loop(self, mock_run_tick, mock_get_engine):
+        """Test that an exception in one tick is survived."""
+        mock_run_tick.side_effect = [RuntimeError("boom"), None]
+
+        run_ingest(cycles=2, interval=0)
+
+        assert mock_run_tick.call_count == 2
+
+
+class TestMain:
+    """Test the command line entry point."""
+
+    @patch("aggregator.db.data_input.run_ingest")
+    def test_default_interval(self, mock_run):
+        """Test that the default schedule is used without flags."""
+        main([])
+        mock_run.assert_called_once_with(None, INTERVAL_SECONDS)
+
+    @patch("aggregator.db.data_input.run_ingest")
+    @patch("aggregator.db.data_input.profile_call")
+    def test_profile_flag(self, mock_profile, mock_run):
+        """Test that --profile runs a bounded loop under the profiler."""
+        main(["--profile", "--cycles", "2"])
+        mock_profile.assert_called_once_with(mock_run, 2, 0, name="ingest")
+        mock_run.assert_not_called()
+
+    @patch("aggregator.db.data_input.run_ingest")
+    @patch("aggregator.db.data_input.profile_call")
+    def test_profile_env(self, mock_profile, mock_run, monkeypatch):
+        """Test that the profiling env var enables profiling."""
+        monkeypatch.setenv("OSRS_GE_PROFILE", "1")
+        main([])
+        mock_profile.assert_called_once_with(mock_run, 3, 0, name="ingest")
+
+    @patch("aggregator.db.data_input.run_ingest")
+    @patch("aggregator.db.data_input.profile_call")
+    def test_profile_env_zero(self, mock_profile, mock_run, monkeypatch):
+        """Test that OSRS_GE_PROFILE=0 leaves profiling off."""
+        monkeypatch.setenv("OSRS_GE_PROFILE", "0")
+        main([])
+        mock_profile.assert_not_called()
+        mock_run.assert_called_once_with(None, INTERVAL_SECONDS)
+
+
+def make_response(status_code, payload=None):
+    """Build a mock requests response."""
+    response = Mock()
+    response.status_code = status_code
+    response.content = b"{}"
+    response.json.return_value = payload if payload is not None else {}
+    return response
+
+
+def cooled_down_breaker(endpoint: str):
+    """An open breaker whose next call is the half-open trial."""
+    breaker = get_breaker(endpoint)
+    breaker.state = OPEN
+    breaker.opened_at = breaker.clock() - breaker.reset_timeout
+    return breaker
+
+
+class TestFetchResilience:
+    """Test retries, timeouts and circuit breaking in fetch_data."""
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_sends_timeout(self, mock_get):
+        """Test that every request has a connect/read timeout."""
+        mock_get.return_value = make_response(200)
+        fetch_data("http://test.com/api")
+        assert mock_get.call_args.kwargs["timeout"] is not None
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_retries_then_succeeds(self, mock_get, no_backoff_sleep):
+        """Test that a transient 5xx is retried with backoff."""
+        mock_get.side_effect = [make_response(502), make_response(200, {"ok": 1})]
+
+        assert fetch_data("http://test.com/api") == {"ok": 1}
+        assert mock_get.call_count == 2
+        no_backoff_sleep.assert_called_once()
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_retries_timeouts(self, mock_get):
+        """Test that timeouts are retried."""
+        mock_get.side_effect = [requests.Timeout("slow"), make_response(200, {"ok": 1})]
+        assert fetch_data("http://test.com/api") == {"ok": 1}
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_does_not_retry_client_errors(self, mock_get):
+        """Test that a 404 fails immediately."""
+        mock_get.return_value = make_response(404)
+        with pytest.raises(FetchError):
+            fetch_data("http://test.com/api")
+        mock_get.assert_called_once()
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_gives_up_after_max_retries(self, mock_get):
+        """Test that persistent timeouts raise FetchError."""
+        mock_get.side_effect = requests.ConnectionError("down")
+        with pytest.raises(FetchError, match="down"):
+            fetch_data("http://test.com/api")
+        assert mock_get.call_count == MAX_RETRIES + 1
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_circuit_opens_after_repeated_failures(self, mock_get):
+        """Test that an endpoint that keeps failing is skipped without a request."""
+        mock_get.return_value = make_response(404)
+        for _ in range(3):
+            with pytest.raises(FetchError):
+                fetch_data("http://test.com/api")
+
+        mock_get.reset_mock()
+        with pytest.raises(CircuitOpenError):
+            fetch_data("http://test.com/api")
+        mock_get.assert_not_called()
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_journal_failure_settles_breaker(self, mock_get):
+        """Test that the breaker records success before the payload is journaled."""
+        mock_get.return_value = make_response(200, {"data": {}})
+        breaker = cooled_down_breaker("latest")
+        journal = Mock()
+        journal.append.side_effect = OSError("disk full")
+        set_journal(journal)
+        try:
+            with pytest.raises(OSError):
+                fetch_data("http://test.com/latest")
+        finally:
+            set_journal(None)
+        assert breaker.state == CLOSED
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_circuit_is_per_endpoint(self, mock_get):
+        """Test that one failing endpoint does not block another."""
+        mock_get.return_value = make_response(404)
+        for _ in range(3):
+            with pytest.raises(FetchError):
+                fetch_data("http://test.com/volumes")
+
+        mock_get.return_value = make_response(200, {"data": {}})
+        assert fetch_data("http://test.com/latest") == {"data": {}}
+
+
+class TestPartialTick:
+    """Test that a failing endpoint only degrades itself."""
+
+    @patch("aggregator.db.data_input.volume5m_wrapper")
+    @patch("aggregator.db.data_input.volume_wrapper")
+    @patch("aggregator.db.data_input.latest_wrapper")
+    @patch("aggregator.db.data_input.mapping_wrapper")
+    def test_failed_endpoint_keeps_last_known(
+        self, mock_mapping, mock_latest, mock_volume, mock_volume5m
+    ):
+        """Test that state keeps the previous value for a failed endpoint."""
+        old_volume = Volume24h(data={"1": 50})
+        state = IngestState(volume=old_volume)
+        mock_mapping.return_value = MappingList(items=[])
+        mock_latest.return_value = LatestData(data={})
+        mock_volume.side_effect = FetchError("Failed to fetch data: 503")
+        mock_volume5m.return_value = Volume5m(data={})
+
+        fresh = fetch_tick_data(state)
+
+        assert fresh == {
+            "mapping": True,
+            "latest": True,
+            "volume": False,
+            "volume_5m": True,
+        }
+        assert state.volume is old_volume
+        assert state.latest == LatestData(data={})
+
+    @patch("aggregator.db.data_input.volume_wrapper")
+    @patch("aggregator.db.data_input.latest_wrapper")
+    @patch("aggregator.db.data_input.mapping_wrapper")
+    def test_slow_endpoint_does_not_stall_tick(self, mock_mapping, mock_latest, mock_volume):
+        """Test that an endpoint past the deadline is skipped and picked up next tick."""
+        release = threading.Event()
+        old_volume = Volume24h(data={"1": 50})
+        state = IngestState(volume=old_volume)
+        mock_mapping.return_value = MappingList(items=[])
+        mock_latest.return_value = LatestData(data={})
+        mock_volume.side_effect = lambda: release.wait() and Volume24h(data={"1": 60})
+
+        start = time.monotonic()
+        fresh = fetch_tick_data(state, include_5m=False, deadline=0.2)
+
+        assert time.monotonic() - start < 2
+        assert fresh == {"mapping": True, "latest": True, "volume": False, "volume_5m": False}
+        assert state.volume is old_volume
+        assert "volume" in state.pending
+
+        release.set()
+        fresh = fetch_tick_data(state, include_5m=False, deadline=5)
+
+        # The overrunning fetch is reused, not restarted
+        assert mock_volume.call_count == 1
+        assert fresh["volume"] is True
+        assert state.volume == Volume24h(data={"1": 60})
+        assert state.pending == {}
+
+    def test_missing_volumes_keep_stored_values(self, tmp_path):
+        """Test that prices written before /volumes ever succeeded keep stored 24h volumes."""
+        init_db(f"sqlite:///{tmp_path / 'volumes.db'}")
+        mapping = MappingList(items=[MappingData(examine="e", id=2, members=True, name="Cannonball")])
+        try:
+            update_database(None, None, None)(
+                LatestData(data={2: ItemData(high=170, low=165)}), mapping, Volume24h(data={"2": 500})
+            )
+            update_database(None, None, None)(
+                LatestData(data={2: ItemData(high=180, low=160)}), mapping, None
+            )
+            with Session(get_engine()) as session:
+                item = session.get(Item, 2)
+                assert (item.high, item.volume_24h) == (180, 500)
+        finally:
+            dispose_db()
+
+    @patch("aggregator.db.data_input.publish_generation")
+    @patch("aggregator.db.data_input.save_volume5m_to_db")
+    @patch("aggregator.db.data_input.update_database")
+    @patch("aggregator.db.data_input.fetch_tick_data")
+    def test_tick_writes_latest_with_stale_volumes(
+        self, mock_fetch_tick, mock_update, mock_save, mock_publish
+    ):
+        """Test that /latest is still written when /volumes failed."""
+        state = IngestState(
+            mapping=MappingList(items=[]),
+            latest=LatestData(data={}),
+            volume=Volume24h(data={"1": 50}),
+        )
+        mock_fetch_tick.return_value = {
+            "mapping": True,
+            "latest": True,
+            "volume": False,
+            "volume_5m": False,
+        }
+
+        run_tick(0, Mock(), state)
+
+        mock_update.return_value.assert_called_once_with(
+            state.latest, state.mapping, state.volume
+        )
+        # No fresh 5m data, so no snapshot is written
+        mock_save.assert_not_called()
+        mock_publish.assert_called_once()
+
+    @patch("aggregator.db.data_input.update_database")
+    @patch("aggregator.db.data_input.fetch_tick_data")
+    def test_tick_skips_update_without_fresh_latest(self, mock_fetch_tick, mock_update):
+        """Test that stale prices are never re-written."""
+        state = IngestState(mapping=MappingList(items=[]), latest=LatestData(data={}))
+        mock_fetch_tick.return_value = {
+            "mapping": True,
+            "latest": False,
+            "volume": True,
+            "volume_5m": True,
+        }
+
+        run_tick(1, Mock(), state)
+
+        mock_update.assert_not_called()
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_invalid_json_raises_fetch_error(self, mock_get):
+        """Test that an undecodable body is reported as a FetchError."""
+        bad = make_response(200)
+        bad.json.side_effect = ValueError("Expecting value")
+        mock_get.return_value = bad
+
+        with pytest.raises(FetchError, match="decode"):
+            fetch_data("http://test.com/api")
+
+
+def make_stream_response(body: bytes):
+    """Build a mock streaming response whose raw body is body."""
+    response = MagicMock()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    response.__enter__.return_value = response
+    return response
+
+
+FIVE_MIN_BODY = json.dumps(
+    {
+        "data": {
+            "2": {"avgHighPrice": 170, "highPriceVolume": 10, "avgLowPrice": 165, "lowPriceVolume": 12},
+            "554": {"avgHighPrice": 5, "highPriceVolume": None, "avgLowPrice": 4, "lowPriceVolume": 3},
+        },
+        "timestamp": 1760870100,
+    }
+).encode()
+
+
+class TestStreaming:
+    """Test compressed transport and incremental decoding."""
+
+    def test_accept_encoding_negotiated(self):
+        """Test that compression is requested explicitly."""
+        assert "gzip" in HEADERS["Accept-Encoding"]
+
+    @pytest.mark.parametrize("use_ijson", [True, False])
+    @patch("aggregator.db.data_input.requests.get")
+    def test_stream_json_pairs(self, mock_get, use_ijson, monkeypatch):
+        """Test streaming (key, value) pairs with and without ijson."""
+        if use_ijson:
+            pytest.importorskip("ijson")
+        else:
+            monkeypatch.setattr("aggregator.db.data_input.ijson", None)
+        mock_get.return_value = make_stream_response(FIVE_MIN_BODY)
+
+        pairs = list(stream_json("http://test.com/5m", "data", pairs=True))
+
+        assert [key for key, _ in pairs] == ["2", "554"]
+        assert pairs[0][1]["avgHighPrice"] == 170
+        assert mock_get.call_args.kwargs["stream"] is True
+
+    @pytest.mark.parametrize("use_ijson", [True, False])
+    @patch("aggregator.db.data_input.requests.get")
+    def test_stream_json_list(self, mock_get, use_ijson, monkeypatch):
+        """Test streaming the elements of a top-level list."""
+        if use_ijson:
+            pytest.importorskip("ijson")
+        else:
+            monkeypatch.setattr("aggregator.db.data_input.ijson", None)
+        mock_get.return_value = make_stream_response(b'[{"id": 1}, {"id": 2}]')
+
+        assert [item["id"] for item in stream_json("http://test.com/mapping", "item")] == [1, 2]
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_stream_records_payload_size(self, mock_get):
+        """Test that the decoded byte count is recorded."""
+        metrics.reset()
+        mock_get.return_value = make_stream_response(FIVE_MIN_BODY)
+
+        list(stream_json("http://test.com/5m", "data", pairs=True))
+
+        assert metrics.get("osrs_ge_payload_bytes", endpoint="5m") == len(FIVE_MIN_BODY)
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_stream_invalid_json(self, mock_get):
+        """Test that a truncated body raises FetchError."""
+        mock_get.return_value = make_stream_response(b'{"data": {"2": {')
+        with pytest.raises(FetchError):
+            list(stream_json("http://test.com/5m", "data", pairs=True))
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_abandoned_stream_settles_breaker(self, mock_get):
+        """Test that a half-open trial ends even if the consumer stops early or raises."""
+        for stop in ("close", "raise"):
+            breaker = cooled_down_breaker("5m")
+            mock_get.return_value = make_stream_response(FIVE_MIN_BODY)
+            stream = stream_json("http://test.com/5m", "data", pairs=True)
+            next(stream)
+            if stop == "close":
+                stream.close()
+            else:
+                with pytest.raises(RuntimeError):
+                    stream.throw(RuntimeError("consumer failed"))
+
+            assert breaker.state == CLOSED
+            assert breaker.allow()
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_stream_failure_opens_half_open_breaker(self, mock_get):
+        """Test that a failed half-open trial reopens the breaker."""
+        breaker = cooled_down_breaker("5m")
+        mock_get.return_value = make_stream_response(b'{"data": {"2": {')
+        with pytest.raises(FetchError):
+            list(stream_json("http://test.com/5m", "data", pairs=True))
+        assert not breaker.allow()
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_stream_volume5m_items(self, mock_get):
+        """Test that /5m items are validated one by one."""
+        mock_get.return_value = make_stream_response(FIVE_MIN_BODY)
+
+        items = dict(stream_volume5m_items())
+
+        assert isinstance(items["2"], Volume5mItem)
+        assert items["554"].highPriceVolume is None
+
+    @patch("aggregator.db.data_input.STREAM_DECODE", True)
+    @patch("aggregator.db.data_input.requests.get")
+    def test_mapping_wrapper_streaming(self, mock_get):
+        """Test that mapping_wrapper can build its list from the stream."""
+        mock_get.return_value = make_stream_response(
+            b'[{"examine": "e", "id": 1, "members": false, "name": "Item1"}]'
+        )
+
+        result = mapping_wrapper()
+
+        assert result.items[0].name == "Item1"
+
+    def test_save_volume5m_stream_batches(self, tmp_path):
+        """Test that streamed snapshots are written across several flushes."""
+        engine = init_db(f"sqlite:///{tmp_path / 'stream.db'}")
+        items = ((str(i), Volume5mItem(avgHighPrice=i, highPriceVolume=1)) for i in range(5))
+
+        rows = save_volume5m_stream(items, engine, batch_size=2)
+
+        assert rows == 5
+        with Session(engine) as session:
+            assert len(session.exec(select(ItemSnapshot)).all()) == 5
+        dispose_db()
+
+    @patch("aggregator.db.data_input.STREAM_DECODE", True)
+    @patch("aggregator.db.data_input.publish_generation")
+    @patch("aggregator.db.data_input.save_volume5m_stream")
+    @patch("aggregator.db.data_input.stream_volume5m_items")
+    @patch("aggregator.db.data_input.fetch_tick_data")
+    def test_run_tick_streams_snapshots(
+        self, mock_fetch_tick, mock_stream, mock_save_stream, mock_publish
+    ):
+        """Test that snapshot ticks stream /5m instead of buffering it."""
+        mock_fetch_tick.return_value = {
+            "mapping": False,
+            "latest": False,
+            "volume": False,
+            "volume_5m": False,
+        }
+        engine = Mock()
+
+        run_tick(0, engine, IngestState())
+
+        mock_fetch_tick.assert_called_once()
+        assert mock_fetch_tick.call_args.kwargs["include_5m"] is False
+        mock_save_stream.assert_called_once_with(mock_stream.return_value, engine)
+        mock_publish.assert_called_once_with(engine)
+
+
+class TestJournalReplay:
+    """Test journaling fetched payloads and replaying them."""
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_fetch_data_journals_payload(self, mock_get, tmp_path):
+        """Test that raw bodies are journaled with their endpoint."""
+        response = make_response(200, {"data": {}})
+        response.content = b'{"data": {}}'
+        mock_get.return_value = response
+        journal = PayloadJournal(tmp_path / "journal.bin")
+        set_journal(journal)
+        try:
+            fetch_data("https://prices.runescape.wiki/api/v1/osrs/latest")
+        finally:
+            set_journal(None)
+            journal.close()
+
+        entries = list(read_journal(tmp_path / "journal.bin"))
+        assert [(e.endpoint, e.payload) for e in entries] == [("latest", b'{"data": {}}')]
+
+    def test_replay_rebuilds_database(self, tmp_path, engine):
+        """Test that a journal replays into the given engine only, items and snapshots alike."""
+        path = tmp_path / "journal.bin"
+        mapping = [{"examine": "e", "id": 2, "members": True, "name": "Cannonball"}]
+        with PayloadJournal(path) as journal:
+            journal.append("mapping", json.dumps(mapping).encode(), fetched_at=1000)
+            journal.append("volumes", b'{"timestamp": 1, "data": {"2": 500}}', fetched_at=1000)
+            journal.append("latest", b'{"data": {"2": {"high": 170, "low": 165}}}', fetched_at=1000)
+            journal.append("5m", FIVE_MIN_BODY, fetched_at=1000)
+            journal.append("latest", b'{"data": {"2": {"high": 180, "low": 160}}}', fetched_at=1060)
+        shared = init_db(f"sqlite:///{tmp_path / 'shared.db'}")
+
+        summary = replay_journal(path, engine)
+
+        assert summary["entries"] == 5
+        assert summary["price_updates"] == 2
+        assert summary["snapshots"] == 1
+        with Session(engine) as session:
+            item = session.get(Item, 2)
+            assert (item.high, item.low, item.volume_24h) == (180, 160, 500)
+            snapshots = session.exec(select(ItemSnapshot)).all()
+            assert len(snapshots) == 2
+            assert snapshots[0].timestamp.replace(tzinfo=None) == datetime(1970, 1, 1, 0, 16, 40)
+        with Session(shared) as session:
+            assert session.exec(select(Item)).all() == []
+        dispose_db()
+
+    @patch("aggregator.db.data_input.requests.get")
+    def test_stream_json_journals_payload(self, mock_get, tmp_path):
+        """Test that streamed bodies are journaled too, and abandoned ones are not."""
+        path = tmp_path / "journal.bin"
+        journal = PayloadJournal(path)
+        set_journal(journal)
+        try:
+            mock_get.return_value = make_stream_response(b'[{"id": 1}, {"id": 2}]')
+            assert len(list(stream_json("http://test.com/mapping", "item"))) == 2
+            mock_get.return_value = make_stream_response(FIVE_MIN_BODY)
+            stream = stream_json("http://test.com/5m", "data", pairs=True)
+            next(stream)
+            stream.close()
+        finally:
+            set_journal(None)
+            journal.close()
+
+        entries = list(read_journal(path))
+        assert [(e.endpoint, e.payload) for e in entries] == [("mapping", b'[{"id": 1}, {"id": 2}]')]
+
+    def test_replay_runs_tick_hooks(self, tmp_path):
+        """Test that replayed price updates run the tick hooks and count payloads without a mapping."""
+        path = tmp_path / "journal.bin"
+        mapping = [{"examine": "e", "id": 2, "members": True, "name": "Cannonball"}]
+        with PayloadJournal(path) as journal:
+            journal.append("latest", b'{"data": {"2": {"high": 150, "low": 140}}}', fetched_at=990)
+            journal.append("mapping", json.dumps(mapping).encode(), fetched_at=1000)
+            journal.append("latest", b'{"data": {"2": {"high": 170, "low": 165}}}', fetched_at=1000)
+        engine = init_db(f"sqlite:///{tmp_path / 'replay.db'}")
+        hook = Mock()
+        add_tick_hook(hook)
+        try:
+            summary = replay_journal(path, engine)
+        finally:
+            dispose_db()
+
+        assert (summary["price_updates"], summary["skipped"]) == (1, 1)
+        hook.assert_called_once()
+        assert [(i.id, i.high) for i in hook.call_args.args[0]] == [(2, 170)]
+
+    @patch("aggregator.db.data_input.replay_journal")
+    @patch("aggregator.db.data_input.run_ingest")
+    def test_main_replay(self, mock_run, mock_replay):
+        """Test that --replay replays and exits without starting the loop."""
+        mock_replay.return_value = {
+            "entries": 0, "price_updates": 0, "skipped": 0, "snapshots": 0, "seconds": 0
+        }
+        main(["--replay", "journal.bin"])
+        mock_replay.assert_called_once_with("journal.bin")
+        mock_run.assert_not_called()
+
+
+class TestTickHooks:
+    """Test post-tick hooks."""
+
+    @pytest.fixture(autouse=True)
+    def clean_hooks(self):
+        """Start and end each test without registered hooks."""
+        clear_tick_hooks()
+        yield
+        clear_tick_hooks()
+
+    def test_hooks_receive_items(self):
+        """Test that every hook gets the written items."""
+        seen = []
+        add_tick_hook(seen.append)
+        items = [Item(id=1, name="a")]
+
+        run_tick_hooks(items)
+
+        assert seen == [items]
+
+    def test_failing_hook_is_isolated(self):
+        """Test that one failing hook does not stop the others."""
+        seen = []
+
+        def broken(items):
+            raise RuntimeError("boom")
+
+        add_tick_hook(broken)
+        add_tick_hook(seen.append)
+
+        run_tick_hooks([])
+
+        assert seen == [[]]
+        assert metrics.get("osrs_ge_hook_errors_total", hook="broken") >= 1
+
+    @patch("aggregator.db.data_input.publish_generation")
+    @patch("aggregator.db.data_input.fetch_tick_data")
+    @patch("aggregator.db.data_input.update_database")
+    def test_run_tick_runs_hooks(self, mock_update, mock_fetch_tick, mock_publish):
+        """Test that hooks run after a fresh price update."""
+        items = [Item(id=1)]
+        mock_update.return_value.return_value = items
+        mock_fetch_tick.return_value = {
+            "mapping": True,
+            "latest": True,
+            "volume": True,
+            "volume_5m": False,
+        }
+        seen = []
+        add_tick_hook(seen.append)
+        # The generation is only published once every hook has run
+        mock_publish.side_effect = lambda engine: seen.append("published")
+
+        run_tick(1, Mock(), IngestState(mapping=MappingList(items=[]), latest=LatestData(data={})))
+
+        assert seen == [items, "published"]
+
+    @patch("aggregator.db.data_input.publish_generation")
+    @patch("aggregator.db.data_input.fetch_tick_data")
+    @patch("aggregator.db.data_input.update_database")
+    def test_run_tick_without_writes_keeps_generation(self, mock_update, mock_fetch_tick, mock_publish):
+        """Test that a tick that wrote nothing does not bump the generation."""
+        mock_fetch_tick.return_value = {
+            "mapping": True,
+            "latest": False,
+            "volume": True,
+            "volume_5m": False,
+        }
+
+        run_tick(1, Mock(), IngestState())
+
+        mock_publish.assert_not_called()
+
+    @patch("aggregator.db.data_input.SharedPriceWriter")
+    @patch("aggregator.db.data_input.run_ingest")
+    def test_main_shm_name(self, mock_run, mock_writer, monkeypatch, tmp_path):
+        """Test that --shm-name publishes prices through a tick hook."""
+        # The default hooks run too; keep anything they write out of the working directory
+        monkeypatch.setenv("OSRS_GE_DB_URL", f"sqlite:///{tmp_path / 'test.db'}")
+        main(["--shm-name", "prices"])
+
+        mock_writer.assert_called_once_with("prices")
+        mock_writer.return_value.close.assert_called_once_with()
+        try:
+            run_tick_hooks([Item(id=1)])
+        finally:
+            dispose_db()
+        mock_writer.return_value.publish_items.assert_called_once()
+
+    @patch("aggregator.db.data_input.SharedPriceWriter")
+    @patch("aggregator.db.data_input.run_ingest", side_effect=KeyboardInterrupt)
+    def test_main_shm_closed_on_exit(self, mock_run, mock_writer, monkeypatch, tmp_path):
+        """Test that the shared memory block is unlinked when the ingester stops."""
+        monkeypatch.setenv("OSRS_GE_DB_URL", f"sqlite:///{tmp_path / 'test.db'}")
+
+        with pytest.raises(KeyboardInterrupt):
+            main(["--shm-name", "prices"])
+
+        mock_writer.return_value.close.assert_called_once_with()
+
+    @patch("aggregator.db.data_input.PriceUpdateRecorder")
+    @patch("aggregator.db.data_input.run_ingest")
+    def test_main_record_updates(self, mock_run, mock_recorder, monkeypatch, tmp_path):
+        """Test that --record-updates registers the price diff recorder."""
+        monkeypatch.setenv("OSRS_GE_DB_URL", f"sqlite:///{tmp_path / 'test.db'}")
+        main(["--record-updates"])
+
+        mock_recorder.assert_called_once_with()
+        try:
+            run_tick_hooks([Item(id=1)])
+        finally:
+            dispose_db()
+        mock_recorder.return_value.assert_called_once()
+
+    @patch("aggregator.db.data_input.PriceUpdateRecorder")
+    @patch("aggregator.db.data_input.run_ingest")
+    def test_record_updates_env(self, mock_run, mock_recorder, monkeypatch):
+        """Test that OSRS_GE_RECORD_UPDATES=1 turns recording on and 0 leaves it off."""
+        monkeypatch.setenv("OSRS_GE_RECORD_UPDATES", "0")
+        main([])
+        mock_recorder.assert_not_called()
+
+        monkeypatch.setenv("OSRS_GE_RECORD_UPDATES", "1")
+        main([])
+        mock_recorder.assert_called_once_with()
+
+    @patch("aggregator.db.data_input.TopKIndex")
+    @patch("aggregator.db.data_input.run_ingest")
+    def test_main_rankings_default(self, mock_run, mock_index):
+        """Test that the top-K ranking hook is registered by default."""
+        main([])
+
+        mock_index.assert_called_once_with(k=RANKING_SIZE)
+
+    @patch("aggregator.db.data_input.TopKIndex")
+    @patch("aggregator.db.data_input.run_ingest")
+    def test_main_rankings_disabled(self, mock_run, mock_index):
+        """Test that --ranking-size 0 skips the ranking hook."""
+        main(["--ranking-size", "0"])
+
+        mock_index.assert_not_called()
+
+    @patch("aggregator.db.data_input.AlchScanner")
+    @patch("aggregator.db.data_input.run_ingest")
+    def test_main_alch_scan(self, mock_run, mock_scanner):
+        """Test that the alch scanner is on by default and can be switched off."""
+        main([])
+        mock_scanner.assert_called_once_with()
+
+        mock_scanner.reset_mock()
+        main(["--no-alch-scan"])
+        mock_scanner.assert_not_called()
+
+    @patch("aggregator.db.data_input.RecipeEvaluator")
+    @patch("aggregator.db.data_input.run_ingest")
+    def test_main_recipes(self, mock_run, mock_evaluator, tmp_path):
+        """Test that recipes are evaluated by default from the chosen file."""
+        recipe_file = tmp_path / "recipes.json"
+        recipe_file.write_text('{"recipes": [{"name": "r", "kind": "craft", "inputs": {"1": 1}, "outputs": {"2": 1}}]}')
+
+        main(["--recipe-file", str(recipe_file)])
+        (recipes,), _ = mock_evaluator.call_args
+        assert [r.name for r in recipes] == ["r"]
+
+        mock_evaluator.reset_mock()
+        main(["--no-recipes"])
+        mock_evaluator.assert_not_called()
+
+    @patch("aggregator.db.data_input.ItemMetricsStage")
+    @patch("aggregator.db.data_input.run_ingest")
+    def test_main_item_metrics(self, mock_run, mock_stage, monkeypatch):
+        """Test that the item metrics stage is opt-in, by flag or environment."""
+        main([])
+        mock_stage.assert_not_called()
+
+        main(["--item-metrics"])
+        mock_stage.assert_called_once_with()
+
+        mock_stage.reset_mock()
+        monkeypatch.setenv("OSRS_GE_ITEM_METRICS", "1")
+        main([])
+        mock_stage.assert_called_once_with()
+
+    @patch("aggregator.db.data_input.WebhookSink")
+    @patch("aggregator.db.data_input.AlertEngine")
+    @patch("aggregator.db.data_input.run_ingest")
+    def test_main_alert_rules(self, mock_run, mock_engine, mock_webhook, tmp_path):
+        """Test that --alert-rules registers the alert engine with the chosen sinks."""
+        rule_file = tmp_path / "alerts.json"
+        rule_file.write_text('{"rules": [{"name": "r", "condition": "margin > 1"}]}')
+
+        main([])
+        mock_engine.assert_not_called()
+
+        main(["--alert-rules", str(rule_file), "--alert-webhook", "http://hook"])
+        (rules, sinks), _ = mock_engine.call_args
+        assert [r.name for r in rules] == ["r"]
+        mock_webhook.assert_called_once_with("http://hook")
+        assert sinks[-1] is mock_webhook.return_value
@@ -0,0 +1,93 @@
+import importlib
+import os
+
+import pytest
+from sqlalchemy import inspect
+
+from aggregator.db import database
+from aggregator.db.database import (
+    DB_URL_ENV,
+    DEFAULT_DB_URL,
+    dispose_db,
+    get_db_url,
+    get_engine,
+    init_db,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_engine():
+    """Make sure every test starts and ends without a shared engine."""
+    dispose_db()
+    yield
+    dispose_db()
+
+
+class TestGetDbUrl:
+    """Test the get_db_url function."""
+
+    def test_default_url(self, monkeypatch):
+        """Test that the default URL is used when the env var is unset."""
+        monkeypatch.delenv(DB_URL_ENV, raising=False)
+        assert get_db_url() == DEFAULT_DB_URL
+
+    def test_env_override(self, monkeypatch):
+        """Test that the env var overrides the default URL."""
+        monkeypatch.setenv(DB_URL_ENV, "sqlite:///custom.db")
+        assert get_db_url() == "sqlite:///custom.db"
+
+
+class TestInitDb:
+    """Test engine initialisation."""
+
+    def test_init_db_creates_tables(self, tmp_path):
+        """Test that init_db creates the item and snapshot tables."""
+        engine = init_db(f"sqlite:///{tmp_path / 'test.db'}")
+
+        tables = inspect(engine).get_table_names()
+        assert "item" in tables
+        assert "itemsnapshot" in tables
+
+    def test_init_db_adds_missing_indexes(self, tmp_path):
+        """Test that indexes are added to a database created before they existed."""
+        url = f"sqlite:///{tmp_path / 'old.db'}"
+        engine = init_db(url)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX ix_itemsnapshot_item_id_timestamp")
+
+        engine = init_db(url)
+
+        indexes = {index["name"] for index in inspect(engine).get_indexes("itemsnapshot")}
+        assert "ix_itemsnapshot_item_id_timestamp" in indexes
+
+    def test_init_db_replaces_engine(self, tmp_path):
+        """Test that a second init_db call swaps the shared engine."""
+        first = init_db(f"sqlite:///{tmp_path / 'a.db'}")
+        second = init_db(f"sqlite:///{tmp_path / 'b.db'}")
+
+        assert first is not second
+        assert get_engine() is second
+
+    def test_get_engine_uses_env_url(self, tmp_path, monkeypatch):
+        """Test that get_engine lazily initialises from the env var."""
+        db_path = tmp_path / "env.db"
+        monkeypatch.setenv(DB_URL_ENV, f"sqlite:///{db_path}")
+
+        engine = get_engine()
+
+        assert engine is get_engine()
+        assert db_path.exists()
+
+
+class TestNoImportSideEffects:
+    """Test that importing the ingest module does not touch the disk."""
+
+    def test_import_does_not_create_engine(self, tmp_path, monkeypatch):
+        """Test that importing data_input neither creates an engine nor a file."""
+        monkeypatch.chdir(tmp_path)
+        import aggregator.db.data_input as data_input
+
+        importlib.reload(data_input)
+
+        assert database._engine is None
+        assert not os.path.exists(tmp_path / "item_data.db")
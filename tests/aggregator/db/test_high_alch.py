@@ -0,0 +1,125 @@
+import numpy as np
+from sqlmodel import Session, select
+
+from aggregator.db.high_alch import (
+    CASTS_PER_HOUR,
+    NATURE_RUNE_ID,
+    AlchScanner,
+    scan,
+    top_alchs,
+)
+from aggregator.models.alch_opportunity import AlchOpportunity
+from aggregator.models.item_model import Item
+
+
+def catalogue(nature_low=100, bow_low=1_000):
+    return [
+        Item(id=NATURE_RUNE_ID, name="Nature rune", high=105, low=nature_low, limit=18_000, volume_24h=10**7),
+        Item(id=1, name="Magic longbow", highalch=1_536, high=1_200, low=bow_low, limit=18_000, volume_24h=600_000),
+        Item(id=2, name="Rune platebody", highalch=39_000, high=39_500, low=38_800, limit=70, volume_24h=30_000),
+        Item(id=3, name="Coins", highalch=0, high=1, low=1),
+        Item(id=4, name="Unpriced", highalch=500, high=None, low=None),
+    ]
+
+
+class TestScan:
+    """Test the vectorised profit calculation."""
+
+    def test_profit_and_caps(self):
+        """Test profit per cast and the cast limits."""
+        result = scan(
+            ids=np.array([1, 2, 3]),
+            highalch=np.array([1_536, 39_000, 500]),
+            low=np.array([1_000, 38_800, 0]),
+            limit=np.array([18_000, 70, 10]),
+            volume_24h=np.array([600_000, 30_000, 10]),
+            nature_price=100,
+        )
+
+        assert result[:, 0].tolist() == [1, 2]
+        assert result[:, 4].tolist() == [436, 100]
+        # cast rate caps the longbow, buy limit the platebody
+        assert result[:, 5].tolist() == [CASTS_PER_HOUR * 4, 70]
+        assert result[:, 6].tolist() == [436 * CASTS_PER_HOUR * 4, 100 * 70]
+
+
+class TestAlchScanner:
+    """Test the incremental tick hook."""
+
+    def test_first_tick_writes_everything(self, engine):
+        """Test that every alchable priced item gets a row."""
+        written = AlchScanner(engine)(catalogue())
+
+        with Session(engine) as session:
+            rows = {r.item_id: r for r in session.exec(select(AlchOpportunity)).all()}
+        assert written == 2
+        assert set(rows) == {1, 2}
+        assert rows[1].profit == 436
+
+    def test_only_changed_rows_rewritten(self, engine):
+        """Test that an unchanged tick writes nothing and a price move one row."""
+        scanner = AlchScanner(engine)
+        scanner(catalogue())
+
+        assert scanner(catalogue()) == 0
+        changed, removed = scanner.update(catalogue(bow_low=900))
+        assert [row[0] for row in changed] == [1]
+        assert removed == []
+
+    def test_nature_price_change_rescores_all(self):
+        """Test that a nature rune move updates every item."""
+        scanner = AlchScanner()
+        scanner.update(catalogue())
+
+        changed, _ = scanner.update(catalogue(nature_low=120))
+
+        assert sorted(row[0] for row in changed) == [1, 2]
+
+    def test_item_losing_price_is_removed(self, engine):
+        """Test that an item without a buy price drops out of the table."""
+        scanner = AlchScanner(engine)
+        scanner(catalogue())
+        items = catalogue()
+        items[1].low = None
+
+        scanner(items)
+
+        with Session(engine) as session:
+            assert session.get(AlchOpportunity, 1) is None
+
+    def test_restart_removes_stale_rows(self, engine):
+        """Test that a new scanner deletes rows an earlier run left behind and keeps the rest."""
+        AlchScanner(engine)(catalogue())
+        items = catalogue()
+        items[1].low = None
+
+        written = AlchScanner(engine)(items)
+
+        with Session(engine) as session:
+            assert session.get(AlchOpportunity, 1) is None
+            assert session.get(AlchOpportunity, 2) is not None
+        assert written == 1
+
+    def test_no_nature_price(self):
+        """Test that nothing is scored without a nature rune price."""
+        assert AlchScanner().update(catalogue()[1:]) == ([], [])
+
+
+class TestTopAlchs:
+    """Test the dashboard query."""
+
+    def test_orders_profitable_alchs(self, engine):
+        """Test ordering by per-cast and potential profit."""
+        items = catalogue()
+        with Session(engine) as session:
+            session.add_all(items)
+            session.commit()
+            AlchScanner(engine)(session.exec(select(Item)).all())
+
+            by_profit = [item.id for item, _ in top_alchs(session)]
+            by_potential = [item.id for item, _ in top_alchs(session, by="potential_profit")]
+            liquid = top_alchs(session, min_quantity=100)
+
+        assert by_profit == [1, 2]
+        assert by_potential == [1, 2]
+        assert [item.id for item, _ in liquid] == [1]
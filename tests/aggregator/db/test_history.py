@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from aggregator.db.history import (
+    BUCKET_SECONDS,
+    bucket_seconds,
+    chart_history,
+    downsample,
+    load_history,
+    lttb,
+    minmax,
+)
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def session(tmp_path):
+    """Session with two days of 5m snapshots for item 1 and a few for item 2."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for step in range(576):
+            session.add(
+                ItemSnapshot(
+                    item_id=1,
+                    timestamp=T0 + timedelta(minutes=5 * step),
+                    avg_high_price=1_000 + (500 if step == 100 else step % 7),
+                    avg_low_price=None if step % 2 else 900 + step % 5,
+                )
+            )
+        for step in range(3):
+            session.add(ItemSnapshot(item_id=2, timestamp=T0 + timedelta(minutes=5 * step), avg_high_price=5))
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+class TestBucketSeconds:
+    """Test choosing a bucket size from the range and width."""
+
+    def test_raw_snapshots_when_they_fit(self):
+        """Test that a short range keeps 5m resolution."""
+        assert bucket_seconds(T0, T0 + timedelta(hours=12), 800) == 300
+
+    def test_scales_with_range(self):
+        """Test that longer ranges get coarser buckets."""
+        day = bucket_seconds(T0, T0 + timedelta(days=7), 800)
+        year = bucket_seconds(T0, T0 + timedelta(days=365), 800)
+        assert day < year
+        assert timedelta(days=365).total_seconds() / year <= 400
+
+    def test_minmax_needs_twice_the_buckets(self):
+        """Test that minmax, emitting two points per bucket, gets coarser buckets than lttb."""
+        end = T0 + timedelta(days=30)
+        assert bucket_seconds(T0, end, 800, "minmax") > bucket_seconds(T0, end, 800, "lttb")
+
+    def test_caps_at_largest_bucket(self):
+        """Test that enormous ranges fall back to the largest bucket."""
+        assert bucket_seconds(T0, T0 + timedelta(days=10_000), 10) == BUCKET_SECONDS[-1]
+
+
+class TestMinmax:
+    """Test min-max downsampling."""
+
+    def test_keeps_extremes_in_time_order(self):
+        """Test that each bucket contributes its min and max, sorted by time."""
+        x = np.arange(8, dtype=float)
+        y = np.array([5, 9, 1, 4, 3, 3, 8, 2], dtype=float)
+
+        keep = minmax(x, y, bucket=4)
+
+        assert keep.tolist() == [1, 2, 6, 7]
+
+    def test_single_point_buckets(self):
+        """Test that a bucket with one point emits it once."""
+        keep = minmax(np.array([0.0, 10.0]), np.array([1.0, 2.0]), bucket=5)
+        assert keep.tolist() == [0, 1]
+
+    def test_empty(self):
+        """Test empty input."""
+        assert len(minmax(np.empty(0), np.empty(0), 5)) == 0
+
+
+class TestLttb:
+    """Test Largest-Triangle-Three-Buckets."""
+
+    def test_keeps_endpoints_and_peak(self):
+        """Test that the first, last and most prominent points survive."""
+        x = np.arange(100, dtype=float)
+        y = np.zeros(100)
+        y[42] = 50
+
+        keep = lttb(x, y, 10)
+
+        assert len(keep) == 10
+        assert keep[0] == 0 and keep[-1] == 99
+        assert 42 in keep
+        assert np.all(np.diff(keep) > 0)
+
+    def test_threshold_above_length(self):
+        """Test that short series are returned untouched."""
+        assert lttb(np.arange(5.0), np.arange(5.0), 10).tolist() == [0, 1, 2, 3, 4]
+
+
+class TestDownsample:
+    """Test NaN handling and the raw passthrough."""
+
+    def test_drops_missing_prices(self):
+        """Test that NaN prices are never drawn."""
+        x = np.arange(4, dtype=float) * 300
+        y = np.array([1.0, np.nan, 3.0, np.nan])
+        assert downsample(x, y, 300).tolist() == [0, 2]
+
+    def test_indices_refer_to_input(self):
+        """Test that returned indices point into the unfiltered arrays."""
+        x = np.arange(6, dtype=float) * 300
+        y = np.array([np.nan, 1.0, 5.0, np.nan, 2.0, 0.5])
+        assert downsample(x, y, 900).tolist() == [1, 2, 4, 5]
+
+
+class TestChartHistory:
+    """Test the end-to-end chart query."""
+
+    def test_load_history_range(self, session):
+        """Test that only the item's snapshots in [start, end) are read, oldest first."""
+        ts, series = load_history(session, 1, T0 + timedelta(minutes=5), T0 + timedelta(minutes=20))
+
+        assert (ts - T0.timestamp()).tolist() == [300, 600, 900]
+        assert series["high"].tolist() == [1_001, 1_002, 1_003]
+        assert np.isnan(series["low"][0])
+
+    def test_downsamples_long_ranges(self, session):
+        """Test that two days squeezed into 100 pixels keep the spike."""
+        chart = chart_history(session, 1, T0 + timedelta(days=2), timedelta(days=2), width=100)
+
+        assert chart["raw_points"] == 576
+        assert chart["bucket_seconds"] > 300
+        high = chart["series"]["high"]
+        assert len(high["price"]) <= 100
+        assert max(high["price"]) == 1_500
+        assert high["timestamp"] == sorted(high["timestamp"])
+        assert len(chart["series"]["low"]["price"]) <= 100
+
+    def test_lttb(self, session):
+        """Test the lttb method."""
+        chart = chart_history(session, 1, T0 + timedelta(days=2), timedelta(days=2), 100, "lttb")
+
+        assert chart["method"] == "lttb"
+        assert len(chart["series"]["high"]["price"]) <= 101
+        assert 1_500 in chart["series"]["high"]["price"]
+
+    def test_short_range_is_raw(self, session):
+        """Test that ranges that fit the width come back at full resolution."""
+        chart = chart_history(session, 2, T0 + timedelta(hours=1), timedelta(hours=1), width=800)
+        assert chart["series"]["high"]["price"] == [5.0, 5.0, 5.0]
+        assert chart["series"]["low"]["price"] == []
+
+    def test_unknown_method(self, session):
+        """Test that an unknown method is rejected."""
+        with pytest.raises(ValueError):
+            chart_history(session, 1, T0, timedelta(days=1), 100, "spline")
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+from aggregator.db.journal import (
+    CODEC_ZLIB,
+    CODEC_ZSTD,
+    FRAME_HEADER,
+    PayloadJournal,
+    read_journal,
+)
+
+
+@pytest.fixture(params=[CODEC_ZLIB, CODEC_ZSTD])
+def codec(request):
+    """Fixture running a test with each codec."""
+    if request.param == CODEC_ZSTD:
+        pytest.importorskip("zstandard")
+    return request.param
+
+
+class TestPayloadJournal:
+    """Test writing and reading the payload journal."""
+
+    def test_round_trip(self, tmp_path, codec):
+        """Test that entries come back in order with their timestamps."""
+        path = tmp_path / "journal.bin"
+        with PayloadJournal(path, codec=codec) as journal:
+            journal.append("latest", b'{"data": {}}', fetched_at=100.5)
+            journal.append("5m", b'{"data": {"1": {}}}', fetched_at=101.0)
+
+        entries = list(read_journal(path))
+
+        assert [e.endpoint for e in entries] == ["latest", "5m"]
+        assert entries[0].fetched_at == 100.5
+        assert entries[1].payload == b'{"data": {"1": {}}}'
+
+    def test_payload_is_compressed(self, tmp_path, codec):
+        """Test that repetitive payloads are stored compressed."""
+        path = tmp_path / "journal.bin"
+        payload = b'{"high": 100, "low": 90}, ' * 1000
+        with PayloadJournal(path, codec=codec) as journal:
+            journal.append("latest", payload)
+
+        assert path.stat().st_size < len(payload) // 10
+
+    def test_streamed_frame(self, tmp_path, codec):
+        """Test that a payload written in chunks reads back as one entry."""
+        path = tmp_path / "journal.bin"
+        chunks = [b'{"data": {', b'"1": {"high": 5}', b"}}"]
+        with PayloadJournal(path, codec=codec) as journal:
+            journal.append("latest", b"{}", fetched_at=1.0)
+            with journal.stream("mapping", fetched_at=2.0) as write:
+                for chunk in chunks:
+                    write(chunk)
+            journal.append("latest", b"[]", fetched_at=3.0)
+
+        entries = list(read_journal(path))
+
+        assert [(e.endpoint, e.fetched_at) for e in entries] == [
+            ("latest", 1.0),
+            ("mapping", 2.0),
+            ("latest", 3.0),
+        ]
+        assert entries[1].payload == b"".join(chunks)
+
+    def test_failed_stream_is_not_journaled(self, tmp_path):
+        """Test that a stream cut short by an error leaves no frame behind."""
+        path = tmp_path / "journal.bin"
+        with PayloadJournal(path) as journal:
+            with pytest.raises(ValueError), journal.stream("mapping") as write:
+                write(b"[{")
+                raise ValueError("connection dropped")
+
+        assert list(read_journal(path)) == []
+
+    def test_appends_across_opens(self, tmp_path):
+        """Test that reopening a journal appends instead of truncating."""
+        path = tmp_path / "journal.bin"
+        with PayloadJournal(path) as journal:
+            journal.append("latest", b"1")
+        with PayloadJournal(path) as journal:
+            journal.append("latest", b"2")
+
+        assert [e.payload for e in read_journal(path)] == [b"1", b"2"]
+
+    def test_truncated_frame_is_ignored(self, tmp_path):
+        """Test that a frame cut short by a crash ends the iteration."""
+        path = tmp_path / "journal.bin"
+        with PayloadJournal(path) as journal:
+            journal.append("latest", b"complete")
+            journal.append("latest", b"partial payload")
+        data = path.read_bytes()
+        path.write_bytes(data[:-3])
+
+        assert [e.payload for e in read_journal(path)] == [b"complete"]
+
+    def test_corrupt_frame_raises(self, tmp_path):
+        """Test that garbage in the journal is reported."""
+        path = tmp_path / "journal.bin"
+        path.write_bytes(b"x" * FRAME_HEADER.size)
+
+        with pytest.raises(ValueError, match="Corrupt"):
+            list(read_journal(path))
+
+    def test_concurrent_appends(self, tmp_path):
+        """Test that frames from several threads don't interleave."""
+        path = tmp_path / "journal.bin"
+        with PayloadJournal(path) as journal:
+            threads = [
+                threading.Thread(
+                    target=lambda n=n: [journal.append(f"t{n}", b"x" * 500) for _ in range(20)]
+                )
+                for n in range(4)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        assert len(list(read_journal(path))) == 80
@@ -0,0 +1,80 @@
+from sqlmodel import Session, select
+
+from aggregator.db.price_updates import PriceUpdateRecorder, updates_since
+from aggregator.db.queries import bump_generation
+from aggregator.models.item_model import Item
+from aggregator.models.price_update import PriceUpdate
+
+
+def tick(engine, recorder, items):
+    """Run the hook, then publish the generation like run_tick does."""
+    written = recorder(items)
+    with Session(engine) as session:
+        bump_generation(session)
+        session.commit()
+    return written
+
+
+class TestPriceUpdateRecorder:
+    """Test the per-tick diff recorder."""
+
+    def test_diff_only_reports_changes(self):
+        """Test that unchanged items are left out of the diff."""
+        recorder = PriceUpdateRecorder()
+
+        first = recorder.diff([Item(id=1, high=10, low=5), Item(id=2, high=20, low=15)])
+        second = recorder.diff([Item(id=1, high=10, low=5), Item(id=2, high=21, low=15)])
+
+        assert [row[0] for row in first] == [1, 2]
+        assert second == [(2, 21, 15, 0)]
+
+    def test_volume_change_counts(self):
+        """Test that a 24h volume change alone is a diff."""
+        recorder = PriceUpdateRecorder()
+        recorder.diff([Item(id=1, high=10, low=5, volume_24h=1)])
+
+        assert recorder.diff([Item(id=1, high=10, low=5, volume_24h=2)]) == [(1, 10, 5, 2)]
+
+    def test_rows_tagged_with_generation(self, engine):
+        """Test that each tick's diff is stored under that tick's generation."""
+        recorder = PriceUpdateRecorder(engine)
+
+        tick(engine, recorder, [Item(id=1, high=10, low=5), Item(id=2, high=20, low=15)])
+        written = tick(engine, recorder, [Item(id=1, high=11, low=5), Item(id=2, high=20, low=15)])
+
+        assert written == 1
+        with Session(engine) as session:
+            batches = updates_since(session, 1)
+        assert batches == {2: [{"id": 1, "high": 11, "low": 5, "volume_24h": 0}]}
+
+    def test_old_generations_pruned(self, engine):
+        """Test that rows older than keep_generations are deleted."""
+        recorder = PriceUpdateRecorder(engine, keep_generations=2)
+
+        for price in range(4):
+            tick(engine, recorder, [Item(id=1, high=price, low=0)])
+
+        with Session(engine) as session:
+            generations = session.exec(select(PriceUpdate.generation)).all()
+        assert sorted(generations) == [3, 4]
+
+
+class TestUpdatesSince:
+    """Test the updates_since query."""
+
+    def test_groups_by_generation(self, engine):
+        """Test that rows come back grouped and ordered by generation."""
+        with Session(engine) as session:
+            session.add_all(
+                [
+                    PriceUpdate(generation=3, item_id=2, high=1),
+                    PriceUpdate(generation=2, item_id=5, high=2),
+                    PriceUpdate(generation=3, item_id=1, high=3),
+                ]
+            )
+            session.commit()
+
+            batches = updates_since(session, 1)
+
+        assert list(batches) == [2, 3]
+        assert [row["id"] for row in batches[3]] == [1, 2]
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from aggregator.db import queries
+from aggregator.models.item_metrics import ItemMetrics
+from aggregator.models.item_model import Item
+from aggregator.models.item_volume_5m import ItemSnapshot
+from aggregator.util.margin import ge_margin
+
+T0 = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def session(tmp_path):
+    """Session on a fresh SQLite file database."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def add_items(session):
+    session.add_all(
+        [
+            Item(id=1, name="Abyssal whip", high=2_000_000, low=1_900_000, volume_24h=500),
+            Item(id=2, name="Dragon bones", high=3_000, low=2_700, volume_24h=90_000),
+            Item(id=3, name="Twisted bow", high=1_200_000_000, low=1_150_000_000, volume_24h=3),
+            Item(id=4, name="Dragon dagger", high=None, low=17_000, volume_24h=2_000),
+        ]
+    )
+    session.commit()
+
+
+class TestGeneration:
+    """Test the ingest generation counter."""
+
+    def test_starts_at_zero(self, session):
+        """Test that an empty database reports generation 0."""
+        assert queries.get_generation(session) == 0
+
+    def test_bump_creates_and_increments(self, session):
+        """Test that bumping creates the row and then increments it."""
+        queries.bump_generation(session)
+        session.commit()
+        queries.bump_generation(session)
+        session.commit()
+
+        assert queries.get_generation(session) == 2
+
+
+class TestTopMargins:
+    """Test the top_margins query."""
+
+    def test_orders_by_ge_margin(self, session):
+        """Test that the SQL margin matches ge_margin, including the tax cap."""
+        add_items(session)
+
+        rows = queries.top_margins(session)
+
+        assert [i.id for i in rows] == [3, 1, 2]
+        assert [i.margin for i in rows] == sorted(
+            [ge_margin(i.high, i.low) for i in rows], reverse=True
+        )
+
+    def test_min_volume_and_pagination(self, session):
+        """Test volume filtering, limit and offset."""
+        add_items(session)
+
+        assert [i.id for i in queries.top_margins(session, min_volume=100)] == [1, 2]
+        assert [i.id for i in queries.top_margins(session, limit=1, offset=1)] == [1]
+
+
+class TestFindItems:
+    """Test the find_items query."""
+
+    def test_case_insensitive_substring(self, session):
+        """Test that names are matched regardless of case."""
+        add_items(session)
+
+        assert [i.id for i in queries.find_items(session, "DRAGON")] == [2, 4]
+
+
+class TestItemHistory:
+    """Test the item_history query."""
+
+    def test_range_is_half_open(self, session):
+        """Test that start is inclusive, end exclusive and rows are oldest first."""
+        for i in range(4):
+            session.add(ItemSnapshot(item_id=1, timestamp=T0 + timedelta(minutes=5 * i), avg_high_price=100))
+        session.add(ItemSnapshot(item_id=2, timestamp=T0, avg_high_price=5))
+        session.commit()
+
+        rows = queries.item_history(
+            session, 1, start=T0 + timedelta(minutes=5), end=T0 + timedelta(minutes=15)
+        )
+
+        assert [r.timestamp for r in rows] == [T0 + timedelta(minutes=5), T0 + timedelta(minutes=10)]
+
+
+class TestPriceSpikes:
+    """Test the price_spikes query."""
+
+    def test_detects_moves_against_window_mean(self, session):
+        """Test that only items moving past the threshold are reported."""
+        for i in range(3):
+            ts = T0 + timedelta(minutes=5 * i)
+            session.add(ItemSnapshot(item_id=1, timestamp=ts, avg_high_price=100, avg_low_price=90))
+            session.add(ItemSnapshot(item_id=2, timestamp=ts, avg_high_price=100, avg_low_price=90))
+        latest = T0 + timedelta(minutes=15)
+        session.add(ItemSnapshot(item_id=1, timestamp=latest, avg_high_price=150, avg_low_price=91))
+        session.add(ItemSnapshot(item_id=2, timestamp=latest, avg_high_price=102, avg_low_price=60))
+        session.commit()
+
+        buy = queries.price_spikes(session, side="buy", threshold=0.2)
+        sell = queries.price_spikes(session, side="sell", threshold=0.2)
+
+        assert [s["item_id"] for s in buy] == [1]
+        assert buy[0]["change"] == pytest.approx(0.5)
+        assert [s["item_id"] for s in sell] == [2]
+
+    def test_empty_table(self, session):
+        """Test that no snapshots means no spikes."""
+        assert queries.price_spikes(session) == []
+
+
+class TestRiskAdjustedMargins:
+    """Test the risk_adjusted_margins query."""
+
+    def test_scales_margin_by_typical_move(self, session):
+        """Test that a steady small margin can outrank a volatile big one."""
+        add_items(session)
+        now = datetime.now(timezone.utc)
+        session.add_all(
+            [
+                ItemMetrics(item_id=1, samples=10, atr_pct=0.05, buy_fill_per_hour=5, updated_at=now),
+                ItemMetrics(item_id=2, samples=10, atr_pct=0.001, buy_fill_per_hour=5_000, updated_at=now),
+                ItemMetrics(item_id=3, samples=10, atr_pct=None, buy_fill_per_hour=1, updated_at=now),
+            ]
+        )
+        session.commit()
+
+        rows = queries.risk_adjusted_margins(session)
+        liquid = queries.risk_adjusted_margins(session, min_fill_per_hour=100)
+
+        assert [item.id for item, _, _ in rows] == [2, 1]
+        assert rows[0][2] == pytest.approx(ge_margin(3_000, 2_700) / (0.001 * 2_700))
+        assert [item.id for item, _, _ in liquid] == [2]
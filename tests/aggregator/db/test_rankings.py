@@ -0,0 +1,138 @@
+import random
+
+import pytest
+from sqlmodel import Session, select
+
+from aggregator.db.rankings import METRICS, TopKIndex, item_scores, top_ranked
+from aggregator.models.item_model import Item
+from aggregator.models.item_ranking import ItemRanking
+
+
+def full_sort(items, metric, k):
+    """Reference ranking: score everything and sort."""
+    scored = [(item_scores(i)[metric], i.id) for i in items if item_scores(i) is not None]
+    scored.sort(key=lambda e: (e[0], -e[1]), reverse=True)
+    return [(i, v) for v, i in scored[:k]]
+
+
+class TestItemScores:
+    """Test per-item metric scores."""
+
+    def test_scores(self):
+        """Test margin, ROI and margin x volume for a priced item."""
+        scores = item_scores(Item(id=1, high=1_000, low=800, volume_24h=50))
+
+        assert scores == {"margin": 190, "roi": 190 / 800, "margin_volume": 190 * 50}
+
+    def test_missing_price(self):
+        """Test that items without both prices are unranked."""
+        assert item_scores(Item(id=1, high=None, low=5)) is None
+
+
+class TestTopKIndex:
+    """Test incremental top-K maintenance."""
+
+    def test_initial_build(self):
+        """Test that the first tick ranks every metric."""
+        index = TopKIndex(k=2)
+        items = [
+            Item(id=1, high=110, low=100, volume_24h=1_000),
+            Item(id=2, high=2_000, low=1_500, volume_24h=1),
+            Item(id=3, high=60, low=30, volume_24h=10),
+        ]
+
+        changed = index.update(items)
+
+        assert changed == set(METRICS)
+        assert [i for i, _ in index.ranking("margin")] == [2, 3]
+        assert [i for i, _ in index.ranking("roi")] == [3, 2]
+        assert [i for i, _ in index.ranking("margin_volume")] == [1, 2]
+
+    def test_unchanged_tick_is_noop(self):
+        """Test that repeating the same prices changes nothing."""
+        index = TopKIndex(k=2)
+        items = [Item(id=1, high=110, low=100), Item(id=2, high=300, low=100)]
+        index.update(items)
+
+        assert index.update(items) == set()
+
+    def test_member_drop_triggers_rebuild(self):
+        """Test that a top item falling out lets the next best in."""
+        index = TopKIndex(k=2)
+        index.update(
+            [
+                Item(id=1, high=500, low=100),
+                Item(id=2, high=400, low=100),
+                Item(id=3, high=300, low=100),
+            ]
+        )
+
+        index.update([Item(id=1, high=101, low=100)])
+
+        assert [i for i, _ in index.ranking("margin")] == [2, 3]
+
+    def test_missing_price_removes_item(self):
+        """Test that an item losing a price leaves the ranking."""
+        index = TopKIndex(k=2)
+        index.update([Item(id=1, high=500, low=100), Item(id=2, high=400, low=100)])
+
+        index.update([Item(id=1, high=None, low=100)])
+
+        assert [i for i, _ in index.ranking("margin")] == [2]
+
+    def test_min_volume(self):
+        """Test that illiquid items are kept out of every ranking."""
+        index = TopKIndex(k=5, min_volume=10)
+        index.update([Item(id=1, high=500, low=100, volume_24h=5), Item(id=2, high=400, low=100, volume_24h=10)])
+
+        assert [i for i, _ in index.ranking("roi")] == [2]
+
+    def test_matches_full_sort_over_random_ticks(self):
+        """Test that incremental updates always agree with a full re-sort."""
+        rng = random.Random(7)
+        index = TopKIndex(k=10)
+        items = {
+            i: Item(id=i, high=rng.randint(10, 10_000), low=rng.randint(10, 10_000), volume_24h=rng.randint(0, 500))
+            for i in range(300)
+        }
+        index.update(list(items.values()))
+        for _ in range(20):
+            for i in rng.sample(sorted(items), 30):
+                high = None if rng.random() < 0.05 else rng.randint(10, 10_000)
+                items[i] = Item(id=i, high=high, low=rng.randint(10, 10_000), volume_24h=rng.randint(0, 500))
+            index.update(list(items.values()))
+
+            for metric in METRICS:
+                assert index.ranking(metric) == full_sort(items.values(), metric, 10)
+
+
+class TestPersistence:
+    """Test the ItemRanking table and reader."""
+
+    def test_hook_persists_and_reads_back(self, engine):
+        """Test that calling the hook writes rankings top_ranked can read."""
+        items = [Item(id=1, name="a", high=500, low=100), Item(id=2, name="b", high=400, low=100)]
+        with Session(engine) as session:
+            session.add_all(items)
+            session.commit()
+            index = TopKIndex(engine, k=5)
+
+            index(session.exec(select(Item)).all())
+
+            ranked = top_ranked(session, "margin", limit=1)
+            assert [(item.id, value) for item, value in ranked] == [(1, 395)]
+            assert len(session.exec(select(ItemRanking)).all()) == 2 * len(METRICS)
+
+    def test_only_changed_metrics_rewritten(self, engine):
+        """Test that a tick not affecting a metric's top-K leaves it alone."""
+        index = TopKIndex(engine, k=1)
+        index([Item(id=1, high=500, low=100, volume_24h=1), Item(id=2, high=200, low=100, volume_24h=100)])
+
+        changed = index([Item(id=2, high=210, low=100, volume_24h=100)])
+
+        assert changed == {"margin_volume"}
+
+    def test_unknown_metric(self, engine):
+        """Test that an unknown metric name is rejected."""
+        with Session(engine) as session, pytest.raises(ValueError):
+            top_ranked(session, "price")
@@ -0,0 +1,102 @@
+import numpy as np
+from sqlmodel import Session, select
+
+from aggregator.db.recipes import RecipeEvaluator, load_recipes, top_recipes
+from aggregator.models.item_model import Item
+from aggregator.models.recipe import Recipe, RecipeProfit
+from aggregator.util.margin import ge_margin
+
+SET = Recipe(name="Assemble set", kind="set", inputs={1: 1, 2: 1}, outputs={10: 1})
+UNPACK = Recipe(name="Unpack set", kind="set", inputs={10: 1}, outputs={1: 1, 2: 1})
+DECANT = Recipe(name="Decant (3) to (4)", kind="decant", inputs={30: 4}, outputs={40: 3}, cost=5)
+
+
+def prices(**overrides):
+    base = {
+        1: (1_000, 900),
+        2: (2_000, 1_800),
+        10: (3_500, 3_000),
+        30: (300, 280),
+        40: (420, 400),
+    }
+    base.update({int(k[1:]): v for k, v in overrides.items()})
+    return [Item(id=i, high=h, low=l) for i, (h, l) in base.items()]
+
+
+class TestLoadRecipes:
+    """Test the bundled recipe file."""
+
+    def test_bundled_recipes_validate(self):
+        """Test that the shipped recipes parse and are well formed."""
+        recipes = load_recipes()
+
+        assert {r.kind for r in recipes} == {"set", "decant", "craft"}
+        assert len({r.name for r in recipes}) == len(recipes)
+        assert all(r.inputs and r.outputs for r in recipes)
+
+
+class TestRecipeEvaluator:
+    """Test batched and incremental evaluation."""
+
+    def test_profit_includes_ge_tax(self):
+        """Test profit against a hand calculation using ge_margin."""
+        evaluator = RecipeEvaluator([SET, UNPACK, DECANT])
+        evaluator.set_prices(prices())
+
+        _, cost, value, profit = evaluator.evaluate()
+
+        assert profit[0] == ge_margin(3_500, 0) - (900 + 1_800)
+        assert profit[1] == ge_margin(1_000, 0) + ge_margin(2_000, 0) - 3_000
+        assert cost[2] == 4 * 280 + 5
+        assert value[2] == 3 * ge_margin(420, 0)
+
+    def test_only_affected_recipes(self):
+        """Test that a price change only flags recipes using that item."""
+        evaluator = RecipeEvaluator([SET, UNPACK, DECANT])
+        assert evaluator.set_prices(prices()) == {0, 1, 2}
+
+        assert evaluator.set_prices(prices()) == set()
+        assert evaluator.set_prices(prices(i30=(300, 250))) == {2}
+
+    def test_unpriced_recipe_is_nan(self):
+        """Test that a missing price only poisons recipes using that item."""
+        evaluator = RecipeEvaluator([SET, DECANT])
+        items = prices()
+        items[0].low = None
+        evaluator.set_prices(items)
+
+        _, _, _, profit = evaluator.evaluate()
+
+        assert np.isnan(profit[0])
+        assert not np.isnan(profit[1])
+
+
+class TestRecipeHook:
+    """Test persistence through the tick hook."""
+
+    def test_writes_and_updates_rows(self, engine):
+        """Test that profits are upserted and unpriced recipes removed."""
+        evaluator = RecipeEvaluator([SET, UNPACK, DECANT], engine)
+
+        assert evaluator(prices()) == 3
+        assert evaluator(prices()) == 0
+        items = prices(i10=(3_500, 3_000))
+        items[2].high = None
+        evaluator(items)
+
+        with Session(engine) as session:
+            rows = {r.name: r for r in session.exec(select(RecipeProfit)).all()}
+            best_set = top_recipes(session, kind="set")
+        assert set(rows) == {"Unpack set", "Decant (3) to (4)"}
+        assert [r.name for r in best_set] == ["Unpack set"]
+
+    def test_restart_removes_dropped_recipes(self, engine):
+        """Test that recipes removed from the book are deleted when a new evaluator starts."""
+        RecipeEvaluator([SET, UNPACK, DECANT], engine)(prices())
+        evaluator = RecipeEvaluator([SET, DECANT], engine)
+
+        assert evaluator(prices()) == 2
+
+        with Session(engine) as session:
+            rows = {r.name for r in session.exec(select(RecipeProfit)).all()}
+        assert rows == {"Assemble set", "Decant (3) to (4)"}
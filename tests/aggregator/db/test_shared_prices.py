@@ -0,0 +1,152 @@
+import struct
+import threading
+import uuid
+
+import pytest
+
+from aggregator.db.shared_prices import (
+    SEQ_OFFSET,
+    SharedPriceReader,
+    SharedPriceWriter,
+    SnapshotBusy,
+    open_reader,
+    price_rows,
+)
+from aggregator.models.item_model import Item
+
+
+@pytest.fixture
+def writer():
+    """Fixture providing a writer on a uniquely named block."""
+    w = SharedPriceWriter(f"osrs_ge_test_{uuid.uuid4().hex[:8]}", capacity=64)
+    yield w
+    w.close()
+
+
+class TestPriceRows:
+    """Test converting Items into shared records."""
+
+    def test_margin_and_missing_prices(self):
+        """Test that margin is computed and missing prices stay None."""
+        items = [
+            Item(id=1, high=1000, low=900, volume_24h=50),
+            Item(id=2, high=None, low=5, volume_24h=0),
+        ]
+        assert price_rows(items) == [(1, 1000, 900, 90, 50), (2, None, 5, None, 0)]
+
+
+class TestSharedPrices:
+    """Test publishing and reading the shared price table."""
+
+    def test_round_trip(self, writer):
+        """Test that readers see exactly what was published."""
+        rows = [(1, 1000, 900, 90, 50), (2, None, 5, None, 0)]
+        version = writer.publish(rows)
+
+        reader = SharedPriceReader(writer.name)
+        try:
+            assert reader.read() == (version, rows)
+        finally:
+            reader.close()
+
+    def test_version_increments(self, writer):
+        """Test that each publish bumps the version seen by readers."""
+        reader = SharedPriceReader(writer.name)
+        try:
+            assert reader.version == 0
+            writer.publish([(1, 1, 1, 0, 1)])
+            writer.publish([(1, 2, 1, 1, 1)])
+            assert reader.version == 2
+            assert reader.read()[1] == [(1, 2, 1, 1, 1)]
+        finally:
+            reader.close()
+
+    def test_shrinking_table(self, writer):
+        """Test that a smaller publish hides the old trailing rows."""
+        writer.publish([(n, n, n, 0, n) for n in range(10)])
+        writer.publish([(1, 1, 1, 0, 1)])
+
+        reader = SharedPriceReader(writer.name)
+        try:
+            assert len(reader.read()[1]) == 1
+        finally:
+            reader.close()
+
+    def test_over_capacity(self, writer):
+        """Test that publishing more rows than fit is rejected."""
+        with pytest.raises(ValueError, match="capacity"):
+            writer.publish([(n, 1, 1, 0, 1) for n in range(65)])
+
+    def test_reattach_existing_block(self, writer):
+        """Test that a restarted writer reuses the existing block."""
+        writer.publish([(1, 1, 1, 0, 1)])
+        second = SharedPriceWriter(writer.name, capacity=64)
+        try:
+            version = second.publish([(2, 2, 2, 0, 2)])
+            assert version == 2
+        finally:
+            second.close(unlink=False)
+
+    def test_reattach_after_crash_mid_publish(self, writer):
+        """Test that a writer restarted after a torn publish leaves the seqlock usable."""
+        writer.publish([(1, 1, 1, 0, 1)])
+        struct.pack_into("<Q", writer.shm.buf, SEQ_OFFSET, 3)  # died mid-publish
+        second = SharedPriceWriter(writer.name, capacity=64)
+        reader = SharedPriceReader(writer.name)
+        try:
+            assert reader.read(timeout=0.01) == (2, [])
+            second.publish([(2, 2, 2, 0, 2)])
+            assert reader.read(timeout=0.01) == (3, [(2, 2, 2, 0, 2)])
+        finally:
+            reader.close()
+            second.close(unlink=False)
+
+    def test_busy_writer_times_out(self, writer):
+        """Test that a reader gives up if a write never completes."""
+        struct.pack_into("<Q", writer.shm.buf, SEQ_OFFSET, 1)
+        reader = SharedPriceReader(writer.name)
+        try:
+            with pytest.raises(SnapshotBusy):
+                reader.read(timeout=0.01)
+        finally:
+            reader.close()
+
+    def test_read_array(self, writer):
+        """Test the NumPy view of the table."""
+        np = pytest.importorskip("numpy")
+        writer.publish([(4151, 1_520_000, 1_495_000, 9800, 9800)])
+
+        reader = SharedPriceReader(writer.name)
+        try:
+            version, array = reader.read_array()
+            assert version == 1
+            assert array["id"].tolist() == [4151]
+            assert array["margin"].dtype == np.int64
+        finally:
+            reader.close()
+
+    def test_open_reader_missing_block(self):
+        """Test that a missing block yields None instead of raising."""
+        assert open_reader(f"osrs_ge_missing_{uuid.uuid4().hex[:8]}") is None
+
+    def test_concurrent_reads_are_consistent(self, writer):
+        """Test that readers never see a mix of two publishes."""
+        stop = threading.Event()
+
+        def publish_forever():
+            n = 0
+            while not stop.is_set():
+                n += 1
+                writer.publish([(i, n, n, 0, n) for i in range(64)])
+
+        thread = threading.Thread(target=publish_forever)
+        thread.start()
+        reader = SharedPriceReader(writer.name)
+        try:
+            for _ in range(200):
+                _, rows = reader.read()
+                assert len({row[1] for row in rows}) <= 1
+        finally:
+            stop.set()
+            thread.join()
+            reader.close()
@@ -0,0 +1,174 @@
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from aggregator.db.storage import (
+    SNAPSHOT_COLUMNS,
+    TIMESCALE_ENV,
+    PostgresStorage,
+    Storage,
+    copy_text,
+    get_storage,
+)
+from aggregator.models.item_model import Item
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+TEST_POSTGRES_URL_ENV = "OSRS_GE_TEST_POSTGRES_URL"
+T0 = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def snapshot(item_id=1, **fields):
+    return ItemSnapshot(item_id=item_id, timestamp=T0, **fields)
+
+
+class TestGetStorage:
+    """Test choosing the write path from the dialect."""
+
+    def test_sqlite(self):
+        """Test that SQLite gets the ORM path."""
+        assert type(get_storage(create_engine("sqlite://"))) is Storage
+
+    def test_postgres(self):
+        """Test that PostgreSQL gets the COPY / ON CONFLICT path."""
+        engine = SimpleNamespace(dialect=postgresql.dialect())
+        assert isinstance(get_storage(engine), PostgresStorage)
+
+
+class TestStorage:
+    """Test the ORM write path on SQLite."""
+
+    def test_upsert_and_snapshots(self, tmp_path):
+        """Test that items are inserted then updated and snapshots appended."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'storage.db'}")
+        SQLModel.metadata.create_all(engine)
+        storage = get_storage(engine)
+        with Session(engine) as session:
+            storage.upsert_items(session, [Item(id=1, name="Whip", high=10), Item(id=2, name="Bones")])
+            storage.upsert_items(session, [Item(id=1, name="Whip", high=20)])
+            storage.write_snapshots(session, [snapshot(1), snapshot(2)])
+            session.commit()
+
+        with Session(engine) as session:
+            assert session.get(Item, 1).high == 20
+            assert len(session.exec(select(ItemSnapshot)).all()) == 2
+        engine.dispose()
+
+
+class FakeCopy:
+    def __init__(self, sink):
+        self.sink = sink
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write(self, data):
+        self.sink.append(data)
+
+
+class FakeCursor:
+    """Records COPY calls the way psycopg 3 (copy) or psycopg2 (copy_expert) receive them."""
+
+    def __init__(self, psycopg3=True):
+        self.calls = []
+        self.closed = False
+        if psycopg3:
+            self.copy = lambda sql: (self.calls.append(sql), FakeCopy(self.calls))[1]
+        else:
+            self.copy_expert = lambda sql, stream: self.calls.extend([sql, stream.read()])
+
+    def close(self):
+        self.closed = True
+
+
+def fake_session(cursor):
+    raw = SimpleNamespace(cursor=lambda: cursor)
+    return SimpleNamespace(connection=lambda: SimpleNamespace(connection=raw))
+
+
+class TestPostgresStorage:
+    """Test the PostgreSQL statements without a server."""
+
+    def test_upsert_statement(self):
+        """Test that items are upserted with ON CONFLICT on the primary key."""
+        statement = PostgresStorage().upsert_statement([Item(id=1, name="Whip").model_dump()])
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+
+        assert "ON CONFLICT (id) DO UPDATE SET" in sql
+        assert "name = excluded.name" in sql
+        assert "id = excluded.id" not in sql
+
+    def test_copy_text(self):
+        """Test COPY text encoding of NULLs, timestamps and special characters."""
+        naive = datetime(2025, 1, 1, 12, 0)
+        text = copy_text([(1, None, T0), ("a\tb\\c\nd", 2.5, naive)])
+
+        assert text == "1\t\\N\t2025-01-01 12:00:00\na\\tb\\\\c\\nd\t2.5\t2025-01-01 12:00:00\n"
+
+    @pytest.mark.parametrize("psycopg3", [True, False])
+    def test_write_snapshots_uses_copy(self, psycopg3):
+        """Test that snapshots are streamed through COPY FROM STDIN with either driver."""
+        cursor = FakeCursor(psycopg3)
+
+        PostgresStorage().write_snapshots(
+            fake_session(cursor), [snapshot(1, avg_high_price=5.0), snapshot(2, total_volume=3)]
+        )
+
+        sql, data = cursor.calls
+        assert sql == f"COPY itemsnapshot ({', '.join(SNAPSHOT_COLUMNS)}) FROM STDIN"
+        assert data.splitlines() == [
+            "1\t2025-01-01 12:00:00\t5.0\t\\N\t\\N\t\\N\t\\N",
+            "2\t2025-01-01 12:00:00\t\\N\t\\N\t\\N\t\\N\t3",
+        ]
+        assert cursor.closed
+
+    def test_write_no_snapshots(self):
+        """Test that an empty batch opens no cursor."""
+        PostgresStorage().write_snapshots(None, [])
+
+    @pytest.mark.parametrize("value, calls", [("1", 1), ("0", 0), ("", 0)])
+    def test_setup_hypertable_flag(self, monkeypatch, value, calls):
+        """Test that only OSRS_GE_TIMESCALE=1 converts the snapshot table."""
+        monkeypatch.setenv(TIMESCALE_ENV, value)
+
+        with patch("aggregator.db.storage.create_hypertable") as create:
+            PostgresStorage(MagicMock()).setup()
+
+        assert create.call_count == calls
+
+
+@pytest.mark.skipif(
+    not os.environ.get(TEST_POSTGRES_URL_ENV),
+    reason=f"set {TEST_POSTGRES_URL_ENV} to a scratch PostgreSQL database",
+)
+class TestPostgresIntegration:
+    """Round trip against a real PostgreSQL (or TimescaleDB) server."""
+
+    def test_round_trip(self):
+        """Test that upserts and COPY loads land in the database."""
+        from aggregator.db.database import dispose_db, init_db
+
+        engine = init_db(os.environ[TEST_POSTGRES_URL_ENV])
+        try:
+            storage = get_storage(engine)
+            assert isinstance(storage, PostgresStorage)
+            with Session(engine) as session:
+                storage.upsert_items(session, [Item(id=1, name="Whip", high=10)])
+                storage.upsert_items(session, [Item(id=1, name="Whip", high=20)])
+                storage.write_snapshots(session, [snapshot(1, avg_high_price=5.0)] * 3)
+                session.commit()
+            with Session(engine) as session:
+                assert session.get(Item, 1).high == 20
+                rows = session.exec(select(ItemSnapshot).where(ItemSnapshot.item_id == 1)).all()
+                assert len(rows) == 3
+                assert rows[0].timestamp.replace(tzinfo=None) == T0.replace(tzinfo=None)
+        finally:
+            SQLModel.metadata.drop_all(engine)
+            dispose_db()
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session
+
+from aggregator.db.watchlist import (
+    SNAPSHOT_MINUTES,
+    sparklines,
+    unwatch,
+    watch,
+    watched_ids,
+    watchlist_dashboard,
+)
+from aggregator.models.item_model import Item
+from aggregator.models.item_volume_5m import ItemSnapshot
+
+NOW = datetime(2025, 1, 2, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def engine(engine):
+    """The shared engine seeded with three items and an hour of snapshots for two of them."""
+    with Session(engine) as session:
+        session.add_all(
+            [
+                Item(id=1, name="Abyssal whip", high=2_000_000, low=1_900_000),
+                Item(id=2, name="Dragon bones", high=3_000, low=2_700),
+                Item(id=3, name="Twisted bow", high=None, low=None),
+            ]
+        )
+        for step in range(12):
+            ts = NOW - timedelta(minutes=SNAPSHOT_MINUTES * (12 - step))
+            session.add(ItemSnapshot(item_id=1, timestamp=ts, avg_high_price=step))
+            session.add(ItemSnapshot(item_id=2, timestamp=ts, avg_high_price=100 + step))
+        session.commit()
+    return engine
+
+
+class TestWatchlist:
+    """Test editing watchlists."""
+
+    def test_watch_and_unwatch(self, engine):
+        """Test that lists are per owner, deduplicated and keep insertion order."""
+        with Session(engine) as session:
+            watch(session, "alice", [2, 1, 2])
+            watch(session, "alice", [1, 3])
+            watch(session, "bob", [3])
+            assert sorted(watched_ids(session, "alice")) == [1, 2, 3]
+            assert watched_ids(session, "bob") == [3]
+
+            unwatch(session, "alice", [1])
+            assert sorted(watched_ids(session, "alice")) == [2, 3]
+            assert watched_ids(session, "carol") == []
+
+
+class TestSparklines:
+    """Test the windowed history query."""
+
+    def test_last_points_per_item(self, engine):
+        """Test that each item gets its newest snapshots, oldest first."""
+        with Session(engine) as session:
+            history = sparklines(session, [1, 2, 3], points=4, now=NOW)
+
+        assert [s.avg_high_price for s in history[1]] == [8, 9, 10, 11]
+        assert [s.avg_high_price for s in history[2]] == [108, 109, 110, 111]
+        assert history[3] == []
+
+    def test_ignores_old_snapshots(self, engine):
+        """Test that snapshots far older than the window are not read."""
+        with Session(engine) as session:
+            history = sparklines(session, [1], points=4, now=NOW + timedelta(days=1))
+        assert history[1] == []
+
+    def test_empty(self, engine):
+        """Test that no ids means no query."""
+        with Session(engine) as session:
+            assert sparklines(session, []) == {}
+
+
+class TestDashboard:
+    """Test the batched dashboard query."""
+
+    def test_two_queries(self, engine):
+        """Test that the dashboard costs two statements for any number of items."""
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        with Session(engine) as session:
+            rows = watchlist_dashboard(session, [2, 999, 1, 3])
+
+        assert [item.id for item, _ in rows] == [2, 1, 3]
+        assert len(statements) == 2
+        assert "row_number" in statements[1].lower()
@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from aggregator.models.data_models import (
     MappingData,
     MappingList,
@@ -342,3 +343,46 @@ class TestVolume5m:
         )
         # Average should be (0 + 1000 + 2000) / 3 = 1000
         assert data.avg_high_volume == 1000.0
+
+    def test_columns_are_row_aligned(self):
+        """Test columns expose one array per field with NaN for missing values."""
+        data = Volume5m(
+            data={
+                "2": Volume5mItem(avgHighPrice=100, highPriceVolume=10),
+                "7": Volume5mItem(avgLowPrice=90, highPriceVolume=None, lowPriceVolume=5),
+            }
+        )
+        columns = data.columns
+        assert columns["item_id"].tolist() == [2, 7]
+        assert columns["avgHighPrice"][0] == 100
+        assert np.isnan(columns["avgHighPrice"][1])
+        assert np.isnan(columns["highPriceVolume"][1])
+        assert columns["lowPriceVolume"].tolist() == [0, 5]
+
+    def test_stats(self):
+        """Test sums, medians and volume-weighted prices."""
+        data = Volume5m(
+            data={
+                "1": Volume5mItem(avgHighPrice=100, highPriceVolume=1, avgLowPrice=90, lowPriceVolume=0),
+                "2": Volume5mItem(avgHighPrice=200, highPriceVolume=3, avgLowPrice=None, lowPriceVolume=4),
+                "3": Volume5mItem(avgHighPrice=900, highPriceVolume=0, avgLowPrice=80, lowPriceVolume=1),
+            }
+        )
+        high = data.stats.columns["avgHighPrice"]
+        assert (high.count, high.sum, high.median) == (3, 1200.0, 200.0)
+        assert data.stats.vwap_high == pytest.approx((100 * 1 + 200 * 3) / 4)
+        # Item 2 has no low price, so only item 3's volume counts
+        assert data.stats.vwap_low == 80.0
+
+    def test_stats_empty(self):
+        """Test stats of an empty payload."""
+        stats = Volume5m(data={}).stats
+        assert stats.columns["avgLowPrice"].count == 0
+        assert stats.columns["avgLowPrice"].median is None
+        assert stats.vwap_high is None
+
+    def test_stats_cached(self):
+        """Test aggregates are computed once per instance."""
+        data = Volume5m(data={"1": Volume5mItem(avgHighPrice=100)})
+        assert data.stats is data.stats
+        assert data.columns is data.columns
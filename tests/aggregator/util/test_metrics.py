@@ -0,0 +1,106 @@
+import urllib.request
+
+import pytest
+
+from aggregator.util.metrics import Metrics, start_metrics_server
+
+
+@pytest.fixture
+def registry():
+    """Fixture providing an empty registry."""
+    return Metrics()
+
+
+class TestMetrics:
+    """Test the metrics registry."""
+
+    def test_counter_accumulates(self, registry):
+        """Test that inc adds to the counter."""
+        registry.inc("rows_total", 3, table="item")
+        registry.inc("rows_total", 2, table="item")
+        assert registry.get("rows_total", table="item") == 5
+
+    def test_labels_are_separate_series(self, registry):
+        """Test that different labels are tracked separately."""
+        registry.inc("rows_total", 1, table="item")
+        registry.inc("rows_total", 4, table="itemsnapshot")
+        assert registry.get("rows_total", table="item") == 1
+        assert registry.get("rows_total", table="itemsnapshot") == 4
+
+    def test_gauge_overwrites(self, registry):
+        """Test that set replaces the gauge value."""
+        registry.set("payload_bytes", 10)
+        registry.set("payload_bytes", 20)
+        assert registry.get("payload_bytes") == 20
+
+    def test_timer_records_count_and_last(self, registry):
+        """Test that the timer context manager records an observation."""
+        with registry.timer("fetch_seconds", endpoint="latest"):
+            pass
+        with registry.timer("fetch_seconds", endpoint="latest"):
+            pass
+        assert registry.get("fetch_seconds", endpoint="latest") == 2
+        assert registry.get("fetch_seconds_last", endpoint="latest") >= 0
+
+    def test_timer_records_on_exception(self, registry):
+        """Test that a failing block is still timed."""
+        with pytest.raises(ValueError):
+            with registry.timer("fetch_seconds"):
+                raise ValueError("boom")
+        assert registry.get("fetch_seconds") == 1
+
+    def test_get_unknown(self, registry):
+        """Test that unknown metrics return None."""
+        assert registry.get("missing") is None
+
+    def test_reset(self, registry):
+        """Test that reset clears everything."""
+        registry.inc("a")
+        registry.set("b", 1)
+        registry.observe("c", 0.1)
+        registry.reset()
+        assert registry.render() == "\n"
+
+
+class TestRender:
+    """Test Prometheus text rendering."""
+
+    def test_render_counter_and_gauge(self, registry):
+        """Test counter and gauge lines with labels."""
+        registry.inc("rows_total", 7, table="item")
+        registry.set("lag_seconds", 0.5)
+        text = registry.render()
+        assert "# TYPE rows_total counter" in text
+        assert 'rows_total{table="item"} 7' in text
+        assert "# TYPE lag_seconds gauge" in text
+        assert "lag_seconds 0.5" in text
+
+    def test_render_timer_as_summary(self, registry):
+        """Test that timers are rendered with _count and _sum."""
+        registry.observe("commit_seconds", 0.25, table="item")
+        text = registry.render()
+        assert "# TYPE commit_seconds summary" in text
+        assert 'commit_seconds_count{table="item"} 1' in text
+        assert 'commit_seconds_sum{table="item"} 0.25' in text
+
+    def test_render_escapes_label_values(self, registry):
+        """Test that quotes in label values are escaped."""
+        registry.inc("errors_total", endpoint='a"b')
+        assert 'errors_total{endpoint="a\\"b"} 1' in registry.render()
+
+
+class TestMetricsServer:
+    """Test the HTTP endpoint."""
+
+    def test_serves_metrics(self, registry):
+        """Test that /metrics returns the rendered registry."""
+        registry.inc("ticks_total")
+        server = start_metrics_server(0, registry, host="127.0.0.1")
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+                body = resp.read().decode()
+            assert "ticks_total 1" in body
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,131 @@
+import time
+
+import numpy as np
+
+from aggregator.models.item_model import Item
+from aggregator.util.margin import ge_margin
+from aggregator.util.portfolio import optimize, optimize_items, quantity_caps, unit_profit
+
+
+class TestUnitProfit:
+    """Test the vectorised margin."""
+
+    def test_matches_ge_margin(self):
+        """Test agreement with ge_margin, including the tax cap."""
+        high = np.array([1_000, 2_000_000_000, 99])
+        low = np.array([800, 1_000_000_000, 50])
+
+        expected = [ge_margin(h, l) for h, l in zip(high.tolist(), low.tolist())]
+        assert unit_profit(high, low).tolist() == expected
+
+
+class TestQuantityCaps:
+    """Test buy-limit and liquidity caps."""
+
+    def test_buy_limit_windows(self):
+        """Test that each started 4h window grants another buy limit."""
+        caps = quantity_caps(np.array([100]), np.array([10**9]), horizon_hours=6, liquidity_share=1)
+
+        assert caps.tolist() == [200]
+
+    def test_liquidity_cap(self):
+        """Test that thin volume caps the position."""
+        caps = quantity_caps(np.array([1_000]), np.array([240]), horizon_hours=4, liquidity_share=0.5)
+
+        assert caps.tolist() == [20]
+
+    def test_unknown_limit(self):
+        """Test that a zero buy limit leaves only the liquidity cap."""
+        caps = quantity_caps(np.array([0]), np.array([2_400]), horizon_hours=24, liquidity_share=0.1)
+
+        assert caps.tolist() == [240]
+
+
+class TestOptimize:
+    """Test the greedy knapsack relaxation."""
+
+    def test_prefers_best_return_per_coin(self):
+        """Test that cash goes to the highest ROI item first."""
+        quantity = optimize(
+            high=[120, 1_100],
+            low=[100, 1_000],
+            limit=[10, 10],
+            volume_24h=[10**6, 10**6],
+            budget=1_500,
+        )
+
+        # 120/100 nets 19 per 100 coins, 1100/1000 only 89 per 1000
+        assert quantity.tolist() == [10, 0]
+
+    def test_leftover_budget_spent_on_cheaper_items(self):
+        """Test that the partial fill's leftover buys further items."""
+        quantity = optimize(
+            high=[1_300, 120],
+            low=[1_000, 100],
+            limit=[5, 5],
+            volume_24h=[10**6, 10**6],
+            budget=2_450,
+        )
+
+        assert quantity.tolist() == [2, 4]
+
+    def test_skips_unprofitable_and_unpriced(self):
+        """Test that losing or free items are never bought."""
+        quantity = optimize(
+            high=[100, 50, 10],
+            low=[100, 60, 0],
+            limit=[10, 10, 10],
+            volume_24h=[10**6] * 3,
+            budget=10**6,
+        )
+
+        assert quantity.tolist() == [0, 0, 0]
+
+    def test_respects_budget_and_caps(self):
+        """Test the constraints on a random catalogue."""
+        rng = np.random.default_rng(3)
+        n = 2_000
+        low = rng.integers(1, 100_000, n)
+        high = low + rng.integers(-500, 5_000, n)
+        limit = rng.integers(0, 20_000, n)
+        volume = rng.integers(0, 500_000, n)
+
+        quantity = optimize(high, low, limit, volume, budget=50_000_000)
+
+        assert (quantity * low).sum() <= 50_000_000
+        assert (quantity <= quantity_caps(limit, volume)).all()
+        assert (quantity[unit_profit(high, low) <= 0] == 0).all()
+
+    def test_full_catalogue_is_fast(self):
+        """Test that ranking a 4k item catalogue fits in a dashboard refresh."""
+        rng = np.random.default_rng(0)
+        n = 4_000
+        low = rng.integers(1, 10**7, n)
+        high = low + rng.integers(-1_000, 100_000, n)
+
+        start = time.perf_counter()
+        optimize(high, low, rng.integers(0, 10_000, n), rng.integers(0, 10**6, n), budget=10**9)
+
+        assert time.perf_counter() - start < 0.5
+
+
+class TestOptimizeItems:
+    """Test the Item-based wrapper."""
+
+    def test_allocations(self):
+        """Test that allocations carry cost and after-tax profit."""
+        items = [
+            Item(id=1, name="Shark", high=1_000, low=900, limit=10, volume_24h=10**6),
+            Item(id=2, name="No price", high=None, low=5),
+        ]
+
+        allocations = optimize_items(items, budget=5_000)
+
+        assert len(allocations) == 1
+        assert allocations[0].quantity == 5
+        assert allocations[0].cost == 4_500
+        assert allocations[0].profit == 5 * ge_margin(1_000, 900)
+
+    def test_empty(self):
+        """Test that no priced items gives no allocations."""
+        assert optimize_items([], budget=1_000) == []
@@ -0,0 +1,54 @@
+import json
+import pstats
+
+from sqlalchemy import create_engine, text
+
+from aggregator.util.profiling import SQLTimer, profile_call
+
+
+class TestSQLTimer:
+    """Test SQL statement timing via engine events."""
+
+    def test_records_statements(self):
+        """Test that executed statements are counted and timed."""
+        engine = create_engine("sqlite://")
+        with SQLTimer() as timer:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+
+        report = timer.report()
+        by_statement = {row["statement"]: row for row in report}
+        assert by_statement["SELECT 1"]["count"] == 2
+        assert by_statement["SELECT 2"]["count"] == 1
+        assert all(row["total_s"] >= row["max_s"] >= 0 for row in report)
+
+    def test_stops_recording_after_exit(self):
+        """Test that listeners are removed when the block exits."""
+        engine = create_engine("sqlite://")
+        with SQLTimer() as timer:
+            pass
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert timer.report() == []
+
+
+class TestProfileCall:
+    """Test profile_call output."""
+
+    def test_writes_pstats_and_sql(self, tmp_path):
+        """Test that both output files are written and the result is returned."""
+        engine = create_engine("sqlite://")
+
+        def work():
+            with engine.connect() as conn:
+                return conn.execute(text("SELECT 42")).scalar()
+
+        result = profile_call(work, name="work", output_dir=tmp_path)
+
+        assert result == 42
+        stats = pstats.Stats(str(tmp_path / "work.pstats"))
+        assert stats.total_calls > 0
+        sql = json.loads((tmp_path / "work.sql.json").read_text())
+        assert sql[0]["statement"] == "SELECT 42"
@@ -0,0 +1,108 @@
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from aggregator.models.item_model import Item
+from aggregator.util.search import (
+    SearchIndex,
+    build_index,
+    mapping_signature,
+    normalise,
+    trigrams,
+)
+
+NAMES = [
+    (1, "Dragon bones"),
+    (2, "Dragon dagger"),
+    (3, "Dragon dagger(p++)"),
+    (4, "Abyssal whip"),
+    (5, "Nature rune"),
+    (6, "Rune platebody"),
+    (7, "Shark"),
+]
+
+
+@pytest.fixture
+def index():
+    return SearchIndex(NAMES)
+
+
+class TestHelpers:
+    """Test normalisation and trigram extraction."""
+
+    def test_normalise(self):
+        """Test that case and punctuation are folded away."""
+        assert normalise("  Dragon dagger(p++) ") == "dragon dagger p"
+
+    def test_trigrams_cover_short_words(self):
+        """Test that padding gives even two-letter words trigrams."""
+        assert trigrams("ab") == {"  a", " ab", "ab "}
+
+
+class TestSearchIndex:
+    """Test ranked search."""
+
+    def test_exact_match_first(self, index):
+        """Test that an exact name beats longer names sharing the prefix."""
+        results = index.search("dragon dagger")
+
+        assert [r.id for r in results[:2]] == [2, 3]
+
+    def test_prefix_ranks_above_other_words(self, index):
+        """Test that a full-name prefix outranks a word-prefix match."""
+        results = index.search("dragon d")
+
+        assert results[0].id == 2
+        assert {r.id for r in results} >= {1, 2, 3}
+
+    def test_word_prefix(self, index):
+        """Test that a prefix of a later word matches."""
+        assert index.search("whi")[0].name == "Abyssal whip"
+
+    def test_fuzzy_typo(self, index):
+        """Test that misspellings still find the item."""
+        assert index.search("abysal wip")[0].id == 4
+        assert index.search("drgon bones")[0].id == 1
+
+    def test_rune_ranks_prefix_first(self, index):
+        """Test that a name starting with the query beats one containing it."""
+        assert [r.id for r in index.search("rune")][:2] == [6, 5]
+
+    def test_top_k(self, index):
+        """Test that at most k results are returned, best first."""
+        results = index.search("dragon", k=2)
+
+        assert len(results) == 2
+        assert results[0].score >= results[1].score
+
+    def test_no_match_and_empty_query(self, index):
+        """Test that nonsense and blank queries return nothing."""
+        assert index.search("zzzz") == []
+        assert index.search("  ") == []
+
+    def test_short_query_is_prefix_only(self, index):
+        """Test that one or two letters only match word prefixes."""
+        assert {r.id for r in index.search("sh")} == {7}
+
+
+class TestBuildIndex:
+    """Test building the index from the database."""
+
+    def test_build_and_signature(self, tmp_path):
+        """Test that the index holds every item and the signature tracks additions."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(Item(id=i, name=n) for i, n in NAMES)
+            session.commit()
+
+            index = build_index(session)
+            before = mapping_signature(session)
+            session.add(Item(id=8, name="Shark lure"))
+            session.commit()
+            after = mapping_signature(session)
+        engine.dispose()
+
+        assert len(index) == len(NAMES)
+        assert index.search("shark")[0].id == 7
+        assert before == (7, 7)
+        assert after == (8, 8)
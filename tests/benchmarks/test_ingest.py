@@ -0,0 +1,81 @@
+import json
+from unittest.mock import patch
+
+from sqlmodel import Session, create_engine, func, select
+
+from aggregator.db import data_input
+from aggregator.models.item_model import Item
+from benchmarks.ingest import (
+    STAGES,
+    benchmark,
+    load_fixtures,
+    main,
+    run_once,
+    scale_payloads,
+)
+
+
+class TestScalePayloads:
+    """Test scaling the recorded payloads."""
+
+    def test_scale_up_produces_unique_ids(self):
+        """Test that scaled copies get fresh, unique ids."""
+        payloads = load_fixtures()
+        scaled = scale_payloads(payloads, 100)
+
+        ids = [item["id"] for item in scaled["mapping"]]
+        assert len(ids) == 100
+        assert len(set(ids)) == 100
+        assert set(scaled["latest"]["data"]) == {str(i) for i in ids}
+        assert set(scaled["5m"]["data"]) == {str(i) for i in ids}
+
+    def test_scale_down(self):
+        """Test that asking for fewer items than recorded truncates."""
+        scaled = scale_payloads(load_fixtures(), 3)
+        assert len(scaled["mapping"]) == 3
+        assert len(scaled["volumes"]["data"]) == 3
+
+    def test_keeps_timestamps(self):
+        """Test that non-item fields are carried over."""
+        payloads = load_fixtures()
+        scaled = scale_payloads(payloads, 20)
+        assert scaled["volumes"]["timestamp"] == payloads["volumes"]["timestamp"]
+
+
+class TestBenchmark:
+    """Test running the benchmark end to end on a tiny size."""
+
+    def test_all_stages_timed(self):
+        """Test that every stage reports a timing."""
+        results = benchmark(load_fixtures(), [50], repeat=1)
+
+        assert len(results) == 1
+        assert results[0]["items"] == 50
+        assert set(results[0]["stages_s"]) == set(STAGES)
+        assert results[0]["items_per_s"] > 0
+
+    def test_db_write_reuses_joined_items(self, tmp_path):
+        """Test that the items are joined once and all written to the benchmark database."""
+        scaled = scale_payloads(load_fixtures(), 30)
+        bodies = {name: json.dumps(payload).encode() for name, payload in scaled.items()}
+        db_url = f"sqlite:///{tmp_path / 'bench.db'}"
+
+        with patch.object(data_input, "build_items", wraps=data_input.build_items) as build:
+            run_once(bodies, db_url)
+
+        engine = create_engine(db_url)
+        with Session(engine) as session:
+            written = session.exec(select(func.count()).select_from(Item)).one()
+        engine.dispose()
+        assert build.call_count == 1
+        assert written == 30
+
+    def test_main_writes_json(self, tmp_path):
+        """Test that results are written to the output file."""
+        output = tmp_path / "ingest.json"
+
+        assert main(["--sizes", "20", "--repeat", "1", "--output", str(output)]) == 0
+
+        data = json.loads(output.read_text())
+        assert "environment" in data
+        assert data["results"][0]["items"] == 20
@@ -0,0 +1,88 @@
+from benchmarks.startup import (
+    IMPORT_MARKER,
+    check_budget,
+    measure,
+    parse_importtime,
+    summarize_imports,
+)
+
+SAMPLE_STDERR = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 | argparse
+{marker}
+import time:       200 |        200 |   pydantic.fields
+import time:       300 |        500 | pydantic
+import time:        50 |         50 | sqlmodel
+""".format(marker=IMPORT_MARKER)
+
+
+def make_result(**overrides):
+    result = {
+        "wall_ms": 100.0,
+        "import_ms": 50.0,
+        "target_ms": 40.0,
+        "first_query_ms": 5.0,
+        "packages_ms": {},
+        "error": None,
+    }
+    result.update(overrides)
+    return result
+
+
+class TestParseImporttime:
+    """Test parsing of -X importtime output."""
+
+    def test_skips_entries_before_marker(self):
+        """Test that imports made by the harness itself are ignored."""
+        modules = [e["module"] for e in parse_importtime(SAMPLE_STDERR)]
+        assert "argparse" not in modules
+        assert modules == ["pydantic.fields", "pydantic", "sqlmodel"]
+
+    def test_depth(self):
+        """Test that nesting depth is derived from indentation."""
+        entries = parse_importtime(SAMPLE_STDERR)
+        assert [e["depth"] for e in entries] == [1, 0, 0]
+
+    def test_summarize_groups_by_root_package(self):
+        """Test that self times are grouped by root package."""
+        summary = summarize_imports(parse_importtime(SAMPLE_STDERR))
+        assert summary["total_ms"] == 0.55
+        assert summary["packages_ms"] == {"pydantic": 0.5, "sqlmodel": 0.05}
+
+
+class TestCheckBudget:
+    """Test the budget check."""
+
+    def test_within_budget(self):
+        """Test that results under budget produce no failures."""
+        results = {"target": make_result()}
+        assert check_budget(results, {"target": {"wall_ms": 200}}) == []
+
+    def test_over_budget(self):
+        """Test that a regression is reported."""
+        results = {"target": make_result(wall_ms=300.0)}
+        failures = check_budget(results, {"target": {"wall_ms": 200}})
+        assert len(failures) == 1
+        assert "wall_ms" in failures[0]
+
+    def test_error_is_failure(self):
+        """Test that a target that failed to start counts as a failure."""
+        results = {"target": make_result(error="ImportError: boom")}
+        assert check_budget(results, {"target": {"wall_ms": 200}}) == [
+            "target: ImportError: boom"
+        ]
+
+    def test_unmeasured_targets_are_ignored(self):
+        """Test that budget entries without results are skipped."""
+        assert check_budget({}, {"target": {"wall_ms": 1}}) == []
+
+
+class TestMeasure:
+    """Test a real cold start of the ingest module."""
+
+    def test_measure_data_input(self, tmp_path):
+        """Test that the ingest module starts and answers its first query."""
+        result = measure("aggregator.db.data_input", f"sqlite:///{tmp_path / 's.db'}")
+
+        assert result["error"] is None
+        assert result["first_query_ms"] is not None
+        assert result["import_ms"] > 0
@@ -1,9 +1,20 @@
 """Shared pytest fixtures and configuration for the test suite."""
 
 import pytest
+from sqlmodel import SQLModel, create_engine
+
 from aggregator.models.data_models import Volume5mItem, Volume5m
 
 
+@pytest.fixture
+def engine(tmp_path):
+    """Fresh SQLite file database."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
 @pytest.fixture
 def sample_volume_5m_item():
     """Fixture providing a sample Volume5mItem."""
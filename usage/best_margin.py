@@ -1,16 +1,43 @@
 import streamlit as st
 from streamlit_autorefresh import st_autorefresh
 
-from sqlmodel import Session, select, create_engine
+from sqlmodel import Session, select
+from aggregator.db.database import get_engine
 from aggregator.models.item_model import Item
+from aggregator.db.rankings import METRICS, top_ranked
 
 REFRESH_INTERVAL = 60
 st_autorefresh(interval=REFRESH_INTERVAL * 1000, key="db_refresh")
 
-engine = create_engine("sqlite:///item_data.db")
+engine = get_engine()
 
 st.title("OSRS Margin lookup")
 
+# Best flips right now, read straight from the ingester's top-K rankings
+st.subheader("Top flips")
+ranking_metric = st.selectbox("Rank by", METRICS)
+ranking_limit = st.slider("Show", min_value=5, max_value=100, value=20)
+with Session(engine) as session:
+    ranked = top_ranked(session, ranking_metric, limit=ranking_limit)
+if ranked:
+    st.dataframe(
+        [
+            {
+                "Name": item.name,
+                "Low": item.low,
+                "High": item.high,
+                "Margin": item.margin,
+                "Volume": item.volume_24h,
+                ranking_metric: value,
+            }
+            for item, value in ranked
+        ]
+    )
+else:
+    st.info("No rankings yet; they are written by the ingester on its next tick.")
+
+st.subheader("Custom filter")
+
 
 # Parse for 1k 1m etc values
 def parse_num(val):
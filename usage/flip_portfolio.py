@@ -0,0 +1,55 @@
+import streamlit as st
+from streamlit_autorefresh import st_autorefresh
+
+from sqlmodel import Session, select
+from aggregator.db.database import get_engine
+from aggregator.models.item_model import Item
+from aggregator.util.portfolio import (
+    DEFAULT_HORIZON_HOURS,
+    DEFAULT_LIQUIDITY_SHARE,
+    optimize_items,
+)
+
+REFRESH_INTERVAL = 60
+st_autorefresh(interval=REFRESH_INTERVAL * 1000, key="db_refresh")
+
+engine = get_engine()
+
+st.title("OSRS Flip portfolio")
+
+budget = st.number_input("Cash budget (gp)", min_value=0, value=10_000_000, step=1_000_000)
+horizon = st.slider("Horizon (hours)", min_value=1.0, max_value=24.0, value=DEFAULT_HORIZON_HOURS)
+liquidity = st.slider(
+    "Max share of expected volume", min_value=0.01, max_value=1.0, value=DEFAULT_LIQUIDITY_SHARE
+)
+
+# Only items that can actually be flipped
+with Session(engine) as session:
+    items = session.exec(
+        select(Item).where(Item.high.is_not(None), Item.low.is_not(None), Item.volume_24h > 0)
+    ).all()
+
+allocations = optimize_items(items, int(budget), horizon, liquidity)
+
+if allocations:
+    total_cost = sum(a.cost for a in allocations)
+    total_profit = sum(a.profit for a in allocations)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Invested", f"{total_cost:,}")
+    col2.metric("Expected profit", f"{total_profit:,}")
+    col3.metric("Return", f"{total_profit / total_cost:.2%}" if total_cost else "-")
+    st.dataframe(
+        [
+            {
+                "Name": a.name,
+                "Quantity": a.quantity,
+                "Buy at": a.buy_price,
+                "Sell at": a.sell_price,
+                "Cost": a.cost,
+                "Profit": a.profit,
+            }
+            for a in allocations
+        ]
+    )
+else:
+    st.warning("No profitable flips fit the budget.")
@@ -0,0 +1,43 @@
+import streamlit as st
+from streamlit_autorefresh import st_autorefresh
+
+from sqlmodel import Session
+from aggregator.db.database import get_engine
+from aggregator.db.high_alch import top_alchs
+
+REFRESH_INTERVAL = 60
+st_autorefresh(interval=REFRESH_INTERVAL * 1000, key="db_refresh")
+
+engine = get_engine()
+
+st.title("OSRS High alch scanner")
+
+sort_by = st.selectbox(
+    "Sort by",
+    ["profit", "potential_profit"],
+    format_func=lambda s: "Profit per cast" if s == "profit" else "Profit per 4h",
+)
+min_quantity = st.number_input("Minimum casts per 4h", min_value=1, value=100)
+limit = st.slider("Show", min_value=10, max_value=200, value=50)
+
+# Read from the table the ingester keeps up to date every tick
+with Session(engine) as session:
+    rows = top_alchs(session, limit=limit, min_quantity=int(min_quantity), by=sort_by)
+
+if rows:
+    st.caption(f"Nature rune: {rows[0][1].nature_price:,} gp")
+    st.dataframe(
+        [
+            {
+                "Name": item.name,
+                "Buy at": alch.buy_price,
+                "High alch": alch.highalch,
+                "Profit/cast": alch.profit,
+                "Casts/4h": alch.max_quantity,
+                "Profit/4h": alch.potential_profit,
+            }
+            for item, alch in rows
+        ]
+    )
+else:
+    st.warning("No profitable alchs right now.")
@@ -1,34 +1,68 @@
+from datetime import datetime, timedelta, timezone
+
 import streamlit as st
-from sqlmodel import Session, select, create_engine
+from sqlmodel import Session
+from aggregator.db.database import get_engine
+from aggregator.db.history import METHODS, chart_history
+from aggregator.db.queries import get_generation
 from aggregator.models.item_model import Item
+from aggregator.util.search import build_index, mapping_signature
+
+MAX_RESULTS = 25
+CHART_RANGES = {"1 day": 1, "1 week": 7, "1 month": 30, "3 months": 90, "1 year": 365}
 
-engine = create_engine("sqlite:///item_data.db")
+engine = get_engine()
 session = Session(engine)
 
 st.title("OSRS Item lookup")
 
-# Get all item names from the database
-all_items = session.exec(select(Item)).all()
-item_names = [item.item_name for item in all_items]
+
+# Built once per mapping change and shared across reruns and sessions
+@st.cache_resource(max_entries=1)
+def load_index(signature):
+    with Session(engine) as index_session:
+        return build_index(index_session)
+
+
+index = load_index(mapping_signature(session))
+
+
+# Recomputed only when the ingester writes a new generation
+@st.cache_data(max_entries=64)
+def load_chart(item_id, days, width, method, generation):
+    end = datetime.now(timezone.utc)
+    with Session(engine) as chart_session:
+        chart = chart_history(chart_session, item_id, end, timedelta(days=days), width, method)
+    return [
+        {"Time": datetime.fromtimestamp(ts, timezone.utc), "Price": price, "Series": name}
+        for name, series in chart["series"].items()
+        for ts, price in zip(series["timestamp"], series["price"])
+    ], chart["bucket_seconds"]
+
 
 search_text = st.text_input("Fuzzy search item name:")
 
-# Filter item names by search text (case-insensitive substring match)
-if search_text:
-    filtered_names = [
-        name for name in item_names if search_text.lower() in name.lower()
-    ]
-else:
-    filtered_names = item_names
+results = index.search(search_text, k=MAX_RESULTS) if search_text else []
+options = {result.id: result.name for result in results}
 
-selected_name = st.selectbox("Select item:", filtered_names)
+selected_id = st.selectbox("Select item:", list(options), format_func=options.get)
 
-if selected_name:
-    statement = select(Item).where(Item.name == selected_name)
-    item = session.exec(statement).first()
+if selected_id is not None:
+    item = session.get(Item, selected_id)
     if item:
         st.write(item)
+
+        st.subheader("Price history")
+        span = st.selectbox("Range", list(CHART_RANGES), index=1)
+        width = st.number_input("Chart width (px)", min_value=100, max_value=4000, value=800)
+        method = st.radio("Downsampling", METHODS, horizontal=True)
+        points, bucket = load_chart(
+            item.id, CHART_RANGES[span], int(width), method, get_generation(session)
+        )
+        if points:
+            st.caption(f"{len(points)} points, {bucket // 60} minute buckets")
+            st.line_chart(points, x="Time", y="Price", color="Series", width=int(width))
+        else:
+            st.info("No snapshots in this range.")
     else:
         st.warning("Item not found.")
-
-# You can add more features like charts, tables, and filters here
@@ -1,11 +1,11 @@
 # low price = insta sell
 
 import streamlit as st
-from sqlmodel import Session, select, create_engine
+from sqlmodel import Session, select
 from aggregator.models.item_volume_5m import ItemSnapshot
-from aggregator.models.item_model import Item
+from aggregator.db.database import get_engine
 
-engine = create_engine("sqlite:///item_data.db")
+engine = get_engine()
 session = Session(engine)
 
 
@@ -0,0 +1,72 @@
+import streamlit as st
+from streamlit_autorefresh import st_autorefresh
+
+from sqlmodel import Session
+from aggregator.db.database import get_engine
+from aggregator.db.queries import get_generation
+from aggregator.db.watchlist import unwatch, watch, watched_ids, watchlist_dashboard
+from aggregator.util.search import build_index, mapping_signature
+
+REFRESH_INTERVAL = 60
+MAX_RESULTS = 25
+st_autorefresh(interval=REFRESH_INTERVAL * 1000, key="db_refresh")
+
+engine = get_engine()
+
+st.title("OSRS Watchlist")
+
+owner = st.text_input("Watchlist name", value="default").strip() or "default"
+
+
+@st.cache_resource(max_entries=1)
+def load_index(signature):
+    with Session(engine) as index_session:
+        return build_index(index_session)
+
+
+# Two queries per generation however many items are watched
+@st.cache_data(max_entries=64)
+def load_dashboard(item_ids, generation):
+    with Session(engine) as session:
+        rows = watchlist_dashboard(session, list(item_ids))
+    return [
+        {
+            "ID": item.id,
+            "Name": item.name,
+            "High": item.high,
+            "Low": item.low,
+            "Margin": item.margin if item.high is not None and item.low is not None else None,
+            "Volume 24h": item.volume_24h,
+            "Recent high": [s.avg_high_price for s in history if s.avg_high_price is not None],
+        }
+        for item, history in rows
+    ]
+
+
+with Session(engine) as session:
+    index = load_index(mapping_signature(session))
+    search_text = st.text_input("Add item:")
+    results = index.search(search_text, k=MAX_RESULTS) if search_text else []
+    options = {result.id: result.name for result in results}
+    to_add = st.multiselect("Select items to watch:", list(options), format_func=options.get)
+    if st.button("Add", disabled=not to_add):
+        watch(session, owner, to_add)
+
+    item_ids = watched_ids(session, owner)
+    generation = get_generation(session)
+
+rows = load_dashboard(tuple(item_ids), generation)
+
+if rows:
+    st.dataframe(
+        rows,
+        column_config={"Recent high": st.column_config.LineChartColumn("Last 4h")},
+    )
+    names = {row["ID"]: row["Name"] for row in rows}
+    to_remove = st.multiselect("Remove:", list(names), format_func=names.get)
+    if st.button("Remove", disabled=not to_remove):
+        with Session(engine) as session:
+            unwatch(session, owner, to_remove)
+        st.rerun()
+else:
+    st.info("Nothing watched yet.")